@@ -3,7 +3,9 @@ from fastapi.security import APIKeyHeader
 
 from app.business.documents import DocumentsManager
 from app.business.healthcheck import HealthcheckManager
+from app.business.metrics import MetricsManager
 from app.business.research import ResearchManager
+from app.business.stats import StatsManager
 from app.core.config import settings
 
 
@@ -55,3 +57,35 @@ class ManagerFactory:
             raise HTTPException(status_code=status.HTTP_403_FORBIDDEN)
 
         return DocumentsManager()
+
+    @staticmethod
+    def for_stats(
+        token: str = Depends(APIKeyHeader(name=settings.AUTH_HEADER_KEY)),
+    ) -> StatsManager:
+        """
+        Build an instance of StatsManager to inject as a dependency in the endpoints.
+
+        Returns:
+            An instance of StatsManager.
+        """
+
+        if token != settings.AUTH_SECRET_KEY:
+            raise HTTPException(status_code=status.HTTP_403_FORBIDDEN)
+
+        return StatsManager()
+
+    @staticmethod
+    def for_metrics(
+        token: str = Depends(APIKeyHeader(name=settings.AUTH_HEADER_KEY)),
+    ) -> MetricsManager:
+        """
+        Build an instance of MetricsManager to inject as a dependency in the endpoints.
+
+        Returns:
+            An instance of MetricsManager.
+        """
+
+        if token != settings.AUTH_SECRET_KEY:
+            raise HTTPException(status_code=status.HTTP_403_FORBIDDEN)
+
+        return MetricsManager()
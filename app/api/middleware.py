@@ -0,0 +1,54 @@
+import time
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core.config import settings
+from app.core.metrics import http_request_seconds, server_timings
+
+
+class ServerTimingMiddleware:
+
+    """
+    A middleware timing the HTTP requests and sending the durations of their stages in the Server-Timing header.
+
+    The stages record themselves in a dictionary shared through a context variable, so the header carries the
+    stages finished when the response starts: every stage of a plain response, and the stages before the first
+    event of a streamed one. Stages run several times, such as the translations, are summed with their count.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or not settings.METRICS_ENABLED:
+            await self.app(scope, receive, send)
+            return
+
+        started_at = time.perf_counter()
+        timings: dict[str, list[float]] = {}
+        token = server_timings.set(timings)
+
+        async def send_with_timing(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                total = time.perf_counter() - started_at
+                entries = [
+                    f'{name};dur={sum(durations) * 1000:.1f};desc="{len(durations)} calls"'
+                    if len(durations) > 1
+                    else f"{name};dur={durations[0] * 1000:.1f}"
+                    for name, durations in list(timings.items())
+                ]
+                entries.append(f"total;dur={total * 1000:.1f}")
+                message.setdefault("headers", [])
+                message["headers"] = [*message["headers"], (b"server-timing", ", ".join(entries).encode())]
+
+                # The route template, not the path, keeps the number of label values bounded
+                route = scope.get("route")
+                http_request_seconds.observe(
+                    total, scope["method"], getattr(route, "path", "unmatched"), str(message["status"])
+                )
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            server_timings.reset(token)
@@ -1,8 +1,24 @@
-from fastapi import APIRouter, Depends, Request, status
+import asyncio
+from datetime import datetime
+from typing import Optional
+
+from fastapi import APIRouter, Depends, Query, Request, status
+from fastapi.responses import StreamingResponse
 
 from app.api.dependencies import ManagerFactory
 from app.business.documents import DocumentsManager
-from app.schemas.documents import Document, DocumentsResponse
+from app.core.config import settings
+from app.core.enums import DocumentField, IngestFormat
+from app.schemas.documents import (
+    BulkDeleteResponse,
+    BulkFetchResponse,
+    Document,
+    DocumentFilters,
+    DocumentSearchResponse,
+    DocumentsResponse,
+    DocumentUuidsRequest,
+)
+from app.schemas.ingest import BulkIngestResponse
 
 router = APIRouter(prefix="/documents", tags=["Documents"])
 
@@ -10,24 +26,94 @@ router = APIRouter(prefix="/documents", tags=["Documents"])
 @router.get(
     "",
     response_model=DocumentsResponse,
+    response_model_exclude_unset=True,
     status_code=status.HTTP_200_OK,
 )
 async def get_documents(
     request: Request,
+    limit: int = Query(default=settings.DOCUMENTS_PAGE_SIZE, ge=1, le=settings.DOCUMENTS_MAX_PAGE_SIZE),
+    offset: int = Query(default=0, ge=0, description="Offset of the page, the next_offset of the previous page."),
+    fields: Optional[list[DocumentField]] = Query(default=None, description="Fields of the documents to return."),
+    authors: Optional[list[str]] = Query(default=None, description="Only documents by any of these authors."),
+    languages: Optional[list[str]] = Query(default=None, description="Only documents in any of these languages."),
+    tags: Optional[list[str]] = Query(default=None, description="Only documents with any of these tags."),
+    ingested_after: Optional[datetime] = Query(default=None, description="Only documents ingested since then."),
+    ingested_before: Optional[datetime] = Query(default=None, description="Only documents ingested until then."),
     manager: DocumentsManager = Depends(ManagerFactory.for_documents),
 ) -> DocumentsResponse:
     """
-    Get the documents from the database.
+    Get a page of documents from the database, with only the requested fields, among the documents matching the
+    filters if any.
+
+    Returns:
+        A DocumentsResponse instance with the documents of the page and the offset of the next page.
+    """
+    filters = DocumentFilters(
+        authors=authors,
+        languages=languages,
+        tags=tags,
+        ingested_after=ingested_after,
+        ingested_before=ingested_before,
+    )
+
+    return await asyncio.to_thread(
+        manager.get_documents,
+        request,
+        limit,
+        offset,
+        fields,
+        filters if filters.model_dump(exclude_none=True) else None,
+    )
+
+
+@router.get(
+    "/export",
+    response_class=StreamingResponse,
+    status_code=status.HTTP_200_OK,
+    responses={status.HTTP_200_OK: {"content": {"application/x-ndjson": {}}}},
+)
+async def export_documents(
+    request: Request,
+    fields: Optional[list[DocumentField]] = Query(default=None, description="Fields of the documents to export."),
+    manager: DocumentsManager = Depends(ManagerFactory.for_documents),
+) -> StreamingResponse:
+    """
+    Export every document of the database as JSON lines, with only the requested fields, reading the database in
+    fixed-size pages as the response is streamed.
+
+    Returns:
+        A StreamingResponse with the documents.
+    """
+
+    return StreamingResponse(manager.export_documents(request, fields), media_type="application/x-ndjson")
+
+
+@router.get(
+    "/search",
+    response_model=DocumentSearchResponse,
+    status_code=status.HTTP_200_OK,
+    responses={status.HTTP_503_SERVICE_UNAVAILABLE: {"description": "The lexical index is disabled"}},
+)
+async def search_documents(
+    request: Request,
+    q: str = Query(min_length=1, description="Terms searched in the titles and abstracts."),
+    limit: int = Query(default=10, ge=1, le=settings.DOCUMENTS_MAX_PAGE_SIZE),
+    prefix: bool = Query(default=False, description="Whether the last term also matches the words it starts."),
+    manager: DocumentsManager = Depends(ManagerFactory.for_documents),
+) -> DocumentSearchResponse:
+    """
+    Search the documents by keywords with the BM25 index, without calling the embedding model, for example to
+    autocomplete titles as the user types.
 
     Returns:
-        A DocumentsResponse instance with all documents.
+        A DocumentSearchResponse instance with the matching documents, best first.
     """
 
-    return manager.get_documents(request)
+    return await asyncio.to_thread(manager.search_documents, request, q, limit, prefix)
 
 
 @router.get(
-    "/{document_id}",
+    "/{document_uuid}",
     response_model=Document,
     status_code=status.HTTP_200_OK,
 )
@@ -64,8 +150,68 @@ async def create_document(
     return manager.create_document(payload, request)
 
 
+@router.post(
+    "/bulk",
+    response_model=BulkIngestResponse,
+    status_code=status.HTTP_200_OK,
+)
+async def bulk_create_documents(
+    request: Request,
+    ingest_format: IngestFormat = Query(default=IngestFormat.Ndjson, alias="format"),
+    skip: int = Query(default=0, ge=0, description="Number of leading records to skip when resuming a load."),
+    manager: DocumentsManager = Depends(ManagerFactory.for_documents),
+) -> BulkIngestResponse:
+    """
+    Create the documents of an NDJSON or CSV request body, one document per line or row.
+
+    Returns:
+        A BulkIngestResponse instance with the report of every batch.
+    """
+    return await manager.bulk_create_documents(request, ingest_format, skip)
+
+
+@router.post(
+    "/bulk/fetch",
+    response_model=BulkFetchResponse,
+    status_code=status.HTTP_200_OK,
+    responses={status.HTTP_404_NOT_FOUND: {"description": "None of the documents were found"}},
+)
+async def bulk_get_documents(
+    payload: DocumentUuidsRequest,
+    request: Request,
+    manager: DocumentsManager = Depends(ManagerFactory.for_documents),
+) -> BulkFetchResponse:
+    """
+    Get many documents from the database by id, reporting the ids without a document.
+
+    Returns:
+        A BulkFetchResponse instance with the documents found and the missing ids.
+    """
+    return await asyncio.to_thread(manager.bulk_get_documents, payload.uuids, request)
+
+
+@router.post(
+    "/bulk/delete",
+    response_model=BulkDeleteResponse,
+    status_code=status.HTTP_200_OK,
+    responses={status.HTTP_404_NOT_FOUND: {"description": "None of the documents were found"}},
+)
+async def bulk_delete_documents(
+    payload: DocumentUuidsRequest,
+    request: Request,
+    manager: DocumentsManager = Depends(ManagerFactory.for_documents),
+) -> BulkDeleteResponse:
+    """
+    Delete many documents by id, reporting the ids without a document.
+
+    Returns:
+        A BulkDeleteResponse instance with the deleted and the missing ids.
+    """
+    return await asyncio.to_thread(manager.bulk_delete_documents, payload.uuids, request)
+
+
 @router.delete(
-    "/{document_id}",
+    "/{document_uuid}",
     response_model=None,
     status_code=status.HTTP_200_OK,
 )
@@ -0,0 +1,26 @@
+from fastapi import APIRouter, Depends, Request, status
+from fastapi.responses import PlainTextResponse
+
+from app.api.dependencies import ManagerFactory
+from app.business.metrics import MetricsManager
+
+router = APIRouter(prefix="/metrics", tags=["Metrics"])
+
+
+@router.get(
+    "",
+    response_class=PlainTextResponse,
+    status_code=status.HTTP_200_OK,
+)
+async def get_metrics(
+    request: Request,
+    manager: MetricsManager = Depends(ManagerFactory.for_metrics),
+) -> PlainTextResponse:
+    """
+    Get the metrics of the worker serving the request, in the Prometheus text format.
+
+    Returns:
+        A PlainTextResponse with the metrics.
+    """
+
+    return PlainTextResponse(manager.get_metrics(request), media_type="text/plain; version=0.0.4")
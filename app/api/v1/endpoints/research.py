@@ -1,8 +1,9 @@
 from fastapi import APIRouter, Depends, Request, status
+from fastapi.responses import StreamingResponse
 
 from app.api.dependencies import ManagerFactory
 from app.business.research import ResearchManager
-from app.schemas.research import ResearchRequest, ResearchResponse
+from app.schemas.research import ResearchBatchRequest, ResearchRequest, ResearchResponse
 
 router = APIRouter(prefix="/research", tags=["Research"])
 
@@ -24,4 +25,56 @@ async def research(
         A ResearchResponse instance with relevant documents and summary.
     """
 
-    return manager.research(payload, request)
+    return await manager.research(payload, request)
+
+
+@router.post(
+    "/stream",
+    response_class=StreamingResponse,
+    status_code=status.HTTP_200_OK,
+    responses={status.HTTP_200_OK: {"content": {"text/event-stream": {}}}},
+)
+async def research_stream(
+    payload: ResearchRequest,
+    request: Request,
+    manager: ResearchManager = Depends(ManagerFactory.for_research),
+) -> StreamingResponse:
+    """
+    Research the query, streaming the retrieved and filtered documents, the comparison tokens and the translated
+    documents as Server-Sent Events as each stage finishes.
+
+    Returns:
+        A StreamingResponse with the events.
+    """
+
+    return StreamingResponse(
+        manager.research_stream(payload, request),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@router.post(
+    "/batch",
+    response_class=StreamingResponse,
+    status_code=status.HTTP_200_OK,
+    responses={status.HTTP_200_OK: {"content": {"application/x-ndjson": {}}}},
+)
+async def research_batch(
+    payload: ResearchBatchRequest,
+    request: Request,
+    manager: ResearchManager = Depends(ManagerFactory.for_research),
+) -> StreamingResponse:
+    """
+    Research many queries at once, streaming a JSON line per query with its response or its error as soon as it is
+    ready. The lines carry the position of the query in the batch, as they come in completion order.
+
+    Returns:
+        A StreamingResponse with the results.
+    """
+
+    return StreamingResponse(
+        manager.research_batch(payload.requests, request),
+        media_type="application/x-ndjson",
+        headers={"X-Accel-Buffering": "no"},
+    )
@@ -0,0 +1,26 @@
+from fastapi import APIRouter, Depends, Request, status
+
+from app.api.dependencies import ManagerFactory
+from app.business.stats import StatsManager
+from app.schemas.stats import StatsResponse
+
+router = APIRouter(prefix="/stats", tags=["Stats"])
+
+
+@router.get(
+    "",
+    response_model=StatsResponse,
+    status_code=status.HTTP_200_OK,
+)
+async def get_stats(
+    request: Request,
+    manager: StatsManager = Depends(ManagerFactory.for_stats),
+) -> StatsResponse:
+    """
+    Get the runtime statistics of the worker serving the request.
+
+    Returns:
+        A StatsResponse instance with the statistics.
+    """
+
+    return manager.get_stats(request)
@@ -1,6 +1,22 @@
-from fastapi import Request
-
-from app.schemas.documents import Document, DocumentsResponse
+import io
+import tempfile
+from typing import Iterator, Optional
+
+from fastapi import HTTPException, Request, status
+
+from app.core.config import settings
+from app.core.enums import DocumentField, IngestFormat
+from app.managers.ingest import IngestManager
+from app.schemas.documents import (
+    BulkDeleteResponse,
+    BulkFetchResponse,
+    Document,
+    DocumentFilters,
+    DocumentSearchResponse,
+    DocumentSearchResult,
+    DocumentsResponse,
+)
+from app.schemas.ingest import BulkIngestResponse
 
 
 class DocumentsManager:
@@ -10,18 +26,70 @@ class DocumentsManager:
     """
 
     @staticmethod
-    def get_documents(request: Request) -> DocumentsResponse:
+    def get_documents(
+        request: Request,
+        limit: int,
+        offset: int,
+        fields: Optional[list[DocumentField]],
+        filters: Optional[DocumentFilters] = None,
+    ) -> DocumentsResponse:
         """
-        Get the documents from the database.
+        Get a page of documents from the database, with only the given fields, among the documents matching the
+        filters if any.
 
         Returns:
-            A valid DocumentsResponse instance with all the documents.
+            A valid DocumentsResponse instance with the documents of the page and the offset of the next one.
         """
         vector_store_manager = request.app.state.vector_store_manager
-        documents = vector_store_manager.get_documents()
+        documents, next_offset = vector_store_manager.get_document_page(limit, offset, fields, filters)
 
         return DocumentsResponse(
             documents=documents,
+            next_offset=next_offset,
+        )
+
+    @staticmethod
+    def export_documents(request: Request, fields: Optional[list[DocumentField]]) -> Iterator[str]:
+        """
+        Export every document of the database as JSON lines, with only the given fields.
+
+        The documents are read page by page as the lines are consumed, so memory stays flat whatever the size of the
+        collection.
+
+        Returns:
+            An iterator of the JSON lines.
+        """
+        vector_store_manager = request.app.state.vector_store_manager
+        for document in vector_store_manager.iter_documents(fields):
+            yield document.model_dump_json(exclude_unset=True) + "\n"
+
+    @staticmethod
+    def search_documents(request: Request, query: str, limit: int, prefix: bool) -> DocumentSearchResponse:
+        """
+        Search the titles and abstracts of the documents with the lexical index, without embedding the query.
+
+        Returns:
+            A valid DocumentSearchResponse instance with the matching documents, best first.
+        """
+        vector_store_manager = request.app.state.vector_store_manager
+        lexical_index = vector_store_manager.get_lexical_index()
+        if lexical_index is None:
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="The lexical index is disabled, set LEXICAL_INDEX_ENABLED=true",
+            )
+
+        hits = lexical_index.search(query, limit, prefix)
+        documents = {
+            document.uuid: document for document in vector_store_manager.get_documents([uuid for uuid, _ in hits])
+        }
+
+        return DocumentSearchResponse(
+            documents=[
+                DocumentSearchResult(**documents[uuid].model_dump(), score=score)
+                for uuid, score in hits
+                if uuid in documents
+            ]
         )
 
     @staticmethod
@@ -35,9 +103,28 @@ class DocumentsManager:
 
         vector_store_manager = request.app.state.vector_store_manager
         document = vector_store_manager.get_document_by_uuid(document_uuid)
+        if document is None:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Document {document_uuid} not found")
 
         return document
 
+    @staticmethod
+    def bulk_get_documents(uuids: list[str], request: Request) -> BulkFetchResponse:
+        """
+        Get many documents from the database by id.
+
+        Returns:
+            A valid BulkFetchResponse instance with the documents found and the missing uuids.
+        """
+        vector_store_manager = request.app.state.vector_store_manager
+        uuids = list(dict.fromkeys(uuids))
+        documents = vector_store_manager.get_documents(uuids)
+        if not documents:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="None of the documents were found")
+
+        found = {document.uuid for document in documents}
+        return BulkFetchResponse(documents=documents, missing=[uuid for uuid in uuids if uuid not in found])
+
     @staticmethod
     def create_document(document: Document, request: Request) -> Document:
         """
@@ -51,6 +138,28 @@ class DocumentsManager:
 
         return document
 
+    @staticmethod
+    async def bulk_create_documents(request: Request, ingest_format: IngestFormat, skip: int) -> BulkIngestResponse:
+        """
+        Create the documents of an NDJSON or CSV upload in batches.
+
+        The upload is spooled to a temporary file, so it only has to fit in memory up to INGEST_SPOOL_SIZE bytes.
+
+        Returns:
+            A valid BulkIngestResponse instance with the report of every batch.
+        """
+        ingest_manager = request.app.state.ingest_manager
+
+        with tempfile.SpooledTemporaryFile(max_size=settings.INGEST_SPOOL_SIZE) as spool:
+            async for chunk in request.stream():
+                spool.write(chunk)
+            spool.seek(0)
+
+            records = IngestManager.read_records(io.TextIOWrapper(spool, encoding="utf-8", newline=""), ingest_format)
+            reports = [report async for report in ingest_manager.ingest(records, skip=skip)]
+
+        return IngestManager.summarize(reports, skip=skip)
+
     @staticmethod
     def delete_document(document_uuid: str, request: Request) -> None:
         """
@@ -60,6 +169,24 @@ class DocumentsManager:
             None
         """
         vector_store_manager = request.app.state.vector_store_manager
-        vector_store_manager.delete_documents([document_uuid])
+        if not vector_store_manager.delete_documents([document_uuid]):
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Document {document_uuid} not found")
 
         return None
+
+    @staticmethod
+    def bulk_delete_documents(uuids: list[str], request: Request) -> BulkDeleteResponse:
+        """
+        Delete many documents by id.
+
+        Returns:
+            A valid BulkDeleteResponse instance with the deleted and the missing uuids.
+        """
+        vector_store_manager = request.app.state.vector_store_manager
+        uuids = list(dict.fromkeys(uuids))
+        deleted = vector_store_manager.delete_documents(uuids)
+        if not deleted:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="None of the documents were found")
+
+        removed = set(deleted)
+        return BulkDeleteResponse(deleted=deleted, missing=[uuid for uuid in uuids if uuid not in removed])
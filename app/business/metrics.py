@@ -0,0 +1,41 @@
+from fastapi import Request
+
+from app.business.stats import StatsManager
+from app.core.metrics import registry
+
+
+class MetricsManager:
+
+    """
+    A manager to handle the business logic related with the Prometheus metrics.
+    """
+
+    @staticmethod
+    def get_metrics(request: Request) -> str:
+        """
+        Render the metrics of the current worker: the stage, HTTP, LLM and correlation filter metrics, followed by the
+        runtime statistics of the caches, the single flights and the OpenAI client as gauges.
+
+        Returns:
+            The metrics in the Prometheus text format.
+        """
+        # Group the samples per metric, as a metric must be declared once with all its samples
+        gauges: dict[str, list[str]] = {}
+        stats = StatsManager.get_stats(request).model_dump()
+        for section, values in stats.items():
+            # The correlation filter statistics are read from counters of the registry
+            if not values or section == "correlation_filter":
+                continue
+            # The single flight statistics are keyed by name, the other sections are a single set of statistics
+            labelled = values.items() if section == "single_flight" else [(None, values)]
+            for name, fields in labelled:
+                labels = f'{{name="{name}"}}' if name is not None else ""
+                for field, value in fields.items():
+                    metric = f"research_assistant_{section}_{field}"
+                    gauges.setdefault(metric, []).append(f"{metric}{labels} {float(value)}")
+
+        lines = [registry.render().rstrip("\n")]
+        for metric, samples in gauges.items():
+            lines.append(f"# TYPE {metric} gauge")
+            lines.extend(samples)
+        return "\n".join(lines) + "\n"
@@ -1,6 +1,73 @@
+import asyncio
+import time
+from typing import AsyncIterator, Awaitable, Optional, TypeVar
+
 from fastapi import Request
+from pydantic import BaseModel
+
+from app.core.config import logger, settings
+from app.core.enums import PipelineMode
+from app.core.hashing import normalize_text
+from app.core.metrics import stage
+from app.schemas.documents import DocumentFilters
+from app.schemas.research import (
+    ResearchBatchResult,
+    ResearchComparisonEvent,
+    ResearchDocumentsEvent,
+    ResearchErrorEvent,
+    ResearchRequest,
+    ResearchResponse,
+    ResearchResponseDocument,
+    ResearchTranslationEvent,
+)
+
+T = TypeVar("T")
+
+
+async def _bounded(semaphore: asyncio.Semaphore, awaitable: Awaitable[T]) -> T:
+    """
+    Await the given awaitable once a slot of the semaphore is available.
+
+    Returns:
+        The result of the awaitable.
+    """
+    async with semaphore:
+        return await awaitable
+
 
-from app.schemas.research import ResearchRequest, ResearchResponse
+def _cache_scope(detected_language: str, mode: PipelineMode, filters: Optional[DocumentFilters]) -> str:
+    """
+    Build the semantic cache scope of a query, so that only queries with the same language, pipeline mode and
+    filters share their responses.
+
+    Returns:
+        The scope of the query.
+    """
+    scope = f"{detected_language}\n{mode.value}"
+    if filters is not None:
+        scope += f"\n{filters.model_dump_json(exclude_none=True)}"
+    return scope
+
+
+def _is_cacheable(response: ResearchResponse) -> bool:
+    """
+    Tell whether a response can be cached. Responses with documents left untranslated after a failed translation
+    are not, so that the similar queries that follow get a chance to translate them.
+
+    Returns:
+        True if the response can be cached, False otherwise.
+    """
+    return not any(doc.untranslated for doc in response.documents or [])
+
+
+def _sse(event: str, data: BaseModel) -> str:
+    """
+    Format a Server-Sent Event.
+
+    Returns:
+        The event, ready to be written to the stream.
+    """
+    return f"event: {event}\ndata: {data.model_dump_json()}\n\n"
 
 
 class ResearchManager:
@@ -10,23 +77,133 @@ class ResearchManager:
     """
 
     @staticmethod
-    def research(payload: ResearchRequest, request: Request) -> ResearchResponse:
+    async def _translate_document(
+        doc: ResearchResponseDocument, target_language: str, request: Request
+    ) -> ResearchResponseDocument:
+        """
+        Translate a document, falling back to the original one if the translation fails.
+
+        The document language is detected at ingest time, so documents already in the target language skip the
+        LLM call. Documents ingested before that are detected here until the collection is backfilled.
+
+        Returns:
+            A ResearchResponseDocument instance, translated when possible.
+        """
+        if doc.language is None:
+            doc.language = await asyncio.to_thread(
+                request.app.state.language_manager.detect_document_language, doc.title, doc.abstract
+            )
+        if doc.language == target_language:
+            return doc
+
+        try:
+            return await request.app.state.translator_manager.translate_document(doc, target_language)
+        except Exception:
+            logger.exception("Translation of document %s failed, returning it untranslated", doc.uuid)
+            return doc.model_copy(update={"untranslated": True})
+
+    @staticmethod
+    async def research(payload: ResearchRequest, request: Request) -> ResearchResponse:
         """
         Research the query and return the relevant documents and summary.
 
         Returns:
             A valid ResearchResponse instance with the relevant documents and summary.
         """
+        # Identical requests in flight in this worker share a single run of the pipeline
+        key = f"{normalize_text(payload.query)}\n{payload.model_dump_json(exclude={'query'})}"
+        return await request.app.state.research_single_flight.do(
+            key, lambda: ResearchManager._research_cached(payload, request)
+        )
+
+    @staticmethod
+    async def _prepare(payload: ResearchRequest, request: Request) -> tuple[str, list[float], PipelineMode, str]:
+        """
+        Detect the language of the query and embed it concurrently, and resolve the pipeline mode.
+
+        Returns:
+            A tuple with the query language, the query embedding, the pipeline mode and the semantic cache scope.
+        """
+        detected_language, embedding = await asyncio.gather(
+            request.app.state.language_manager.adetect_language(payload.query),
+            request.app.state.retriever.embed_query(payload.query),
+        )
+        mode = payload.mode or settings.PIPELINE_MODE
+        return detected_language, embedding, mode, _cache_scope(detected_language, mode, payload.filters)
+
+    @staticmethod
+    async def _research_cached(payload: ResearchRequest, request: Request) -> ResearchResponse:
+        """
+        Research the query, going through the semantic cache if enabled.
+
+        Returns:
+            A valid ResearchResponse instance with the relevant documents and summary.
+        """
+        started_at = time.perf_counter()
+        semantic_cache = request.app.state.semantic_cache
+
+        # Reuse the response of a near-identical previous query in the same language and pipeline mode
+        detected_language, embedding, mode, scope = await ResearchManager._prepare(payload, request)
+        if semantic_cache is not None:
+            with stage("semantic_cache"):
+                cached_response = semantic_cache.get(embedding, scope)
+            if cached_response is not None:
+                return cached_response
 
-        # Detect the language of the query
-        detected_language = request.app.state.language_manager.detect_language(payload.query)
+        response = await ResearchManager._research(
+            payload.query, request, detected_language, embedding, mode, payload.filters
+        )
+        if semantic_cache is not None and _is_cacheable(response):
+            semantic_cache.set(embedding, scope, response, time.perf_counter() - started_at)
+        return response
+
+    @staticmethod
+    async def _research(
+        query: str,
+        request: Request,
+        detected_language: str,
+        embedding: list[float],
+        mode: PipelineMode,
+        filters: Optional[DocumentFilters] = None,
+    ) -> ResearchResponse:
+        """
+        Run the research pipeline for a query whose language and embedding are already known.
+
+        Returns:
+            A valid ResearchResponse instance with the relevant documents and summary.
+        """
 
         # Get the relevant documents
-        relevant_documents = request.app.state.retriever.retrieve_nodes(payload.query)
+        retrieved_documents = await request.app.state.retriever.retrieve_nodes(query, embedding, filters)
+        return await ResearchManager._research_documents(query, request, detected_language, retrieved_documents, mode)
+
+    @staticmethod
+    async def _research_documents(
+        query: str,
+        request: Request,
+        detected_language: str,
+        retrieved_documents: list[ResearchResponseDocument],
+        mode: PipelineMode,
+        semaphore: Optional[asyncio.Semaphore] = None,
+    ) -> ResearchResponse:
+        """
+        Filter, compare and translate the documents retrieved for a query.
+
+        The LLM calls in flight are bounded by the given semaphore, shared by every query of a batch, or by a
+        semaphore of RESEARCH_MAX_CONCURRENCY slots for this query alone.
+
+        Returns:
+            A valid ResearchResponse instance with the relevant documents and summary.
+        """
+        semaphore = semaphore or asyncio.Semaphore(settings.RESEARCH_MAX_CONCURRENCY)
+        if mode is PipelineMode.Merged:
+            return await ResearchManager._research_merged(
+                query, request, detected_language, retrieved_documents, semaphore
+            )
 
         # Check if the documents are relevant
-        relevant_documents = request.app.state.correlation_filter_manager.check_correlation(
-            payload.query, relevant_documents
+        relevant_documents = await _bounded(
+            semaphore, request.app.state.correlation_filter_manager.check_correlation(query, retrieved_documents)
         )
 
         # Check if there are relevant documents
@@ -34,20 +211,345 @@ class ResearchManager:
         if not are_relevant_documents:
             return ResearchResponse(are_relevant_documents=are_relevant_documents)
 
-        # Get the comparison
-        comparison = request.app.state.comparison_manager.get_comparison(
-            payload.query, relevant_documents, detected_language
+        # Get the comparison and translate the documents concurrently, bounding the LLM calls in flight
+        comparison_task = _bounded(
+            semaphore,
+            request.app.state.comparison_manager.get_comparison(query, relevant_documents, detected_language),
         )
-
-        # Translate the documents
-        translated_documents = []
-        for doc in relevant_documents:
-            doc.language = request.app.state.language_manager.detect_language(doc.title)
-            translated_doc = request.app.state.translator_manager.translate_document(doc, detected_language)
-            translated_documents.append(translated_doc)
+        translation_tasks = [
+            _bounded(semaphore, ResearchManager._translate_document(doc, detected_language, request))
+            for doc in relevant_documents
+        ]
+        comparison, *translated_documents = await asyncio.gather(comparison_task, *translation_tasks)
 
         return ResearchResponse(
             are_relevant_documents=are_relevant_documents,
             documents=translated_documents,
             comparison=comparison,
         )
+
+    @staticmethod
+    async def _research_merged(
+        query: str,
+        request: Request,
+        detected_language: str,
+        retrieved_documents: list[ResearchResponseDocument],
+        semaphore: asyncio.Semaphore,
+    ) -> ResearchResponse:
+        """
+        Filter and compare the retrieved documents with a single LLM call.
+
+        The documents accepted by score are translated while the LLM judges the ambiguous ones, and the ambiguous
+        documents that survive are translated once the judgement is back.
+
+        Returns:
+            A valid ResearchResponse instance with the relevant documents and summary.
+        """
+        accepted, ambiguous = request.app.state.correlation_filter_manager.partition(retrieved_documents)
+        if not accepted and not ambiguous:
+            return ResearchResponse(are_relevant_documents=False)
+
+        comparison_manager = request.app.state.comparison_manager
+
+        async def judge_and_translate() -> tuple[list[ResearchResponseDocument], str, list[ResearchResponseDocument]]:
+            # Without ambiguous documents there is nothing to judge, and the comparison is the single call
+            if ambiguous:
+                relevant, comparison = await _bounded(
+                    semaphore, comparison_manager.get_judged_comparison(query, accepted, ambiguous, detected_language)
+                )
+            else:
+                relevant = accepted
+                comparison = await _bounded(
+                    semaphore, comparison_manager.get_comparison(query, accepted, detected_language)
+                )
+            survivors = relevant[len(accepted) :]
+            translated = await asyncio.gather(
+                *(
+                    _bounded(semaphore, ResearchManager._translate_document(doc, detected_language, request))
+                    for doc in survivors
+                )
+            )
+            return relevant, comparison, translated
+
+        accepted_translations = [
+            _bounded(semaphore, ResearchManager._translate_document(doc, detected_language, request))
+            for doc in accepted
+        ]
+        (relevant, comparison, translated_survivors), *translated_accepted = await asyncio.gather(
+            judge_and_translate(), *accepted_translations
+        )
+
+        # Return the documents in retrieval order
+        translations = dict(zip(map(id, relevant), translated_accepted + list(translated_survivors)))
+        documents = [translations[id(doc)] for doc in retrieved_documents if id(doc) in translations]
+        if not documents:
+            return ResearchResponse(are_relevant_documents=False)
+
+        return ResearchResponse(are_relevant_documents=True, documents=documents, comparison=comparison)
+
+    @staticmethod
+    async def research_batch(payloads: list[ResearchRequest], request: Request) -> AsyncIterator[str]:
+        """
+        Research many queries, streaming each result as a JSON line as soon as it is ready.
+
+        The queries are taken RESEARCH_BATCH_SIZE at a time: the chunk is embedded with a single embedding call and
+        searched with a single vector search, and the LLM stages of its queries are scheduled under one semaphore
+        shared by the whole batch. The next chunk is prepared while the LLM stages run, as long as fewer than two
+        chunks of queries are pending. A failed query is reported in its result and does not fail the batch.
+
+        Returns:
+            An async iterator of the ResearchBatchResult lines, in completion order.
+        """
+        semaphore = asyncio.Semaphore(settings.RESEARCH_BATCH_MAX_CONCURRENCY)
+        batch_size = settings.RESEARCH_BATCH_SIZE
+        pending: set[asyncio.Task] = set()
+
+        try:
+            for start in range(0, len(payloads), batch_size):
+                # Bound the queries in flight, so a large batch does not hold all its documents at once
+                while len(pending) >= 2 * batch_size:
+                    done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                    for task in done:
+                        yield task.result().model_dump_json() + "\n"
+
+                chunk = list(enumerate(payloads[start : start + batch_size], start=start))
+                try:
+                    pending |= set(await ResearchManager._schedule_batch(chunk, request, semaphore))
+                except Exception as exception:
+                    logger.exception("Batch research of queries %d to %d failed", start, start + len(chunk) - 1)
+                    for index, payload in chunk:
+                        result = ResearchBatchResult(index=index, query=payload.query, error=str(exception))
+                        yield result.model_dump_json() + "\n"
+
+            for task in asyncio.as_completed(pending):
+                yield (await task).model_dump_json() + "\n"
+        finally:
+            # Stop the queries left if the client went away
+            for task in pending:
+                task.cancel()
+
+    @staticmethod
+    async def _schedule_batch(
+        chunk: list[tuple[int, ResearchRequest]], request: Request, semaphore: asyncio.Semaphore
+    ) -> list[asyncio.Task]:
+        """
+        Detect the languages, embed and search the queries of a chunk together, and schedule the LLM stages of each
+        query that the semantic cache does not answer.
+
+        Returns:
+            A task per query, resolving to its ResearchBatchResult.
+        """
+        semantic_cache = request.app.state.semantic_cache
+        started_at = time.perf_counter()
+        queries = [payload.query for _, payload in chunk]
+
+        # 1. Detect the languages and embed the queries with a single embedding call
+        language_manager = request.app.state.language_manager
+
+        async def detect_languages() -> list[str]:
+            async with stage("language_detection"):
+                return await asyncio.to_thread(lambda: [language_manager.detect_language(query) for query in queries])
+
+        detected_languages, embeddings = await asyncio.gather(
+            detect_languages(), request.app.state.retriever.embed_queries(queries)
+        )
+        modes = [payload.mode or settings.PIPELINE_MODE for _, payload in chunk]
+        scopes = [
+            _cache_scope(language, mode, payload.filters)
+            for language, mode, (_, payload) in zip(detected_languages, modes, chunk)
+        ]
+
+        # 2. Answer the near-identical queries from the semantic cache, and search the others at once, the queries
+        # with the same filters together
+        with stage("semantic_cache"):
+            cached_responses = [
+                semantic_cache.get(embedding, scope) if semantic_cache is not None else None
+                for embedding, scope in zip(embeddings, scopes)
+            ]
+        misses = [position for position, response in enumerate(cached_responses) if response is None]
+        groups: dict[str, list[int]] = {}
+        for position in misses:
+            filters = chunk[position][1].filters
+            groups.setdefault(filters.model_dump_json() if filters is not None else "", []).append(position)
+        retrieved = await asyncio.gather(
+            *(
+                request.app.state.retriever.retrieve_nodes_batch(
+                    [embeddings[position] for position in positions],
+                    [queries[position] for position in positions],
+                    chunk[positions[0]][1].filters,
+                )
+                for positions in groups.values()
+            )
+        )
+        retrieved_documents = {
+            position: documents
+            for positions, group_documents in zip(groups.values(), retrieved)
+            for position, documents in zip(positions, group_documents)
+        }
+
+        async def research(position: int) -> ResearchBatchResult:
+            index, payload = chunk[position]
+            if cached_responses[position] is not None:
+                return ResearchBatchResult(index=index, query=payload.query, response=cached_responses[position])
+            try:
+                response = await ResearchManager._research_documents(
+                    payload.query,
+                    request,
+                    detected_languages[position],
+                    retrieved_documents[position],
+                    modes[position],
+                    semaphore,
+                )
+            except Exception as exception:
+                logger.exception("Batch research of query %d failed", index)
+                return ResearchBatchResult(index=index, query=payload.query, error=str(exception))
+
+            if semantic_cache is not None and _is_cacheable(response):
+                semantic_cache.set(embeddings[position], scopes[position], response, time.perf_counter() - started_at)
+            return ResearchBatchResult(index=index, query=payload.query, response=response)
+
+        return [asyncio.create_task(research(position)) for position in range(len(chunk))]
+
+    @staticmethod
+    async def research_stream(payload: ResearchRequest, request: Request) -> AsyncIterator[str]:
+        """
+        Research the query, streaming each stage as a Server-Sent Event as soon as it finishes:
+            - retrieved: the retrieved documents, with their similarity.
+            - filtered: the documents that passed the correlation filter.
+            - comparison: a chunk of the comparison, as the model generates it.
+            - document: a translated document, with its position in the filtered documents, as soon as it is ready.
+            - done: the complete ResearchResponse.
+        A failure after the stream started is reported as an error event. A response replayed from the semantic cache
+        goes through the same events, the retrieved event carrying the relevant documents.
+
+        Returns:
+            An async iterator of the formatted events.
+        """
+        try:
+            async for event in ResearchManager._research_events(payload, request):
+                yield event
+        except Exception as exception:
+            logger.exception("Streamed research failed")
+            yield _sse("error", ResearchErrorEvent(detail=str(exception)))
+
+    @staticmethod
+    async def _research_events(payload: ResearchRequest, request: Request) -> AsyncIterator[str]:
+        started_at = time.perf_counter()
+        semantic_cache = request.app.state.semantic_cache
+        comparison_manager = request.app.state.comparison_manager
+
+        # Replay the response of a near-identical previous query
+        detected_language, embedding, mode, scope = await ResearchManager._prepare(payload, request)
+        with stage("semantic_cache"):
+            cached_response = semantic_cache.get(embedding, scope) if semantic_cache is not None else None
+        if cached_response is not None:
+            # Same event sequence as a live run, only the relevant documents being cached
+            documents = cached_response.documents or []
+            yield _sse("retrieved", ResearchDocumentsEvent(documents=documents))
+            yield _sse("filtered", ResearchDocumentsEvent(documents=documents))
+            if cached_response.comparison:
+                yield _sse("comparison", ResearchComparisonEvent(token=cached_response.comparison))
+            for index, doc in enumerate(documents):
+                yield _sse("document", ResearchTranslationEvent(index=index, document=doc))
+            yield _sse("done", cached_response)
+            return
+
+        # Get the relevant documents
+        retrieved_documents = await request.app.state.retriever.retrieve_nodes(
+            payload.query, embedding, payload.filters
+        )
+        yield _sse("retrieved", ResearchDocumentsEvent(documents=retrieved_documents))
+
+        # Check if the documents are relevant, along with the comparison in the merged mode
+        comparison: Optional[str] = None
+        if mode is PipelineMode.Merged:
+            relevant_documents, comparison = await ResearchManager._judge_merged(
+                payload.query, request, detected_language, retrieved_documents
+            )
+        else:
+            relevant_documents = await request.app.state.correlation_filter_manager.check_correlation(
+                payload.query, retrieved_documents
+            )
+        yield _sse("filtered", ResearchDocumentsEvent(documents=relevant_documents))
+
+        if not relevant_documents:
+            response = ResearchResponse(are_relevant_documents=False)
+        else:
+            # Stream the comparison and the translations as they come, through a single queue
+            semaphore = asyncio.Semaphore(settings.RESEARCH_MAX_CONCURRENCY)
+            queue: asyncio.Queue = asyncio.Queue()
+            comparison_chunks: list[str] = []
+            translated_documents: list[Optional[ResearchResponseDocument]] = [None] * len(relevant_documents)
+
+            async def comparison_source() -> AsyncIterator[str]:
+                if comparison is not None:
+                    yield comparison
+                    return
+                async with semaphore:
+                    async for chunk in comparison_manager.stream_comparison(
+                        payload.query, relevant_documents, detected_language
+                    ):
+                        yield chunk
+
+            async def stream_comparison() -> None:
+                async for chunk in comparison_source():
+                    comparison_chunks.append(chunk)
+                    await queue.put(_sse("comparison", ResearchComparisonEvent(token=chunk)))
+
+            async def translate(index: int, doc: ResearchResponseDocument) -> None:
+                translated_documents[index] = await _bounded(
+                    semaphore, ResearchManager._translate_document(doc, detected_language, request)
+                )
+                await queue.put(
+                    _sse("document", ResearchTranslationEvent(index=index, document=translated_documents[index]))
+                )
+
+            tasks = [asyncio.create_task(stream_comparison())] + [
+                asyncio.create_task(translate(index, doc)) for index, doc in enumerate(relevant_documents)
+            ]
+            for task in tasks:
+                task.add_done_callback(lambda _: queue.put_nowait(None))
+
+            try:
+                remaining = len(tasks)
+                while remaining:
+                    event = await queue.get()
+                    if event is None:
+                        remaining -= 1
+                    else:
+                        yield event
+                # Raise the failure of any stage
+                await asyncio.gather(*tasks)
+            finally:
+                # Stop the stages if the client went away
+                for task in tasks:
+                    task.cancel()
+
+            response = ResearchResponse(
+                are_relevant_documents=True, documents=translated_documents, comparison="".join(comparison_chunks)
+            )
+
+        yield _sse("done", response)
+        if semantic_cache is not None and _is_cacheable(response):
+            semantic_cache.set(embedding, scope, response, time.perf_counter() - started_at)
+
+    @staticmethod
+    async def _judge_merged(
+        query: str, request: Request, detected_language: str, retrieved_documents: list[ResearchResponseDocument]
+    ) -> tuple[list[ResearchResponseDocument], Optional[str]]:
+        """
+        Filter the retrieved documents and compare them with a single LLM call.
+
+        Returns:
+            A tuple with the relevant documents in retrieval order and the comparison, None if there is nothing to
+            judge and the comparison is left to the caller.
+        """
+        accepted, ambiguous = request.app.state.correlation_filter_manager.partition(retrieved_documents)
+        if not ambiguous:
+            return accepted, None
+
+        relevant, comparison = await request.app.state.comparison_manager.get_judged_comparison(
+            query, accepted, ambiguous, detected_language
+        )
+        kept = {id(doc) for doc in relevant}
+        return [doc for doc in retrieved_documents if id(doc) in kept], comparison
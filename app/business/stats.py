@@ -0,0 +1,39 @@
+from fastapi import Request
+
+from app.managers.embedding_cache import CachedEmbeddings
+from app.schemas.stats import StatsResponse
+
+
+class StatsManager:
+
+    """
+    A manager to handle the business logic related with runtime statistics.
+    """
+
+    @staticmethod
+    def get_stats(request: Request) -> StatsResponse:
+        """
+        Collect the runtime statistics of the current worker.
+
+        Returns:
+            A valid StatsResponse instance with the statistics.
+        """
+        translation_cache = request.app.state.translation_cache
+        semantic_cache = request.app.state.semantic_cache
+        embedding_cache = request.app.state.embedding_cache
+        single_flights = [
+            request.app.state.research_single_flight,
+            request.app.state.correlation_filter_manager.single_flight,
+            request.app.state.translator_manager.single_flight,
+        ]
+        if isinstance(request.app.state.embedding_model, CachedEmbeddings):
+            single_flights.append(request.app.state.embedding_model.single_flight)
+
+        return StatsResponse(
+            translation_cache=translation_cache.stats() if translation_cache is not None else None,
+            semantic_cache=semantic_cache.stats() if semantic_cache is not None else None,
+            embedding_cache=embedding_cache.stats() if embedding_cache is not None else None,
+            correlation_filter=request.app.state.correlation_filter_manager.stats(),
+            single_flight={single_flight.name: single_flight.stats() for single_flight in single_flights},
+            openai_client=request.app.state.openai_client.stats(),
+        )
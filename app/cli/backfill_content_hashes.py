@@ -0,0 +1,28 @@
+"""
+Backfill the content hash of the documents stored before ingestion deduplicated them.
+
+Without it, re-posting one of those documents without its uuid creates a duplicate instead of being skipped.
+
+Usage:
+    python -m app.cli.backfill_content_hashes [--batch-size 500]
+"""
+
+import argparse
+
+from app.managers.embedding import EmbeddingManager
+from app.managers.language import LanguageManager
+from app.managers.vector_store import VectorStoreManager
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--batch-size", type=int, default=500, help="Number of documents read per page.")
+    args = parser.parse_args()
+
+    vector_store_manager = VectorStoreManager(EmbeddingManager().get_embedding_model(), LanguageManager())
+    updated = vector_store_manager.backfill_content_hashes(batch_size=args.batch_size)
+    print(f"Updated the content hash of {updated} documents.")
+
+
+if __name__ == "__main__":
+    main()
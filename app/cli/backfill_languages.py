@@ -0,0 +1,27 @@
+"""
+Backfill the language of the documents stored before it was detected at ingest time.
+
+Usage:
+    python -m app.cli.backfill_languages [--batch-size 500] [--force]
+"""
+
+import argparse
+
+from app.managers.embedding import EmbeddingManager
+from app.managers.language import LanguageManager
+from app.managers.vector_store import VectorStoreManager
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--batch-size", type=int, default=500, help="Number of documents read per page.")
+    parser.add_argument("--force", action="store_true", help="Detect the language of every document again.")
+    args = parser.parse_args()
+
+    vector_store_manager = VectorStoreManager(EmbeddingManager().get_embedding_model(), LanguageManager())
+    updated = vector_store_manager.backfill_languages(batch_size=args.batch_size, force=args.force)
+    print(f"Updated the language of {updated} documents.")
+
+
+if __name__ == "__main__":
+    main()
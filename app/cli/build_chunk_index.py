@@ -0,0 +1,32 @@
+"""
+Index the abstract chunks of every stored document, for collections created before the chunked index was enabled.
+
+Requires CHUNKED_INDEX=true in the settings.
+
+Usage:
+    python -m app.cli.build_chunk_index [--batch-size 500]
+"""
+
+import argparse
+
+from app.core.config import settings
+from app.managers.embedding import EmbeddingManager
+from app.managers.language import LanguageManager
+from app.managers.vector_store import VectorStoreManager
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--batch-size", type=int, default=500, help="Number of documents read per page.")
+    args = parser.parse_args()
+
+    if not settings.CHUNKED_INDEX:
+        raise SystemExit("The chunked index is disabled, set CHUNKED_INDEX=true.")
+
+    vector_store_manager = VectorStoreManager(EmbeddingManager().get_embedding_model(), LanguageManager())
+    indexed = vector_store_manager.build_chunk_index(batch_size=args.batch_size)
+    print(f"Indexed the chunks of {indexed} documents.")
+
+
+if __name__ == "__main__":
+    main()
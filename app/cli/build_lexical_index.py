@@ -0,0 +1,33 @@
+"""
+Index the titles and abstracts of every stored document in the BM25 index, for collections created before the lexical
+index was enabled.
+
+Requires LEXICAL_INDEX_ENABLED=true in the settings. The embedding model is not called.
+
+Usage:
+    python -m app.cli.build_lexical_index [--batch-size 500]
+"""
+
+import argparse
+
+from app.core.config import settings
+from app.managers.embedding import EmbeddingManager
+from app.managers.language import LanguageManager
+from app.managers.vector_store import VectorStoreManager
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--batch-size", type=int, default=500, help="Number of documents read per page.")
+    args = parser.parse_args()
+
+    if not settings.LEXICAL_INDEX_ENABLED:
+        raise SystemExit("The lexical index is disabled, set LEXICAL_INDEX_ENABLED=true.")
+
+    vector_store_manager = VectorStoreManager(EmbeddingManager().get_embedding_model(), LanguageManager())
+    indexed = vector_store_manager.build_lexical_index(batch_size=args.batch_size)
+    print(f"Indexed {indexed} documents.")
+
+
+if __name__ == "__main__":
+    main()
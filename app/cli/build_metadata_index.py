@@ -0,0 +1,27 @@
+"""
+Index the authors and tags of every stored document, for collections created before the metadata index, so that the
+author and tag filters match them.
+
+Usage:
+    python -m app.cli.build_metadata_index [--batch-size 500]
+"""
+
+import argparse
+
+from app.managers.embedding import EmbeddingManager
+from app.managers.language import LanguageManager
+from app.managers.vector_store import VectorStoreManager
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--batch-size", type=int, default=500, help="Number of documents read per page.")
+    args = parser.parse_args()
+
+    vector_store_manager = VectorStoreManager(EmbeddingManager().get_embedding_model(), LanguageManager())
+    indexed = vector_store_manager.build_metadata_index(batch_size=args.batch_size)
+    print(f"Indexed {indexed} documents.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""
+Calibrate the similarity thresholds of the correlation filter against a labelled query set.
+
+The query set is a JSONL file with one object per line:
+    {"query": "...", "relevant": ["<document uuid>", ...]}
+
+Every query is run through the retriever, and each retrieved document is labelled relevant if its uuid is listed.
+The acceptance threshold is the lowest similarity above which the documents reach the target precision, and the
+rejection threshold is the highest similarity below which at most (1 - target) of the documents are relevant.
+
+Usage:
+    python -m app.cli.calibrate_thresholds queries.jsonl [--target 0.95]
+"""
+
+import argparse
+import asyncio
+import json
+from pathlib import Path
+
+from app.core.config import settings
+from app.managers.embedding import EmbeddingManager
+from app.managers.language import LanguageManager
+from app.managers.retriever import VectorDBRetriever
+from app.managers.vector_store import VectorStoreManager
+
+
+def calibrate(samples: list[tuple[float, bool]], target: float) -> tuple[float, float]:
+    """
+    Compute the acceptance and rejection thresholds from labelled similarity scores.
+
+    Returns:
+        A tuple with the acceptance and rejection thresholds.
+    """
+    ranked = sorted(samples, key=lambda sample: sample[0], reverse=True)
+
+    # Acceptance: walk down the ranking while the precision of everything above stays on target
+    accept_threshold = float("inf")
+    relevant = 0
+    for count, (score, is_relevant) in enumerate(ranked, start=1):
+        relevant += is_relevant
+        if relevant / count >= target:
+            accept_threshold = score
+
+    # Rejection: walk up the ranking while the share of relevant documents below stays under the tolerance
+    reject_threshold = float("-inf")
+    relevant = 0
+    for count, (score, is_relevant) in enumerate(reversed(ranked), start=1):
+        relevant += is_relevant
+        if relevant / count <= 1 - target:
+            reject_threshold = score
+
+    return accept_threshold, min(reject_threshold, accept_threshold)
+
+
+async def collect_samples(retriever: VectorDBRetriever, query_set: Path) -> list[tuple[float, bool]]:
+    """
+    Run every labelled query through the retriever.
+
+    Returns:
+        A list of (similarity, is_relevant) tuples.
+    """
+    samples = []
+    with query_set.open() as file:
+        for line in file:
+            if not line.strip():
+                continue
+            item = json.loads(line)
+            relevant = set(item["relevant"])
+            for doc in await retriever.retrieve_nodes(item["query"]):
+                samples.append((doc.similarity, doc.uuid in relevant))
+    return samples
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("query_set", type=Path, help="JSONL file with the labelled queries.")
+    parser.add_argument("--target", type=float, default=0.95, help="Target precision of the score decisions.")
+    parser.add_argument("--k", type=int, default=settings.DOCUMENT_TOP_K, help="Documents retrieved per query.")
+    args = parser.parse_args()
+
+    vector_store_manager = VectorStoreManager(EmbeddingManager().get_embedding_model(), LanguageManager())
+    retriever = vector_store_manager.get_retriever(k=args.k)
+
+    samples = asyncio.run(collect_samples(retriever, args.query_set))
+    if not samples:
+        raise SystemExit("The query set did not retrieve any document.")
+
+    accept_threshold, reject_threshold = calibrate(samples, args.target)
+    accepted = sum(score >= accept_threshold for score, _ in samples)
+    rejected = sum(score < reject_threshold for score, _ in samples)
+
+    print(f"Samples: {len(samples)} ({sum(is_relevant for _, is_relevant in samples)} relevant)")
+    print(
+        f"Decided by score: {accepted} accepted, {rejected} rejected, {len(samples) - accepted - rejected} to the LLM"
+    )
+    print(f"RETRIEVER_CONFIDENCE_THRESHOLD={accept_threshold}")
+    print(f"RETRIEVER_REJECTION_THRESHOLD={reject_threshold}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+"""
+Load an NDJSON or CSV corpus into the vector store in batches.
+
+Every line (NDJSON) or row (CSV, with a header) is a document with the fields of the POST /documents payload. After
+every batch a checkpoint with the record to resume from is written next to the input, so re-running the same
+command after an interruption continues where the previous run stopped. Failed batches are listed in the
+checkpoint and the summary.
+
+Usage:
+    python -m app.cli.ingest corpus.ndjson [--format csv] [--batch-size 512] [--concurrency 4] [--restart]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+from pathlib import Path
+from typing import Optional
+
+from app.core.config import settings
+from app.core.enums import IngestFormat
+from app.managers.embedding import EmbeddingManager
+from app.managers.ingest import IngestManager
+from app.managers.language import LanguageManager
+from app.managers.vector_store import VectorStoreManager
+
+
+def read_checkpoint(path: Path) -> dict:
+    """
+    Read the checkpoint of a previous run.
+
+    Returns:
+        A dictionary with the record to resume from and the failed batches.
+    """
+    if not path.exists():
+        return {"next_record": 0, "failed_batches": []}
+    return json.loads(path.read_text())
+
+
+def write_checkpoint(path: Path, checkpoint: dict) -> None:
+    """
+    Write the checkpoint atomically, so an interruption never leaves it half written.
+
+    Returns:
+        None
+    """
+    temporary_path = path.with_suffix(path.suffix + ".tmp")
+    temporary_path.write_text(json.dumps(checkpoint, indent=2))
+    os.replace(temporary_path, path)
+
+
+async def run(
+    ingest_manager: IngestManager, corpus: Path, ingest_format: IngestFormat, checkpoint_path: Path, restart: bool
+) -> None:
+    """
+    Ingest the corpus, printing the report of every batch and updating the checkpoint after each one.
+
+    Returns:
+        None
+    """
+    checkpoint = {"next_record": 0, "failed_batches": []} if restart else read_checkpoint(checkpoint_path)
+    skip = checkpoint["next_record"]
+    if skip:
+        print(f"Resuming from record {skip}.")
+
+    reports = []
+    with corpus.open(encoding="utf-8", newline="") as file:
+        records = IngestManager.read_records(file, ingest_format)
+        async for report in ingest_manager.ingest(records, skip=skip):
+            reports.append(report)
+            if report.error:
+                checkpoint["failed_batches"].append(
+                    {"first_record": report.first_record, "end_record": report.end_record, "error": report.error}
+                )
+            checkpoint["next_record"] = report.next_record
+            write_checkpoint(checkpoint_path, checkpoint)
+
+            status = f"FAILED: {report.error}" if report.error else "ok"
+            print(
+                f"batch {report.batch:>6} records {report.first_record:>9}-{report.end_record - 1:<9} "
+                f"inserted {report.inserted:>5} updated {report.updated:>5} skipped {report.skipped:>5} "
+                f"invalid {len(report.invalid):>4} {status}"
+            )
+            for invalid in report.invalid:
+                print(f"  record {invalid.record}: {invalid.error}")
+
+    summary = IngestManager.summarize(reports, skip=skip)
+    print(
+        f"Done: {summary.records} records, {summary.inserted} inserted, {summary.updated} updated, "
+        f"{summary.skipped} skipped, {summary.invalid} invalid, {summary.failed} in failed batches."
+    )
+    for failed in checkpoint["failed_batches"]:
+        print(f"Failed batch, records {failed['first_record']}-{failed['end_record'] - 1}: {failed['error']}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("corpus", type=Path, help="NDJSON or CSV file with the documents.")
+    parser.add_argument("--format", type=IngestFormat, default=None, help="Input format, inferred from the suffix.")
+    parser.add_argument("--batch-size", type=int, default=settings.INGEST_BATCH_SIZE)
+    parser.add_argument("--concurrency", type=int, default=settings.INGEST_MAX_CONCURRENCY)
+    parser.add_argument("--checkpoint", type=Path, default=None, help="Checkpoint file, next to the input by default.")
+    parser.add_argument("--restart", action="store_true", help="Ignore the checkpoint and load from the start.")
+    args = parser.parse_args()
+
+    ingest_format: Optional[IngestFormat] = args.format
+    if ingest_format is None:
+        ingest_format = IngestFormat.Csv if args.corpus.suffix.lower() == ".csv" else IngestFormat.Ndjson
+    checkpoint_path = args.checkpoint or args.corpus.with_name(args.corpus.name + ".checkpoint.json")
+
+    vector_store_manager = VectorStoreManager(EmbeddingManager().get_embedding_model(), LanguageManager())
+    ingest_manager = IngestManager(vector_store_manager, batch_size=args.batch_size, max_concurrency=args.concurrency)
+
+    asyncio.run(run(ingest_manager, args.corpus, ingest_format, checkpoint_path, args.restart))
+
+
+if __name__ == "__main__":
+    main()
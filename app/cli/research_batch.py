@@ -0,0 +1,60 @@
+"""
+Research many queries at once, in process, writing a JSON line per query with its response or its error.
+
+The input is a JSONL file with one research request per line:
+    {"query": "...", "mode": "merged"}
+
+The queries go through the same batched pipeline as POST /research/batch, with the managers started as the API
+starts them. The results are written in completion order and carry the position of their query in the file.
+
+Usage:
+    python -m app.cli.research_batch queries.jsonl [--output results.jsonl]
+"""
+
+import argparse
+import asyncio
+import sys
+from pathlib import Path
+from typing import Optional
+
+from starlette.requests import Request
+
+from app.business.research import ResearchManager
+from app.main import app, lifespan
+from app.schemas.research import ResearchBatchResult, ResearchRequest
+
+
+async def run(query_set: Path, output: Optional[Path]) -> int:
+    """
+    Start the managers and research every query of the set.
+
+    Returns:
+        The number of queries that failed.
+    """
+    with query_set.open() as file:
+        payloads = [ResearchRequest.model_validate_json(line) for line in file if line.strip()]
+
+    failed = 0
+    async with lifespan(app):
+        request = Request({"type": "http", "app": app})
+        with output.open("w") if output is not None else open(sys.stdout.fileno(), "w", closefd=False) as out:
+            async for line in ResearchManager.research_batch(payloads, request):
+                failed += ResearchBatchResult.model_validate_json(line).error is not None
+                out.write(line)
+                out.flush()
+    return failed
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("query_set", type=Path, help="JSONL file with the research requests.")
+    parser.add_argument("--output", type=Path, default=None, help="JSONL file for the results, stdout if not given.")
+    args = parser.parse_args()
+
+    failed = asyncio.run(run(args.query_set, args.output))
+    if failed:
+        raise SystemExit(f"{failed} queries failed.")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,10 +1,21 @@
 import logging
 from pathlib import Path
-from typing import Dict
+from typing import Dict, List, Optional
 
 from pydantic import Field
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
+from app.core.enums import (
+    ChunkAggregation,
+    DistanceSpace,
+    LatencyDistribution,
+    ModelBackend,
+    PipelineMode,
+    VectorPrecision,
+    VectorQuantization,
+    VectorStoreBackend,
+)
+
 logger = logging.getLogger("uvicorn")
 
 
@@ -35,10 +46,38 @@ class Settings(BaseSettings):
     # General
     DATABASE_PATH: Path = Field(default=Path("./data/llama.db"), description="Path to the database file.")
     COLLECTION_NAME: str = Field(default="research-assistant", description="Name of the collection.")
+    METADATA_INDEX_PATH: Path = Field(
+        default=Path("./data/metadata_index.db"),
+        description="Path to the inverted index of the document authors and tags the filters are resolved with.",
+    )
     MODELS_PATH: Path = Field(default=Path("./app/models/"), description="Path to the models directory.")
 
     # Embeddings model
     EMBED_MODEL_NAME: str = Field(default="text-embedding-3-large", description="Name of the embedding model.")
+    EMBED_BATCH_SIZE: int = Field(
+        default=2048, description="Maximum number of texts per embedding request, as accepted by the provider."
+    )
+    EMBED_DIMENSIONS: Optional[int] = Field(
+        default=None,
+        description="Number of leading (Matryoshka) dimensions requested from the embedding model, all if unset. "
+        "Changing it requires ingesting the collections again.",
+    )
+
+    # Embedding cache configuration
+    EMBEDDING_CACHE_ENABLED: bool = Field(default=True, description="Whether to cache the query embeddings.")
+    EMBEDDING_CACHE_SIZE: int = Field(
+        default=4096, description="Number of query embeddings kept in the in-process LRU of each worker."
+    )
+    EMBEDDING_CACHE_DISK_ENABLED: bool = Field(
+        default=False, description="Whether to share the query embeddings between workers through a memory-mapped file."
+    )
+    EMBEDDING_CACHE_PATH: Path = Field(
+        default=Path("./data/embedding_cache"), description="Directory of the memory-mapped embedding cache."
+    )
+    EMBEDDING_CACHE_DISK_SLOTS: int = Field(
+        default=16384,
+        description="Number of query embeddings kept in the memory-mapped ring before the oldest are reused.",
+    )
 
     # OpenAI model
     OPENAI_GENERATOR_MODEL: str = Field(
@@ -51,13 +90,195 @@ class Settings(BaseSettings):
     )
     OPENAI_API_KEY: str = Field(default="", description="API key for OpenAI access.")
 
+    # Model backends, the fake ones run locally and deterministically for benchmarks and offline development
+    LLM_BACKEND: ModelBackend = Field(default=ModelBackend.OpenAI, description="Backend of the chat models.")
+    EMBEDDING_BACKEND: ModelBackend = Field(default=ModelBackend.OpenAI, description="Backend of the embedding model.")
+    FAKE_LLM_LATENCY: float = Field(default=0.0, description="Median latency of a fake chat model call in seconds.")
+    FAKE_LLM_LATENCY_SPREAD: float = Field(
+        default=0.0,
+        description="Half-width of the uniform latency distribution, or sigma of the log-normal one, of the fake chat "
+        "model.",
+    )
+    FAKE_LLM_LATENCY_DISTRIBUTION: LatencyDistribution = Field(
+        default=LatencyDistribution.Constant, description="Latency distribution of the fake chat model."
+    )
+    FAKE_LLM_SEED: int = Field(default=0, description="Seed of the latencies drawn by the fake chat model.")
+    FAKE_EMBEDDING_DIMENSIONS: int = Field(default=256, description="Dimensions of the fake embeddings.")
+    FAKE_EMBEDDING_LATENCY: float = Field(default=0.0, description="Latency of a fake embedding call in seconds.")
+
+    # OpenAI client configuration, shared by every model of a worker
+    OPENAI_MAX_CONNECTIONS: int = Field(default=64, description="Maximum number of connections to the OpenAI API.")
+    OPENAI_HTTP2: bool = Field(
+        default=True, description="Whether to use HTTP/2 for the OpenAI API, if the h2 package is installed."
+    )
+    OPENAI_TIMEOUT: float = Field(default=60.0, description="Timeout of the OpenAI requests in seconds.")
+    OPENAI_MAX_RETRIES: int = Field(default=2, description="Maximum number of retries of a failed OpenAI request.")
+    OPENAI_REQUESTS_PER_MINUTE: int = Field(
+        default=0, description="Requests per minute each worker may send to the OpenAI API, 0 for no limit."
+    )
+    OPENAI_TOKENS_PER_MINUTE: int = Field(
+        default=0, description="Tokens per minute each worker may send to the OpenAI API, 0 for no limit."
+    )
+    OPENAI_COMPLETION_TOKENS_ESTIMATE: int = Field(
+        default=1024, description="Completion tokens counted against the limit for requests without a maximum."
+    )
+
+    # Research pipeline configuration
+    RESEARCH_MAX_CONCURRENCY: int = Field(
+        default=4, description="Maximum number of LLM calls in flight per research request."
+    )
+    RESEARCH_BATCH_SIZE: int = Field(
+        default=64, description="Number of batch research queries embedded and searched together."
+    )
+    RESEARCH_BATCH_MAX_CONCURRENCY: int = Field(
+        default=16, description="Maximum number of LLM calls in flight across all the queries of a batch research."
+    )
+    PIPELINE_MODE: PipelineMode = Field(
+        default=PipelineMode.Separate,
+        description="Default pipeline mode: a correlation call followed by a comparison call (separate), or a "
+        "single call judging and comparing the documents (merged).",
+    )
+
     # Vector store configuration
-    CHUNK_SIZE: int = Field(default=128, description="Size of text chunks for processing.")
-    CHUNK_OVERLAP: int = Field(default=50, description="Overlap size between text chunks.")
-    NODE_TOP_K: int = Field(default=20, description="Number of top nodes to retrieve.")
+    VECTOR_STORE_BACKEND: VectorStoreBackend = Field(
+        default=VectorStoreBackend.Chroma,
+        description="Storage of the collections: the embedded Chroma database (chroma), or memory-mapped matrices "
+        "shared by the workers and searched exactly (numpy).",
+    )
+    NUMPY_VECTOR_PRECISION: VectorPrecision = Field(
+        default=VectorPrecision.Float32, description="Precision of the vectors of newly created NumPy collections."
+    )
+    NUMPY_SEARCH_BLOCK_SIZE: int = Field(
+        default=16384, description="Number of vectors of a NumPy collection scored per matrix product of a search."
+    )
+    NUMPY_QUANTIZATION: VectorQuantization = Field(
+        default=VectorQuantization.Disabled,
+        description="Compact codes the NumPy collections are scanned with before re-ranking the best candidates with "
+        "the full-precision vectors: none, int8 scalar quantization or binary sign codes.",
+    )
+    NUMPY_CODE_DIMENSIONS: Optional[int] = Field(
+        default=None,
+        description="Leading (Matryoshka) dimensions of the embeddings kept in the quantized codes, all if unset.",
+    )
+    NUMPY_RERANK_CANDIDATES: int = Field(
+        default=10, description="Candidates found with the quantized codes and re-ranked per requested result."
+    )
+    VECTOR_DISTANCE_SPACE: DistanceSpace = Field(
+        default=DistanceSpace.Cosine, description="Distance space of newly created collections."
+    )
+    CHUNK_SIZE: int = Field(
+        default=512, description="Maximum size in characters of the abstract chunks, a few sentences each."
+    )
+    CHUNK_OVERLAP: int = Field(default=100, description="Overlap in characters between consecutive abstract chunks.")
+    NODE_TOP_K: int = Field(
+        default=20,
+        description="Number of chunks retrieved for DOCUMENT_TOP_K documents, scaled with the number of documents "
+        "requested and widened until they cover it.",
+    )
+    CHUNKED_INDEX: bool = Field(
+        default=False, description="Whether to index abstract chunks and retrieve documents through them."
+    )
+    CHUNK_AGGREGATION: ChunkAggregation = Field(
+        default=ChunkAggregation.Max, description="How chunk scores are aggregated into a document score."
+    )
+    CHUNK_AGGREGATION_TOP_M: int = Field(
+        default=2, description="Number of best chunks summed per document with the sum aggregation."
+    )
     DOCUMENT_TOP_K: int = Field(default=3, description="Number of top documents to retrieve.")
+    LEXICAL_INDEX_ENABLED: bool = Field(
+        default=False,
+        description="Whether to maintain a BM25 index of the titles and abstracts, for the lexical document search "
+        "and the hybrid retrieval.",
+    )
+    LEXICAL_INDEX_PATH: Path = Field(
+        default=Path("./data/lexical_index.db"), description="Path to the BM25 index database."
+    )
+    HYBRID_RETRIEVAL: bool = Field(
+        default=False,
+        description="Whether the research retrieval fuses the BM25 ranking with the vector ranking, which requires "
+        "the lexical index.",
+    )
+    HYBRID_CANDIDATES: int = Field(
+        default=20, description="Number of documents taken from each ranking before the reciprocal rank fusion."
+    )
+    RRF_K: int = Field(default=60, description="Rank offset of the reciprocal rank fusion, 1 / (RRF_K + rank).")
+    MMR_ENABLED: bool = Field(
+        default=False,
+        description="Whether the retrieved documents are diversified by maximal marginal relevance, so that near "
+        "duplicates, like several preprints of a paper, do not take the place of other documents.",
+    )
+    MMR_LAMBDA: float = Field(
+        default=0.7,
+        description="Trade-off of the maximal marginal relevance between relevance to the query (1) and diversity (0).",
+    )
+    MMR_FETCH_FACTOR: int = Field(
+        default=4, description="Candidates retrieved per document before the maximal marginal relevance selection."
+    )
     QUERY_MODE: str = Field(default="default", description="Mode for querying.")
-    RETRIEVER_CONFIDENCE_THRESHOLD: float = Field(default=0.7, description="Confidence threshold for retriever.")
+    RETRIEVER_CONFIDENCE_THRESHOLD: float = Field(
+        default=0.7,
+        description="Cosine similarity above which retrieved documents are accepted without the LLM correlation filter.",
+    )
+    RETRIEVER_REJECTION_THRESHOLD: float = Field(
+        default=0.0,
+        description="Cosine similarity below which retrieved documents are rejected without the LLM correlation filter.",
+    )
+
+    # Bulk ingestion configuration
+    INGEST_BATCH_SIZE: int = Field(default=512, description="Number of documents embedded and written per batch.")
+    INGEST_MAX_CONCURRENCY: int = Field(default=4, description="Maximum number of ingestion batches in flight.")
+    INGEST_SPOOL_SIZE: int = Field(
+        default=64 * 1024 * 1024, description="Bytes of a bulk upload kept in memory before spooling it to disk."
+    )
+
+    # Instrumentation configuration
+    METRICS_ENABLED: bool = Field(
+        default=True, description="Whether to record the stage timers and send the Server-Timing header."
+    )
+    TRACING_ENABLED: bool = Field(
+        default=False, description="Whether to trace the stages as OpenTelemetry spans, if opentelemetry is installed."
+    )
+    OPENAI_MODEL_PRICES: Dict[str, List[float]] = Field(
+        default={"gpt-4o-mini": [0.15, 0.6], "gpt-4o": [2.5, 10.0]},
+        description="USD per million prompt and completion tokens of the OpenAI models, matched by name prefix.",
+    )
+
+    # Document listing configuration
+    DOCUMENTS_PAGE_SIZE: int = Field(default=100, description="Number of documents per page when no limit is given.")
+    DOCUMENTS_MAX_PAGE_SIZE: int = Field(default=1000, description="Maximum number of documents per page.")
+    DOCUMENTS_EXPORT_PAGE_SIZE: int = Field(
+        default=500, description="Number of documents read from the vector store per page of an export."
+    )
+    DOCUMENTS_BULK_PAGE_SIZE: int = Field(
+        default=500, description="Number of documents read or deleted per vector store call of a bulk operation."
+    )
+
+    # Translation cache configuration
+    TRANSLATION_CACHE_ENABLED: bool = Field(default=True, description="Whether to cache document translations.")
+    TRANSLATION_CACHE_PATH: Path = Field(
+        default=Path("./data/translation_cache.db"), description="Path to the translation cache database."
+    )
+    TRANSLATION_CACHE_SIZE: int = Field(
+        default=1024, description="Number of translations kept in the in-process LRU of each worker."
+    )
+
+    # Semantic cache configuration
+    SEMANTIC_CACHE_ENABLED: bool = Field(default=True, description="Whether to cache research responses by query.")
+    SEMANTIC_CACHE_THRESHOLD: float = Field(
+        default=0.97, description="Cosine similarity above which a previous query of the same language is reused."
+    )
+    SEMANTIC_CACHE_SIZE: int = Field(default=512, description="Number of research responses cached by each worker.")
+    SEMANTIC_CACHE_TTL: float = Field(default=3600.0, description="Seconds a cached research response stays valid.")
+
+    # Request coalescing configuration
+    SINGLE_FLIGHT_ENABLED: bool = Field(
+        default=True, description="Whether concurrent identical calls wait on a single in-flight computation."
+    )
+    SINGLE_FLIGHT_LOCK_PATH: Optional[Path] = Field(
+        default=None,
+        description="Directory of the lock files that coalesce the cached calls across the workers of a host. "
+        "Coalescing is limited to each worker when unset.",
+    )
 
     # Language model configuration
     FASTTEXT_MODEL: str = Field(default="lid.176.ftz", description="Path to the FastText model file.")
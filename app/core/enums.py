@@ -9,3 +9,111 @@ class ServiceAvailability(Enum):
 
     Up = "UP"
     Down = "DOWN"
+
+
+class DistanceSpace(Enum):
+
+    """
+    The distance functions a collection can be indexed with.
+    """
+
+    Cosine = "cosine"
+    L2 = "l2"
+    InnerProduct = "ip"
+
+
+class ChunkAggregation(Enum):
+
+    """
+    The ways chunk scores can be aggregated into a document score.
+    """
+
+    Max = "max"
+    SumTopM = "sum"
+
+
+class IngestFormat(Enum):
+
+    """
+    The formats accepted by the bulk ingestion.
+    """
+
+    Ndjson = "ndjson"
+    Csv = "csv"
+
+
+class PipelineMode(Enum):
+
+    """
+    The ways the research pipeline can filter and compare the retrieved documents.
+    """
+
+    Separate = "separate"
+    Merged = "merged"
+
+
+class DocumentField(Enum):
+
+    """
+    The document fields a listing can be projected on.
+    """
+
+    Uuid = "uuid"
+    Title = "title"
+    Abstract = "abstract"
+    Authors = "authors"
+    Language = "language"
+    Tags = "tags"
+    IngestedAt = "ingested_at"
+
+
+class ModelBackend(Enum):
+
+    """
+    The backends the chat and embedding models can be served by.
+    """
+
+    OpenAI = "openai"
+    Fake = "fake"
+
+
+class LatencyDistribution(Enum):
+
+    """
+    The distributions the latency of the fake chat model can be drawn from.
+    """
+
+    Constant = "constant"
+    Uniform = "uniform"
+    LogNormal = "lognormal"
+
+
+class VectorStoreBackend(Enum):
+
+    """
+    The backends the document and chunk collections can be stored in.
+    """
+
+    Chroma = "chroma"
+    Numpy = "numpy"
+
+
+class VectorPrecision(Enum):
+
+    """
+    The precisions the vectors of a NumPy collection can be stored in.
+    """
+
+    Float32 = "float32"
+    Float16 = "float16"
+
+
+class VectorQuantization(Enum):
+
+    """
+    The compact codes a NumPy collection can be scanned with before re-ranking with the full-precision vectors.
+    """
+
+    Disabled = "none"
+    Int8 = "int8"
+    Binary = "binary"
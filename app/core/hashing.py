@@ -0,0 +1,23 @@
+import hashlib
+import unicodedata
+
+
+def normalize_text(text: str) -> str:
+    """
+    Normalize a text so that formatting-only differences do not change its hash.
+
+    Returns:
+        The NFC-normalized text with collapsed whitespace.
+    """
+    return " ".join(unicodedata.normalize("NFC", text).split())
+
+
+def document_content_hash(title: str, abstract: str) -> str:
+    """
+    Hash the content of a document.
+
+    Returns:
+        The hex SHA-256 digest of the normalized title and abstract.
+    """
+    content = f"{normalize_text(title)}\n{normalize_text(abstract)}"
+    return hashlib.sha256(content.encode("utf-8")).hexdigest()
@@ -0,0 +1,227 @@
+import bisect
+import threading
+import time
+from contextvars import ContextVar
+from typing import Dict, Iterable, Optional
+
+from app.core.config import settings
+
+try:
+    from opentelemetry import trace
+except ImportError:  # pragma: no cover - optional dependency
+    trace = None
+
+# Upper bounds of the latency buckets, wide enough for LLM calls
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+def _format_labels(names: tuple[str, ...], values: tuple[str, ...], extra: str = "") -> str:
+    labels = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        labels.append(extra)
+    return "{" + ",".join(labels) + "}" if labels else ""
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+class Counter:
+
+    """
+    A Prometheus counter, with one monotonically increasing value per combination of label values.
+    """
+
+    kind = "counter"
+
+    def __init__(self, name: str, description: str, labels: tuple[str, ...] = ()):
+        self.name = name
+        self.description = description
+        self.labels = labels
+        self.values: Dict[tuple[str, ...], float] = {}
+        self.lock = threading.Lock()
+
+    def inc(self, *label_values: str, amount: float = 1.0) -> None:
+        """
+        Increase the value of the given labels.
+
+        Returns:
+            None
+        """
+        with self.lock:
+            self.values[label_values] = self.values.get(label_values, 0.0) + amount
+
+    def get(self, *label_values: str) -> float:
+        """
+        Get the value of the given labels.
+
+        Returns:
+            The value, 0 if the labels were never increased.
+        """
+        with self.lock:
+            return self.values.get(label_values, 0.0)
+
+    def samples(self) -> Iterable[str]:
+        with self.lock:
+            values = list(self.values.items())
+        for label_values, value in values:
+            yield f"{self.name}{_format_labels(self.labels, label_values)} {value}"
+
+
+class Histogram:
+
+    """
+    A Prometheus histogram, with cumulative bucket counts, a sum and a count per combination of label values.
+    """
+
+    kind = "histogram"
+
+    def __init__(
+        self, name: str, description: str, labels: tuple[str, ...] = (), buckets: tuple[float, ...] = LATENCY_BUCKETS
+    ):
+        self.name = name
+        self.description = description
+        self.labels = labels
+        self.buckets = buckets
+        # Per label values: the count of every bucket (the last one being +Inf), and the sum
+        self.values: Dict[tuple[str, ...], tuple[list[int], list[float]]] = {}
+        self.lock = threading.Lock()
+
+    def observe(self, value: float, *label_values: str) -> None:
+        """
+        Record a value for the given labels.
+
+        Returns:
+            None
+        """
+        with self.lock:
+            counts, total = self.values.setdefault(label_values, ([0] * (len(self.buckets) + 1), [0.0]))
+            counts[bisect.bisect_left(self.buckets, value)] += 1
+            total[0] += value
+
+    def samples(self) -> Iterable[str]:
+        with self.lock:
+            values = [(label_values, list(counts), total[0]) for label_values, (counts, total) in self.values.items()]
+        for label_values, counts, total in values:
+            cumulative = 0
+            for bound, count in zip([*map(str, self.buckets), "+Inf"], counts):
+                cumulative += count
+                bucket = f'le="{bound}"'
+                yield f"{self.name}_bucket{_format_labels(self.labels, label_values, bucket)} {cumulative}"
+            yield f"{self.name}_sum{_format_labels(self.labels, label_values)} {total}"
+            yield f"{self.name}_count{_format_labels(self.labels, label_values)} {cumulative}"
+
+
+class MetricsRegistry:
+
+    """
+    The metrics of a worker, rendered in the Prometheus text exposition format.
+    """
+
+    def __init__(self):
+        self.metrics: list = []
+
+    def register(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        """
+        Render every registered metric.
+
+        Returns:
+            The metrics in the Prometheus text format.
+        """
+        lines = []
+        for metric in self.metrics:
+            lines.append(f"# HELP {metric.name} {metric.description}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.samples())
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
+stage_seconds = registry.register(
+    Histogram("research_assistant_stage_seconds", "Latency of the research pipeline stages.", ("stage",))
+)
+http_request_seconds = registry.register(
+    Histogram(
+        "research_assistant_http_request_seconds",
+        "Latency of the HTTP requests, until the response starts.",
+        ("method", "route", "status"),
+    )
+)
+llm_calls = registry.register(Counter("research_assistant_llm_calls_total", "LLM calls.", ("model", "purpose")))
+llm_tokens = registry.register(
+    Counter("research_assistant_llm_tokens_total", "Tokens of the LLM calls.", ("model", "purpose", "kind"))
+)
+llm_cost = registry.register(
+    Counter("research_assistant_llm_cost_usd_total", "Estimated cost of the LLM calls in USD.", ("model", "purpose"))
+)
+correlation_checks = registry.register(
+    Counter(
+        "research_assistant_correlation_checks_total",
+        "Correlation checks, by whether the LLM judge was called.",
+        ("llm_called",),
+    )
+)
+correlation_documents = registry.register(
+    Counter(
+        "research_assistant_correlation_documents_total",
+        "Documents checked by the correlation filter, by decision.",
+        ("decision",),
+    )
+)
+
+# Durations of the stages of the request being served, read by the Server-Timing middleware
+server_timings: ContextVar[Optional[Dict[str, list[float]]]] = ContextVar("server_timings", default=None)
+tracer = trace.get_tracer("research-assistant") if trace is not None and settings.TRACING_ENABLED else None
+
+
+class StageTimer:
+
+    """
+    A timer of a pipeline stage, usable as a sync or async context manager.
+
+    The duration is recorded in the stage histogram and in the Server-Timing entries of the current request, and
+    the stage is traced as an OpenTelemetry span when tracing is enabled.
+    """
+
+    __slots__ = ("name", "started_at", "span")
+
+    def __init__(self, name: str):
+        self.name = name
+        self.span = None
+
+    def __enter__(self) -> "StageTimer":
+        if tracer is not None:
+            self.span = tracer.start_as_current_span(self.name)
+            self.span.__enter__()
+        self.started_at = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, traceback) -> None:
+        duration = time.perf_counter() - self.started_at
+        if settings.METRICS_ENABLED:
+            stage_seconds.observe(duration, self.name)
+            timings = server_timings.get()
+            if timings is not None:
+                timings.setdefault(self.name, []).append(duration)
+        if self.span is not None:
+            self.span.__exit__(exc_type, exc, traceback)
+
+    async def __aenter__(self) -> "StageTimer":
+        return self.__enter__()
+
+    async def __aexit__(self, exc_type, exc, traceback) -> None:
+        self.__exit__(exc_type, exc, traceback)
+
+
+def stage(name: str) -> StageTimer:
+    """
+    Time a pipeline stage, e.g. `async with stage("vector_search"): ...`.
+
+    Returns:
+        A StageTimer instance.
+    """
+    return StageTimer(name)
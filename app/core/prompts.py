@@ -0,0 +1,27 @@
+from typing import List
+
+from app.schemas.research import ResearchResponseDocument
+
+
+def build_documents_prompt(query_str: str, docs: List[ResearchResponseDocument], excerpts: bool = False) -> str:
+    """
+    Build the listing of the user query and the retrieved documents shared by the LLM prompts.
+
+    The documents are numbered from 1. With excerpts, the documents retrieved through the chunked index are
+    described by their matching chunks instead of the whole abstract.
+
+    Returns:
+        A formatted prompt string with the query and the documents.
+    """
+    doc_descriptions = "\n".join(
+        f"Index {index+1}: Title: '{doc.title}'\n"
+        + (
+            f"Excerpts: {' [...] '.join(doc.matched_chunks)}"
+            if excerpts and doc.matched_chunks
+            else f"Abstract: {doc.abstract}"
+        )
+        for index, doc in enumerate(docs)
+    )
+
+    prompt = "User Query:\n" f'"{query_str}"\n\n' "Retrieved Documents:\n" f"{doc_descriptions}\n\n"
+    return prompt
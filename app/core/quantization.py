@@ -0,0 +1,81 @@
+import numpy as np
+
+from app.core.enums import VectorQuantization
+
+# Number of set bits of every 16-bit word, to count the differing bits of binary codes
+POPCOUNT_16 = np.unpackbits(np.arange(1 << 16, dtype=np.uint16).view(np.uint8)).reshape(-1, 16).sum(1, np.uint8)
+
+
+def code_shape(quantization: VectorQuantization, dimensions: int) -> tuple[int, np.dtype]:
+    """
+    Get the width and type of the codes of vectors truncated to the given dimensions.
+
+    Binary codes pack the signs of the dimensions in 16-bit words, the padding bits being always zero.
+
+    Returns:
+        A tuple with the number of columns and the dtype of the codes.
+    """
+    if quantization is VectorQuantization.Binary:
+        return -(-dimensions // 16), np.dtype(np.uint16)
+    return dimensions, np.dtype(np.int8)
+
+
+def truncate(vectors: np.ndarray, dimensions: int) -> np.ndarray:
+    """
+    Keep the leading dimensions of vectors and normalize them again.
+
+    Models trained with Matryoshka representation learning, like text-embedding-3, concentrate the information in
+    the leading dimensions, so the truncated vectors stay close to the embeddings of the same model requested with
+    fewer dimensions.
+
+    Returns:
+        The truncated float32 vectors, with unit length.
+    """
+    vectors = np.asarray(vectors, dtype=np.float32)[:, :dimensions]
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.maximum(norms, np.finfo(np.float32).tiny)
+
+
+def encode(quantization: VectorQuantization, vectors: np.ndarray, dimensions: int) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Quantize vectors truncated to the given dimensions.
+
+    The int8 codes scale every vector so that its largest component maps to 127, and keep the scale, so the inner
+    product of a query with a vector is the one with its code times its scale. The binary codes keep the sign of
+    every dimension.
+
+    Returns:
+        A tuple with the codes and the float32 scales of the vectors, ones for binary codes.
+    """
+    vectors = truncate(vectors, dimensions)
+    scales = np.ones(len(vectors), dtype=np.float32)
+    if quantization is VectorQuantization.Binary:
+        width, _ = code_shape(quantization, dimensions)
+        bits = np.zeros((len(vectors), width * 16), dtype=bool)
+        bits[:, :dimensions] = vectors > 0
+        return np.packbits(bits, axis=1).view(np.uint16), scales
+
+    scales = np.maximum(np.abs(vectors).max(axis=1), np.finfo(np.float32).tiny) / 127
+    return np.rint(vectors / scales[:, None]).astype(np.int8), scales.astype(np.float32)
+
+
+def code_scores(
+    quantization: VectorQuantization, queries: np.ndarray, codes: np.ndarray, scales: np.ndarray
+) -> np.ndarray:
+    """
+    Score a block of codes against truncated queries, higher is closer.
+
+    The int8 score approximates the inner product. The binary score is the negated Hamming distance between the
+    sign codes, computed one query at a time so that the memory stays bounded by the block.
+
+    Returns:
+        An array with the score of every code for every query.
+    """
+    if quantization is VectorQuantization.Binary:
+        query_codes, _ = encode(quantization, queries, queries.shape[1])
+        scores = np.empty((len(queries), len(codes)), dtype=np.float32)
+        for index, query_code in enumerate(query_codes):
+            scores[index] = -POPCOUNT_16[codes ^ query_code].sum(axis=1, dtype=np.int32)
+        return scores
+
+    return (queries @ codes.T.astype(np.float32)) * scales
@@ -0,0 +1,225 @@
+import asyncio
+import re
+import threading
+import time
+from typing import Mapping, Optional
+
+from app.schemas.stats import RateLimiterStats
+
+# Longest pause applied after a rate-limited response that does not say when to retry
+MAX_BACKOFF = 60.0
+
+
+def parse_reset(value: Optional[str]) -> Optional[float]:
+    """
+    Parse a rate limit reset duration as sent by OpenAI, e.g. "20ms", "1s" or "6m0s".
+
+    Returns:
+        The duration in seconds, or None if the value is missing or not a duration.
+    """
+    if not value:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        pass
+
+    units = {"ms": 0.001, "s": 1.0, "m": 60.0, "h": 3600.0}
+    parts = re.findall(r"(\d+(?:\.\d+)?)(ms|h|m|s)", value)
+    if not parts:
+        return None
+    return sum(float(amount) * units[unit] for amount, unit in parts)
+
+
+def retry_after(headers: Mapping[str, str]) -> Optional[float]:
+    """
+    Get the time to wait before retrying a rate-limited request, from the retry-after or the rate limit headers.
+
+    Returns:
+        The seconds to wait, or None if the headers do not say.
+    """
+    retry_after_ms = parse_reset(headers.get("retry-after-ms"))
+    if retry_after_ms is not None:
+        return retry_after_ms / 1000
+    resets = [
+        parse_reset(headers.get(header))
+        for header in ("retry-after", "x-ratelimit-reset-requests", "x-ratelimit-reset-tokens")
+    ]
+    return next((reset for reset in resets if reset is not None), None)
+
+
+class TokenBucket:
+
+    """
+    A token bucket refilled continuously up to a per-minute capacity.
+
+    Reservations are taken even when the bucket is short, leaving it in debt: the caller waits the time the bucket
+    takes to refill the debt, so the callers are served in reservation order without polling.
+    """
+
+    def __init__(self, per_minute: int):
+        self.capacity = float(per_minute)
+        self.rate = per_minute / 60.0
+        self.level = self.capacity
+        self.updated_at = time.monotonic()
+
+    def _refill(self, now: float) -> None:
+        self.level = min(self.capacity, self.level + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+    def reserve(self, amount: float, now: float) -> float:
+        """
+        Take an amount from the bucket.
+
+        Returns:
+            The seconds to wait before the amount is available.
+        """
+        self._refill(now)
+        self.level -= min(amount, self.capacity)
+        return max(0.0, -self.level / self.rate)
+
+    def limit(self, remaining: float, now: float) -> None:
+        """
+        Lower the level to the remaining amount reported by the server, which also counts the other workers.
+
+        Returns:
+            None
+        """
+        self._refill(now)
+        self.level = min(self.level, remaining)
+
+
+class RateLimiter:
+
+    """
+    A limiter of the requests and tokens per minute sent to a rate-limited API, shared by the sync and async callers.
+
+    Besides the local token buckets, the rate limit headers of the responses drive an adaptive backoff: when the
+    server reports that a limit is exhausted or rejects a request with a 429, every request waits until the
+    reported reset time, or an exponential backoff when there is none.
+    """
+
+    def __init__(self, requests_per_minute: int = 0, tokens_per_minute: int = 0):
+        self.requests = TokenBucket(requests_per_minute) if requests_per_minute > 0 else None
+        self.tokens = TokenBucket(tokens_per_minute) if tokens_per_minute > 0 else None
+        self.lock = threading.Lock()
+        self.paused_until = 0.0
+        self.backoff = 0.0
+
+        self.total_requests = 0
+        self.queue_depth = 0
+        self.max_queue_depth = 0
+        self.waits = 0
+        self.wait_seconds = 0.0
+        self.max_wait_seconds = 0.0
+        self.rate_limited = 0
+        self.backoff_seconds = 0.0
+
+    def _reserve(self, tokens: int) -> float:
+        """
+        Reserve a request and its tokens, registering the caller in the queue if it has to wait.
+
+        Returns:
+            The seconds to wait before sending the request.
+        """
+        with self.lock:
+            now = time.monotonic()
+            delay = max(0.0, self.paused_until - now)
+            if self.requests is not None:
+                delay = max(delay, self.requests.reserve(1, now))
+            if self.tokens is not None:
+                delay = max(delay, self.tokens.reserve(tokens, now))
+
+            self.total_requests += 1
+            if delay > 0:
+                self.queue_depth += 1
+                self.max_queue_depth = max(self.max_queue_depth, self.queue_depth)
+            return delay
+
+    def _waited(self, delay: float) -> None:
+        with self.lock:
+            self.queue_depth -= 1
+            self.waits += 1
+            self.wait_seconds += delay
+            self.max_wait_seconds = max(self.max_wait_seconds, delay)
+
+    async def acquire(self, tokens: int) -> None:
+        """
+        Wait until a request with the given number of tokens can be sent.
+
+        Returns:
+            None
+        """
+        delay = self._reserve(tokens)
+        if delay > 0:
+            try:
+                await asyncio.sleep(delay)
+            finally:
+                self._waited(delay)
+
+    def acquire_sync(self, tokens: int) -> None:
+        """
+        Block until a request with the given number of tokens can be sent.
+
+        Returns:
+            None
+        """
+        delay = self._reserve(tokens)
+        if delay > 0:
+            try:
+                time.sleep(delay)
+            finally:
+                self._waited(delay)
+
+    def observe(self, status_code: int, headers: Mapping[str, str]) -> None:
+        """
+        Adapt the limiter to the rate limit headers of a response.
+
+        Returns:
+            None
+        """
+        with self.lock:
+            now = time.monotonic()
+            remaining_requests = headers.get("x-ratelimit-remaining-requests")
+            remaining_tokens = headers.get("x-ratelimit-remaining-tokens")
+            if self.requests is not None and remaining_requests is not None and remaining_requests.isdigit():
+                self.requests.limit(float(remaining_requests), now)
+            if self.tokens is not None and remaining_tokens is not None and remaining_tokens.isdigit():
+                self.tokens.limit(float(remaining_tokens), now)
+
+            pause = None
+            if status_code == 429:
+                self.rate_limited += 1
+                pause = retry_after(headers)
+                if not pause:
+                    self.backoff = min(MAX_BACKOFF, max(1.0, self.backoff * 2))
+                    pause = self.backoff
+            else:
+                self.backoff = 0.0
+                if remaining_requests == "0":
+                    pause = parse_reset(headers.get("x-ratelimit-reset-requests"))
+                elif remaining_tokens == "0":
+                    pause = parse_reset(headers.get("x-ratelimit-reset-tokens"))
+
+            if pause and now + pause > self.paused_until:
+                self.backoff_seconds += now + pause - max(self.paused_until, now)
+                self.paused_until = now + pause
+
+    def stats(self) -> RateLimiterStats:
+        """
+        Get the counters of the limiter in this worker.
+
+        Returns:
+            A RateLimiterStats instance.
+        """
+        with self.lock:
+            return RateLimiterStats(
+                requests=self.total_requests,
+                queue_depth=self.queue_depth,
+                max_queue_depth=self.max_queue_depth,
+                waits=self.waits,
+                mean_wait_seconds=self.wait_seconds / self.waits if self.waits else 0.0,
+                max_wait_seconds=self.max_wait_seconds,
+                rate_limited=self.rate_limited,
+                backoff_seconds=self.backoff_seconds,
+            )
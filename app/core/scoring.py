@@ -0,0 +1,72 @@
+import numpy as np
+
+from app.core.enums import DistanceSpace
+
+
+def distances_to_relevance(distances: np.ndarray, space: DistanceSpace) -> np.ndarray:
+    """
+    Convert a batch of Chroma distances to a relevance score.
+
+    The embeddings are unit-normalized, so every distance space Chroma supports maps back to the cosine similarity
+    between the query and the document, which is used as the relevance score:
+        - cosine: d = 1 - cos
+        - l2 (squared euclidean): d = 2 - 2 * cos
+        - ip: d = 1 - <q, v> = 1 - cos
+
+    Returns:
+        An array with the cosine similarities, clipped to [-1, 1], in the same order as the distances.
+    """
+    distances = np.asarray(distances, dtype=np.float32)
+    if space is DistanceSpace.L2:
+        similarities = 1.0 - distances / 2.0
+    else:
+        similarities = 1.0 - distances
+    return np.clip(similarities, -1.0, 1.0)
+
+
+def cosine_similarities(query: np.ndarray, matrix: np.ndarray) -> np.ndarray:
+    """
+    Compute the cosine similarity between a query vector and every row of a matrix.
+
+    Returns:
+        An array with one similarity per row of the matrix.
+    """
+    query = np.asarray(query, dtype=np.float32)
+    matrix = np.asarray(matrix, dtype=np.float32)
+    norms = np.linalg.norm(matrix, axis=1) * np.linalg.norm(query)
+    return matrix @ query / np.maximum(norms, np.finfo(np.float32).tiny)
+
+
+def maximal_marginal_relevance(
+    similarities: np.ndarray, embeddings: np.ndarray, k: int, lambda_mult: float
+) -> list[int]:
+    """
+    Select k diverse items among candidates by maximal marginal relevance.
+
+    Items are picked greedily, each maximizing lambda_mult * sim(query, item) - (1 - lambda_mult) * max sim(item,
+    picked), so an item close to one already picked, like another preprint of the same paper, loses to a less similar
+    but new one. The pairwise similarities are computed with a single matrix product, and the redundancy of every
+    candidate is updated in place after each pick.
+
+    Returns:
+        The positions of the selected candidates, in the order they were picked.
+    """
+    similarities = np.asarray(similarities, dtype=np.float32)
+    if len(similarities) <= k:
+        return list(range(len(similarities)))
+
+    embeddings = np.asarray(embeddings, dtype=np.float32)
+    embeddings = embeddings / np.maximum(np.linalg.norm(embeddings, axis=1, keepdims=True), np.finfo(np.float32).tiny)
+    pairwise = embeddings @ embeddings.T
+
+    selected = [int(np.argmax(similarities))]
+    redundancy = pairwise[selected[0]].copy()
+    available = np.ones(len(similarities), dtype=bool)
+    available[selected[0]] = False
+    while len(selected) < k:
+        scores = np.where(available, lambda_mult * similarities - (1 - lambda_mult) * redundancy, -np.inf)
+        best = int(np.argmax(scores))
+        selected.append(best)
+        available[best] = False
+        np.maximum(redundancy, pairwise[best], out=redundancy)
+    return selected
@@ -0,0 +1,111 @@
+import asyncio
+import fcntl
+import hashlib
+import os
+from contextlib import asynccontextmanager
+from pathlib import Path
+from typing import AsyncIterator, Awaitable, Callable, Optional, TypeVar
+
+from app.core.config import settings
+from app.schemas.stats import SingleFlightStats
+
+T = TypeVar("T")
+
+# Number of lock files the keys are striped over, so the lock directory does not grow with the keys
+LOCK_STRIPES = 1024
+
+
+class SingleFlight:
+
+    """
+    Coalesce concurrent calls with the same key into a single in-flight computation.
+
+    The first caller of a key runs the computation in its own task and the callers arriving while it is in flight
+    await the same task, so they all share its result or its exception. The task is shielded, so a caller that is
+    cancelled (e.g. a client that disconnects) does not cancel the computation the others are waiting on.
+
+    When a lock directory is configured, calls made with shared=True also take an exclusive file lock per key, so
+    the workers of the same host run them one at a time. This is meant for computations that go through a cache
+    shared by the workers: the worker that waited on the lock finds the result of the other one in the cache.
+    """
+
+    def __init__(self, name: str, lock_path: Optional[Path] = settings.SINGLE_FLIGHT_LOCK_PATH):
+        self.name = name
+        self.enabled = settings.SINGLE_FLIGHT_ENABLED
+        self.lock_path = lock_path
+        if self.lock_path is not None:
+            self.lock_path.mkdir(parents=True, exist_ok=True)
+        self.in_flight: dict[str, asyncio.Task] = {}
+
+        self.calls = 0
+        self.collapsed = 0
+        self.lock_waits = 0
+
+    @asynccontextmanager
+    async def _file_lock(self, key: str) -> AsyncIterator[None]:
+        """
+        Hold the exclusive file lock of a key, waiting in a worker thread if another process holds it.
+
+        Returns:
+            An async context manager.
+        """
+        stripe = int(hashlib.sha256(key.encode("utf-8")).hexdigest(), 16) % LOCK_STRIPES
+        fd = os.open(self.lock_path / f"{self.name}-{stripe}.lock", os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                self.lock_waits += 1
+                await asyncio.to_thread(fcntl.flock, fd, fcntl.LOCK_EX)
+            yield
+        finally:
+            # Closing the descriptor releases the lock
+            os.close(fd)
+
+    async def _run(self, key: str, function: Callable[[], Awaitable[T]], shared: bool) -> T:
+        if shared and self.lock_path is not None:
+            async with self._file_lock(key):
+                return await function()
+        return await function()
+
+    def _forget(self, key: str) -> None:
+        task = self.in_flight.pop(key)
+        # Retrieve the exception, in case every caller was cancelled before the task failed
+        if not task.cancelled():
+            task.exception()
+
+    async def do(self, key: str, function: Callable[[], Awaitable[T]], shared: bool = False) -> T:
+        """
+        Run the function, or wait for the in-flight call with the same key and share its result.
+
+        Returns:
+            The result of the function.
+        """
+        self.calls += 1
+        if not self.enabled:
+            return await function()
+
+        task = self.in_flight.get(key)
+        if task is not None:
+            self.collapsed += 1
+        else:
+            task = asyncio.create_task(self._run(key, function, shared))
+            self.in_flight[key] = task
+            task.add_done_callback(lambda _: self._forget(key))
+
+        return await asyncio.shield(task)
+
+    def stats(self) -> SingleFlightStats:
+        """
+        Get the coalescing counters of this worker.
+
+        Returns:
+            A SingleFlightStats instance.
+        """
+        return SingleFlightStats(
+            calls=self.calls,
+            collapsed=self.collapsed,
+            collapse_rate=self.collapsed / self.calls if self.calls else 0.0,
+            in_flight=len(self.in_flight),
+            lock_waits=self.lock_waits,
+        )
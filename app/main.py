@@ -3,13 +3,18 @@ from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
-from app.api.v1.endpoints import documents, healthcheck, research
+from app.api.middleware import ServerTimingMiddleware
+from app.api.v1.endpoints import documents, healthcheck, metrics, research, stats
 from app.core.config import logger, settings
+from app.core.single_flight import SingleFlight
 from app.managers.comparison import ComparisonManager
 from app.managers.correlation import CorrelationFilterManager
 from app.managers.embedding import EmbeddingManager
+from app.managers.ingest import IngestManager
 from app.managers.language import LanguageManager
-from app.managers.retriever import VectorDBRetriever
+from app.managers.openai_client import OpenAIClientManager
+from app.managers.semantic_cache import SemanticCacheManager
+from app.managers.translation_cache import TranslationCacheManager
 from app.managers.translator import TranslatorManager
 from app.managers.vector_store import VectorStoreManager
 
@@ -26,38 +31,60 @@ async def lifespan(app: FastAPI):
     language_manager = LanguageManager()
     app.state.language_manager = language_manager
 
+    # Shared OpenAI HTTP clients and rate limiter
+    openai_client = OpenAIClientManager()
+    app.state.openai_client = openai_client
+
     # Initialize correlation filter manager (initializes OpenAI client)
-    embedding_manager = EmbeddingManager()
+    embedding_manager = EmbeddingManager(openai_client)
     embedding_model = embedding_manager.get_embedding_model()
     app.state.embedding_model = embedding_model
+    app.state.embedding_cache = embedding_manager.get_cache()
 
     # Vector store manager
-    vector_store_manager = VectorStoreManager(embedding_model)
+    vector_store_manager = VectorStoreManager(embedding_model, language_manager)
     app.state.vector_store_manager = vector_store_manager
 
+    # Ingest manager
+    ingest_manager = IngestManager(vector_store_manager)
+    app.state.ingest_manager = ingest_manager
+
     # Retriever
-    vector_store = vector_store_manager.get_vector_store()
-    retriever = VectorDBRetriever(vector_store=vector_store, k=settings.DOCUMENT_TOP_K)
+    retriever = vector_store_manager.get_retriever(k=settings.DOCUMENT_TOP_K)
     app.state.retriever = retriever
 
     # Correlation filter manager
-    correlation_filter_manager = CorrelationFilterManager()
+    correlation_filter_manager = CorrelationFilterManager(openai_client)
     app.state.correlation_filter_manager = correlation_filter_manager
 
     # Comparison manager
-    comparison_manager = ComparisonManager()
+    comparison_manager = ComparisonManager(openai_client)
     app.state.comparison_manager = comparison_manager
 
+    # Translation cache, invalidated whenever a document is replaced or deleted
+    translation_cache = TranslationCacheManager() if settings.TRANSLATION_CACHE_ENABLED else None
+    if translation_cache is not None:
+        vector_store_manager.add_change_listener(translation_cache.invalidate)
+    app.state.translation_cache = translation_cache
+
     # Translator manager
-    translator_manager = TranslatorManager()
+    translator_manager = TranslatorManager(cache=translation_cache, openai_client=openai_client)
     app.state.translator_manager = translator_manager
 
+    # Semantic cache of research responses, dropped whenever the collection changes
+    semantic_cache = SemanticCacheManager(vector_store_manager.get_version) if settings.SEMANTIC_CACHE_ENABLED else None
+    app.state.semantic_cache = semantic_cache
+
+    # Coalescing of identical research requests in flight
+    app.state.research_single_flight = SingleFlight("research")
+
     logger.info("Models loaded successfully!")
 
     yield
 
     # Cleanup on shutdown (if needed)
     logger.info("Shutting down...")
+    await openai_client.aclose()
 
 
 app = FastAPI(
@@ -75,6 +102,11 @@ app.add_middleware(
     allow_headers=settings.CORS_ALLOW_HEADERS,
 )
 
+# Add the Server-Timing header and time the requests
+app.add_middleware(ServerTimingMiddleware)
+
 app.include_router(healthcheck.router, prefix=settings.API_V1_STR)
 app.include_router(documents.router, prefix=settings.API_V1_STR)
 app.include_router(research.router, prefix=settings.API_V1_STR)
+app.include_router(stats.router, prefix=settings.API_V1_STR)
+app.include_router(metrics.router, prefix=settings.API_V1_STR)
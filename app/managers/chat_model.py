@@ -0,0 +1,40 @@
+from typing import Any, Optional
+
+from langchain_core.language_models import BaseChatModel
+from langchain_openai import ChatOpenAI
+
+from app.core.config import settings
+from app.core.enums import ModelBackend
+from app.managers.fake_models import FakeChatModel
+from app.managers.llm_usage import LLMUsageCallback
+from app.managers.openai_client import OpenAIClientManager
+
+
+def create_chat_model(
+    model: str, purpose: str, openai_client: Optional[OpenAIClientManager] = None, **kwargs: Any
+) -> BaseChatModel:
+    """
+    Create a chat model of the configured backend, recording its usage under the given purpose.
+
+    Returns:
+        A ChatOpenAI instance using the shared clients, or a FakeChatModel instance with the LLM_BACKEND setting
+        set to fake.
+    """
+    callbacks = [LLMUsageCallback(purpose)]
+    if settings.LLM_BACKEND is ModelBackend.Fake:
+        return FakeChatModel(
+            latency=settings.FAKE_LLM_LATENCY,
+            latency_spread=settings.FAKE_LLM_LATENCY_SPREAD,
+            latency_distribution=settings.FAKE_LLM_LATENCY_DISTRIBUTION,
+            seed=settings.FAKE_LLM_SEED,
+            callbacks=callbacks,
+        )
+
+    return ChatOpenAI(
+        model=model,
+        api_key=settings.OPENAI_API_KEY,
+        temperature=0,
+        callbacks=callbacks,
+        **(openai_client.get_client_kwargs() if openai_client is not None else {}),
+        **kwargs,
+    )
@@ -0,0 +1,106 @@
+from pathlib import Path
+from typing import Optional, Sequence
+
+from langchain_chroma import Chroma
+from langchain_core.documents import Document as LangchainDocument
+from langchain_core.embeddings import Embeddings
+
+from app.core.enums import DistanceSpace
+from app.managers.vector_backend import VectorBackend, Where
+
+
+class ChromaBackend(VectorBackend):
+
+    """
+    A collection of an embedded Chroma database, searched through its HNSW index.
+    """
+
+    def __init__(self, collection_name: str, embeddings: Embeddings, directory: Path, space: DistanceSpace):
+        self.embeddings = embeddings
+        self.store = Chroma(
+            collection_name=collection_name,
+            embedding_function=embeddings,
+            persist_directory=str(directory),
+            # Only applies when the collection is created, existing collections keep their distance space
+            collection_metadata={"hnsw:space": space.value},
+        )
+
+    def get_distance_space(self) -> DistanceSpace:
+        configuration = self.store._collection.configuration_json or {}
+        space = (configuration.get("hnsw") or {}).get("space", DistanceSpace.L2.value)
+        return DistanceSpace(space)
+
+    def get_max_batch_size(self) -> int:
+        return self.store._client.get_max_batch_size()
+
+    def _restrict(
+        self, ids: Optional[list[str]], where: Optional[Where]
+    ) -> tuple[Optional[list[str]], Optional[Where]]:
+        """
+        Combine an id list and a where filter into an id list.
+
+        Chroma evaluates an id list together with a where filter in seconds on collections of a few thousand
+        documents, while each of them alone takes milliseconds, so the where filter is resolved alone and intersected
+        with the ids.
+
+        Returns:
+            A tuple with the ids and where filter to pass to Chroma, never both.
+        """
+        if ids is None or not where:
+            return ids, where or None
+        matching = set(self.store.get(where=where, include=[])["ids"])
+        return [id_ for id_ in ids if id_ in matching], None
+
+    def get(
+        self,
+        ids: Optional[list[str]] = None,
+        where: Optional[Where] = None,
+        limit: Optional[int] = None,
+        offset: Optional[int] = None,
+        include: Sequence[str] = ("metadatas",),
+    ) -> dict:
+        ids, where = self._restrict(ids, where)
+        if ids is not None and not ids:
+            # Chroma rejects an empty id list
+            return {"ids": [], **{field: [] for field in include}}
+        return self.store.get(ids=ids, where=where, limit=limit, offset=offset, include=list(include))
+
+    def add(self, documents: list[LangchainDocument], ids: list[str]) -> None:
+        self.store.add_documents(documents, ids=ids)
+
+    def update_metadatas(self, ids: list[str], metadatas: list[dict]) -> None:
+        # Chroma merges the metadata on update, so the keys left out are explicitly removed, with None values
+        stored = self.store.get(ids=ids, include=["metadatas"])
+        stored_keys = {id_: (metadata or {}).keys() for id_, metadata in zip(stored["ids"], stored["metadatas"])}
+        metadatas = [
+            {**{key: None for key in stored_keys.get(id_, ()) if key not in metadata}, **metadata}
+            for id_, metadata in zip(ids, metadatas)
+        ]
+        self.store._collection.update(ids=ids, metadatas=metadatas)
+
+    def delete(self, ids: Optional[list[str]] = None, where: Optional[Where] = None) -> None:
+        self.store._collection.delete(ids=ids, where=where)
+
+    def search(
+        self, embeddings: list[list[float]], k: int, ids: Optional[list[str]] = None, where: Optional[Where] = None
+    ) -> list[list[tuple[LangchainDocument, float]]]:
+        ids, where = self._restrict(ids, where)
+        if ids is not None and not ids:
+            return [[] for _ in embeddings]
+        # The filters restrict the HNSW search itself, not its results
+        results = self.store._collection.query(
+            query_embeddings=embeddings,
+            ids=ids,
+            where=where,
+            n_results=k if ids is None else min(k, len(ids)),
+            include=["metadatas", "documents", "distances"],
+        )
+        return [
+            [
+                (LangchainDocument(id=id_, page_content=content or "", metadata=metadata or {}), distance)
+                for id_, content, metadata, distance in zip(hit_ids, contents, metadatas, distances)
+            ]
+            for hit_ids, contents, metadatas, distances in zip(
+                results["ids"], results["documents"], results["metadatas"], results["distances"]
+            )
+        ]
@@ -1,18 +1,34 @@
-from typing import List
+from typing import AsyncIterator, List, Optional
 
+from langchain_core.output_parsers import StrOutputParser
 from langchain_core.prompts import ChatPromptTemplate
-from langchain_openai import ChatOpenAI
 
 from app.core.config import settings
-from app.schemas.comparison import Comparison
+from app.core.metrics import stage
+from app.core.prompts import build_documents_prompt
+from app.managers.chat_model import create_chat_model
+from app.managers.openai_client import OpenAIClientManager
+from app.schemas.comparison import Comparison, JudgedComparison
 from app.schemas.research import ResearchResponseDocument
 
 
 class ComparisonManager:
-    def __init__(self):
-        self.llm = ChatOpenAI(
-            model=settings.OPENAI_CORRELATION_MODEL, api_key=settings.OPENAI_API_KEY, temperature=0
+    def __init__(self, openai_client: Optional[OpenAIClientManager] = None):
+        self.llm = create_chat_model(
+            settings.OPENAI_CORRELATION_MODEL, "comparison", openai_client
         ).with_structured_output(Comparison)
+        self.judge_llm = create_chat_model(
+            settings.OPENAI_CORRELATION_MODEL, "judged_comparison", openai_client
+        ).with_structured_output(JudgedComparison)
+        # Plain-text model for the streamed comparison, whose tokens are useful as they are generated
+        self.stream_llm = create_chat_model(
+            settings.OPENAI_CORRELATION_MODEL,
+            "comparison",
+            openai_client,
+            streaming=True,
+            # Report the token usage at the end of the stream
+            stream_usage=True,
+        )
 
     @staticmethod
     def _build_summary_prompt(query_str: str, docs: List[ResearchResponseDocument]) -> str:
@@ -22,24 +38,16 @@ class ComparisonManager:
         Returns:
             A formatted prompt string for comparison analysis.
         """
-        doc_descriptions = "\n".join(
-            f"Index {index+1}: Title: '{doc.title}'\nAbstract: {doc.abstract}" for index, doc in enumerate(docs)
-        )
+        return build_documents_prompt(query_str, docs)
 
-        prompt = "User Query:\n" f'"{query_str}"\n\n' "Retrieved Documents:\n" f"{doc_descriptions}\n\n"
-        return prompt
-
-    def get_comparison(self, query_str: str, docs: List[ResearchResponseDocument], language: str) -> Comparison:
+    @staticmethod
+    def _build_comparison_template(language: str) -> ChatPromptTemplate:
         """
-        Get a comparison analysis between the query and retrieved documents.
+        Build the prompt template for document comparison analysis.
 
         Returns:
-            A Comparison instance with the analysis results.
+            A ChatPromptTemplate expecting the prompt_text variable.
         """
-        # 1. Build the prompt
-        prompt_text = self._build_summary_prompt(query_str, docs)
-
-        # 2. Define the prompt template for LangChain
         system_content = (
             "You are a specialized AI assistant focused on research analysis and comparison.\n"
             "You have received a user query and a list of documents (with indexes starting at 1). "
@@ -55,13 +63,114 @@ class ComparisonManager:
             f"5. You must respond in {language} language.\n"
         )
 
+        return ChatPromptTemplate.from_messages(
+            [("system", system_content), ("user", "{prompt_text}"), ("system", user_instructions)]
+        )
+
+    async def get_comparison(self, query_str: str, docs: List[ResearchResponseDocument], language: str) -> Comparison:
+        """
+        Get a comparison analysis between the query and retrieved documents.
+
+        Returns:
+            A Comparison instance with the analysis results.
+        """
+        # 1. Build the prompt
+        prompt_text = self._build_summary_prompt(query_str, docs)
+
+        # 2. Create the prompt template
+        prompt_template = self._build_comparison_template(language)
+
+        # 3. Execute the chain with structured output
+        chain = prompt_template | self.llm
+        async with stage("comparison"):
+            response = await chain.ainvoke({"prompt_text": prompt_text})
+
+        return response.comparison
+
+    async def stream_comparison(
+        self, query_str: str, docs: List[ResearchResponseDocument], language: str
+    ) -> AsyncIterator[str]:
+        """
+        Stream a comparison analysis between the query and retrieved documents as the model generates it.
+
+        Returns:
+            An async iterator of the comparison text chunks.
+        """
+        # 1. Build the prompt
+        prompt_text = self._build_summary_prompt(query_str, docs)
+
+        # 2. Create the prompt template
+        prompt_template = self._build_comparison_template(language)
+
+        # 3. Stream the chain as plain text
+        chain = prompt_template | self.stream_llm | StrOutputParser()
+        async with stage("comparison"):
+            async for chunk in chain.astream({"prompt_text": prompt_text}):
+                if chunk:
+                    yield chunk
+
+    async def get_judged_comparison(
+        self,
+        query_str: str,
+        accepted_docs: List[ResearchResponseDocument],
+        ambiguous_docs: List[ResearchResponseDocument],
+        language: str,
+    ) -> tuple[List[ResearchResponseDocument], str]:
+        """
+        Judge the relevance of the ambiguous documents and compare the relevant ones with the query in a single
+        LLM call, instead of a correlation call followed by a comparison call.
+
+        The accepted documents are listed first and cannot be judged irrelevant.
+
+        Returns:
+            A tuple with the relevant documents (accepted first, then the surviving ambiguous ones) and the
+            comparison.
+        """
+        # 1. Build the prompt
+        docs = accepted_docs + ambiguous_docs
+        prompt_text = build_documents_prompt(query_str, docs)
+
+        # 2. Define the prompt template for LangChain
+        system_content = (
+            "You are a specialized AI assistant focused on research analysis and comparison.\n"
+            "You have received a user query and a list of documents (with indexes starting at 1). "
+            "Your goal is to identify the documents that are irrelevant to the user query, and then to compare the "
+            "user query with the remaining documents and provide a summary of the comparison.\n\n"
+            "Guidelines:\n"
+            "1. The 'indexes' field must be a list of integers (each integer corresponds to the 1-based index of an irrelevant document).\n"
+            '2. If all documents are relevant to the query, return "indexes" as an empty list.\n'
+            "3. Only include documents that are clearly irrelevant or off-topic.\n"
+            "4. The 'comparison' field must only discuss the documents that are not in 'indexes'.\n"
+        )
+
+        instructions = [
+            "Return only the indexes of documents that are irrelevant to the user query, using 1-based indexing.",
+            "Be conservative - only mark documents as irrelevant if they are clearly off-topic.",
+            "For the comparison, provide the similarities and the differences between the user query and the "
+            "relevant documents, and then a short summary with them.",
+            "You must be concise and to the point.",
+            f"You must respond in {language} language.",
+        ]
+        if accepted_docs:
+            instructions.insert(
+                0, f"Documents 1 to {len(accepted_docs)} are already known to be relevant, never return their indexes."
+            )
+        user_instructions = "Instructions:\n" + "".join(
+            f"{number}. {instruction}\n" for number, instruction in enumerate(instructions, start=1)
+        )
+
         # 3. Create the prompt template
         prompt_template = ChatPromptTemplate.from_messages(
             [("system", system_content), ("user", "{prompt_text}"), ("system", user_instructions)]
         )
 
         # 4. Execute the chain with structured output
-        chain = prompt_template | self.llm
-        response = chain.invoke({"prompt_text": prompt_text})
+        chain = prompt_template | self.judge_llm
+        async with stage("judged_comparison"):
+            response = await chain.ainvoke({"prompt_text": prompt_text})
 
-        return response.comparison
+        # 5. Keep the accepted documents and the ambiguous ones not judged irrelevant
+        filter_indexes = {index - 1 for index in response.indexes if len(accepted_docs) < index <= len(docs)}
+        relevant_docs = [doc for index, doc in enumerate(docs) if index not in filter_indexes]
+
+        return relevant_docs, response.comparison
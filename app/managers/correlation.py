@@ -1,40 +1,105 @@
-from typing import List
+from typing import List, Optional
 
 from langchain_core.prompts import ChatPromptTemplate
-from langchain_openai import ChatOpenAI
 
-from app.core.config import settings
+from app.core.config import logger, settings
+from app.core.metrics import correlation_checks, correlation_documents, stage
+from app.core.prompts import build_documents_prompt
+from app.core.single_flight import SingleFlight
+from app.managers.chat_model import create_chat_model
+from app.managers.openai_client import OpenAIClientManager
 from app.schemas.correlation import Correlation
 from app.schemas.research import ResearchResponseDocument
+from app.schemas.stats import CorrelationFilterStats
 
 
 class CorrelationFilterManager:
-    def __init__(self):
-        self.llm = ChatOpenAI(
-            model=settings.OPENAI_CORRELATION_MODEL, api_key=settings.OPENAI_API_KEY, temperature=0
+    def __init__(self, openai_client: Optional[OpenAIClientManager] = None):
+        self.llm = create_chat_model(
+            settings.OPENAI_CORRELATION_MODEL, "correlation", openai_client
         ).with_structured_output(Correlation)
+        self.accept_threshold = settings.RETRIEVER_CONFIDENCE_THRESHOLD
+        self.reject_threshold = settings.RETRIEVER_REJECTION_THRESHOLD
+        self.single_flight = SingleFlight("correlation")
 
     @staticmethod
     def _build_correlation_prompt(query_str: str, retrieved_docs: List[ResearchResponseDocument]) -> str:
         """
         Build a prompt for correlation analysis.
 
+        When the documents were retrieved through the chunked index, only their matching chunks are included
+        instead of the whole abstract.
+
         Returns:
             A formatted prompt string for correlation analysis.
         """
-        doc_descriptions = "\n".join(
-            f"Index {index+1}: Title: '{doc.title}'\nAbstract: {doc.abstract}"
-            for index, doc in enumerate(retrieved_docs)
+        return build_documents_prompt(query_str, retrieved_docs, excerpts=True)
+
+    async def check_correlation(
+        self, query_str: str, retrieved_docs: List[ResearchResponseDocument]
+    ) -> List[ResearchResponseDocument]:
+        """
+        Check correlation between query and retrieved documents, filtering out irrelevant ones.
+
+        Documents whose similarity is above the acceptance threshold are kept and documents below the rejection
+        threshold are dropped without asking the LLM. Only the documents in between are sent to the LLM judge.
+
+        Concurrent checks of the same query against the same documents share a single computation.
+
+        Returns:
+            A list of ResearchResponseDocument instances that are relevant to the query, in retrieval order.
+        """
+        key = "\n".join([query_str, *(f"{doc.uuid} {doc.similarity}" for doc in retrieved_docs)])
+        return await self.single_flight.do(key, lambda: self._check_correlation(query_str, retrieved_docs))
+
+    async def _check_correlation(
+        self, query_str: str, retrieved_docs: List[ResearchResponseDocument]
+    ) -> List[ResearchResponseDocument]:
+        """
+        Filter the retrieved documents by score, sending only the ambiguous ones to the LLM judge.
+
+        Returns:
+            A list of ResearchResponseDocument instances that are relevant to the query, in retrieval order.
+        """
+        accepted, ambiguous = self.partition(retrieved_docs)
+
+        judged = await self._judge_correlation(query_str, ambiguous) if ambiguous else []
+
+        kept = {id(doc) for doc in accepted + judged}
+        return [doc for doc in retrieved_docs if id(doc) in kept]
+
+    def partition(
+        self, retrieved_docs: List[ResearchResponseDocument]
+    ) -> tuple[List[ResearchResponseDocument], List[ResearchResponseDocument]]:
+        """
+        Split the retrieved documents by score into the accepted documents and the ambiguous ones the LLM must
+        judge, dropping the documents below the rejection threshold.
+
+        Returns:
+            A tuple with the accepted and the ambiguous documents, in retrieval order.
+        """
+        accepted = [doc for doc in retrieved_docs if doc.similarity >= self.accept_threshold]
+        ambiguous = [doc for doc in retrieved_docs if self.reject_threshold <= doc.similarity < self.accept_threshold]
+
+        # Update the counters, the ambiguous documents being judged by an LLM call in both pipeline modes
+        correlation_checks.inc(str(bool(ambiguous)).lower())
+        correlation_documents.inc("accepted_by_score", amount=len(accepted))
+        correlation_documents.inc("rejected_by_score", amount=len(retrieved_docs) - len(accepted) - len(ambiguous))
+        correlation_documents.inc("judged_by_llm", amount=len(ambiguous))
+        logger.debug(
+            "Correlation filter: %d accepted and %d rejected by score, %d judged by the LLM",
+            len(accepted),
+            len(retrieved_docs) - len(accepted) - len(ambiguous),
+            len(ambiguous),
         )
 
-        prompt = "User Query:\n" f'"{query_str}"\n\n' "Retrieved Documents:\n" f"{doc_descriptions}\n\n"
-        return prompt
+        return accepted, ambiguous
 
-    def check_correlation(
+    async def _judge_correlation(
         self, query_str: str, retrieved_docs: List[ResearchResponseDocument]
     ) -> List[ResearchResponseDocument]:
         """
-        Check correlation between query and retrieved documents, filtering out irrelevant ones.
+        Ask the LLM which of the retrieved documents are irrelevant to the query, filtering them out.
 
         Returns:
             A list of ResearchResponseDocument instances that are relevant to the query.
@@ -69,7 +134,8 @@ class CorrelationFilterManager:
 
         # 4. Execute the chain with structured output
         chain = prompt_template | self.llm
-        response = chain.invoke({"prompt_text": prompt_text})
+        async with stage("correlation"):
+            response = await chain.ainvoke({"prompt_text": prompt_text})
 
         # 5. Process the response
         filter_indexes = response.indexes
@@ -78,3 +144,22 @@ class CorrelationFilterManager:
 
         # 6. Return documents that are not in the filter list
         return [doc for index, doc in enumerate(retrieved_docs) if index not in filter_indexes]
+
+    @staticmethod
+    def stats() -> CorrelationFilterStats:
+        """
+        Get the totals of the correlation filter counters of this worker since it started.
+
+        Returns:
+            A CorrelationFilterStats instance.
+        """
+        llm_calls = int(correlation_checks.get("true"))
+        requests = llm_calls + int(correlation_checks.get("false"))
+        return CorrelationFilterStats(
+            requests=requests,
+            llm_calls=llm_calls,
+            llm_bypass_rate=1 - llm_calls / requests if requests else 0.0,
+            accepted_by_score=int(correlation_documents.get("accepted_by_score")),
+            rejected_by_score=int(correlation_documents.get("rejected_by_score")),
+            judged_by_llm=int(correlation_documents.get("judged_by_llm")),
+        )
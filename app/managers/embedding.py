@@ -1,17 +1,54 @@
+from typing import Optional
+
+from langchain_core.embeddings import Embeddings
 from langchain_openai import OpenAIEmbeddings
 
 from app.core.config import settings
+from app.core.enums import ModelBackend
+from app.managers.embedding_cache import CachedEmbeddings, EmbeddingCacheManager
+from app.managers.fake_models import HashedEmbeddings
+from app.managers.openai_client import OpenAIClientManager
 
 
 class EmbeddingManager:
-    def __init__(self):
-        self.embedding_model = OpenAIEmbeddings(api_key=settings.OPENAI_API_KEY, model=settings.EMBED_MODEL_NAME)
+    def __init__(self, openai_client: Optional[OpenAIClientManager] = None):
+        self.embedding_model: Embeddings
+        if settings.EMBEDDING_BACKEND is ModelBackend.Fake:
+            self.model_name = f"fake-hashed-{settings.FAKE_EMBEDDING_DIMENSIONS}"
+            self.embedding_model = HashedEmbeddings(settings.FAKE_EMBEDDING_DIMENSIONS, settings.FAKE_EMBEDDING_LATENCY)
+        else:
+            self.model_name = settings.EMBED_MODEL_NAME
+            if settings.EMBED_DIMENSIONS is not None:
+                self.model_name = f"{settings.EMBED_MODEL_NAME}-{settings.EMBED_DIMENSIONS}"
+            self.embedding_model = OpenAIEmbeddings(
+                api_key=settings.OPENAI_API_KEY,
+                model=settings.EMBED_MODEL_NAME,
+                dimensions=settings.EMBED_DIMENSIONS,
+                chunk_size=settings.EMBED_BATCH_SIZE,
+                **(openai_client.get_client_kwargs() if openai_client is not None else {}),
+            )
+
+        # Serve repeated queries without calling the embedding model
+        self.cache: Optional[EmbeddingCacheManager] = None
+        if settings.EMBEDDING_CACHE_ENABLED:
+            self.cache = EmbeddingCacheManager(self.model_name)
+            self.embedding_model = CachedEmbeddings(self.embedding_model, self.cache)
 
-    def get_embedding_model(self) -> list[float]:
+    def get_embedding_model(self) -> Embeddings:
         """
         Get the embedding model instance.
 
         Returns:
-            The OpenAIEmbeddings model instance.
+            The OpenAIEmbeddings model instance, or the HashedEmbeddings one with the EMBEDDING_BACKEND setting set
+            to fake, wrapped by the query embedding cache when enabled.
         """
         return self.embedding_model
+
+    def get_cache(self) -> Optional[EmbeddingCacheManager]:
+        """
+        Get the query embedding cache.
+
+        Returns:
+            The EmbeddingCacheManager instance, or None if the cache is disabled.
+        """
+        return self.cache
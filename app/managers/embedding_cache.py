@@ -0,0 +1,279 @@
+import asyncio
+import hashlib
+import re
+import sqlite3
+import threading
+import zlib
+from collections import OrderedDict
+from pathlib import Path
+from typing import Optional
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+from app.core.config import settings
+from app.core.hashing import normalize_text
+from app.core.single_flight import SingleFlight
+from app.schemas.stats import TieredCacheStats
+
+
+class EmbeddingCacheManager:
+
+    """
+    A two-tier cache of query embeddings keyed by the normalized text and the embedding model.
+
+    The first tier is an in-process LRU of float32 arrays. The optional second tier is a memory-mapped ring of
+    float32 rows shared by all the workers, indexed by a SQLite database that maps each key to its row and the
+    checksum of the vector stored there. When the ring wraps around, the oldest rows are overwritten, and a reader
+    that raced with the overwrite sees a checksum mismatch and treats it as a miss.
+    """
+
+    def __init__(self, model_name: str):
+        self.model_name = model_name
+        self.maxsize = settings.EMBEDDING_CACHE_SIZE
+        self.memory: OrderedDict[str, np.ndarray] = OrderedDict()
+        self.lock = threading.Lock()
+
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+        self.connection: Optional[sqlite3.Connection] = None
+        self.vectors: Optional[np.memmap] = None
+        if settings.EMBEDDING_CACHE_DISK_ENABLED:
+            self._open_disk_tier(settings.EMBEDDING_CACHE_PATH)
+
+    def _open_disk_tier(self, directory: Path) -> None:
+        """
+        Open the index of the on-disk tier. The vector file is mapped once the embedding dimension is known.
+
+        Returns:
+            None
+        """
+        directory.mkdir(parents=True, exist_ok=True)
+        name = re.sub(r"[^A-Za-z0-9_.-]", "_", self.model_name)
+        self.vectors_path = directory / f"{name}.f32"
+        self.connection = sqlite3.connect(directory / f"{name}.db", timeout=30, check_same_thread=False)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            "key TEXT PRIMARY KEY, slot INTEGER NOT NULL UNIQUE, checksum INTEGER NOT NULL)"
+        )
+        self.connection.execute("CREATE TABLE IF NOT EXISTS ring (slots INTEGER, dimensions INTEGER, next INTEGER)")
+        self.connection.commit()
+
+    def _map_vectors(self, dimensions: Optional[int] = None) -> bool:
+        """
+        Map the vector file of the on-disk tier, creating it on the first write of any worker.
+
+        The ring is reset if it was created with a different number of slots or dimensions. Writers pass the
+        dimensions of their vector and must hold the write transaction, so that only one worker creates the file.
+
+        Returns:
+            Whether the vector file is mapped.
+        """
+        slots = settings.EMBEDDING_CACHE_DISK_SLOTS
+        row = self.connection.execute("SELECT slots, dimensions FROM ring").fetchone()
+        if row is not None and row[0] == slots and dimensions in (None, row[1]):
+            if self.vectors is None or self.vectors.shape != row:
+                self.vectors = np.memmap(self.vectors_path, dtype=np.float32, mode="r+", shape=row)
+            return True
+        if dimensions is None:
+            return False
+
+        # Nothing was written yet, or the ring layout changed: start over
+        self.connection.execute("DELETE FROM embeddings")
+        self.connection.execute("DELETE FROM ring")
+        self.connection.execute("INSERT INTO ring VALUES (?, ?, 0)", (slots, dimensions))
+        self.vectors = np.memmap(self.vectors_path, dtype=np.float32, mode="w+", shape=(slots, dimensions))
+        return True
+
+    def key(self, text: str) -> str:
+        """
+        Compute the cache key of a text.
+
+        Returns:
+            The hex SHA-256 digest of the model name and the normalized text.
+        """
+        return hashlib.sha256(f"{self.model_name}\n{normalize_text(text)}".encode("utf-8")).hexdigest()
+
+    def _remember(self, key: str, vector: np.ndarray) -> None:
+        """
+        Store a vector in the in-process LRU, evicting the least recently used entry if needed.
+
+        Returns:
+            None
+        """
+        self.memory[key] = vector
+        self.memory.move_to_end(key)
+        while len(self.memory) > self.maxsize:
+            self.memory.popitem(last=False)
+
+    def _read_disk(self, key: str) -> Optional[np.ndarray]:
+        """
+        Read a vector from the on-disk tier, verifying its checksum.
+
+        Returns:
+            A copy of the stored vector, or None on a miss.
+        """
+        if self.connection is None or not self._map_vectors():
+            return None
+        row = self.connection.execute("SELECT slot, checksum FROM embeddings WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+
+        vector = np.array(self.vectors[row[0]])
+        if zlib.crc32(vector.tobytes()) != row[1]:
+            return None
+        return vector
+
+    def _write_disk(self, key: str, vector: np.ndarray) -> None:
+        """
+        Write a vector to the next row of the on-disk ring.
+
+        Returns:
+            None
+        """
+        if self.connection is None:
+            return
+
+        # Take the write lock first, so the workers claim distinct rows
+        self.connection.execute("BEGIN IMMEDIATE")
+        try:
+            self._map_vectors(vector.shape[0])
+            if self.connection.execute("SELECT 1 FROM embeddings WHERE key = ?", (key,)).fetchone():
+                self.connection.rollback()
+                return
+
+            (slot,) = self.connection.execute("SELECT next FROM ring").fetchone()
+            self.connection.execute("DELETE FROM embeddings WHERE slot = ?", (slot,))
+            self.vectors[slot] = vector
+            self.vectors.flush()
+            self.connection.execute(
+                "INSERT INTO embeddings VALUES (?, ?, ?)", (key, slot, zlib.crc32(vector.tobytes()))
+            )
+            self.connection.execute("UPDATE ring SET next = ?", ((slot + 1) % self.vectors.shape[0],))
+            self.connection.commit()
+        except Exception:
+            self.connection.rollback()
+            raise
+
+    def get(self, text: str) -> Optional[np.ndarray]:
+        """
+        Get the cached embedding of a text.
+
+        Returns:
+            The cached float32 vector, or None on a miss.
+        """
+        key = self.key(text)
+        with self.lock:
+            vector = self.memory.get(key)
+            if vector is not None:
+                self.memory.move_to_end(key)
+                self.memory_hits += 1
+                return vector
+
+            vector = self._read_disk(key)
+            if vector is None:
+                self.misses += 1
+                return None
+
+            self._remember(key, vector)
+            self.disk_hits += 1
+            return vector
+
+    def set(self, text: str, embedding: list[float]) -> None:
+        """
+        Store the embedding of a text in both tiers.
+
+        Returns:
+            None
+        """
+        key = self.key(text)
+        vector = np.asarray(embedding, dtype=np.float32)
+        with self.lock:
+            self._remember(key, vector)
+            self._write_disk(key, vector)
+
+    def stats(self) -> TieredCacheStats:
+        """
+        Get the hit and miss counters of this worker.
+
+        Returns:
+            A TieredCacheStats instance.
+        """
+        hits = self.memory_hits + self.disk_hits
+        lookups = hits + self.misses
+        return TieredCacheStats(
+            hits=hits,
+            misses=self.misses,
+            hit_rate=hits / lookups if lookups else 0.0,
+            size=len(self.memory),
+            memory_hits=self.memory_hits,
+            disk_hits=self.disk_hits,
+        )
+
+
+class CachedEmbeddings(Embeddings):
+
+    """
+    An embedding model that serves the query embeddings from an EmbeddingCacheManager.
+
+    Only queries are cached: documents are embedded once at ingest, and their embeddings are stored in the
+    vector store anyway. Concurrent async embeddings of the same query share a single model call, across the
+    workers too when the memory-mapped tier is enabled.
+    """
+
+    def __init__(self, embeddings: Embeddings, cache: EmbeddingCacheManager):
+        self.embeddings = embeddings
+        self.cache = cache
+        self.single_flight = SingleFlight("embedding")
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        return self.embeddings.embed_documents(texts)
+
+    async def aembed_documents(self, texts: list[str]) -> list[list[float]]:
+        return await self.embeddings.aembed_documents(texts)
+
+    def embed_query(self, text: str) -> list[float]:
+        vector = self.cache.get(text)
+        if vector is not None:
+            return vector.tolist()
+
+        embedding = self.embeddings.embed_query(text)
+        self.cache.set(text, embedding)
+        return embedding
+
+    async def aembed_query(self, text: str) -> list[float]:
+        return await self.single_flight.do(
+            self.cache.key(text), lambda: self._aembed_query(text), shared=self.cache.connection is not None
+        )
+
+    async def _aembed_query(self, text: str) -> list[float]:
+        vector = await asyncio.to_thread(self.cache.get, text)
+        if vector is not None:
+            return vector.tolist()
+
+        embedding = await self.embeddings.aembed_query(text)
+        await asyncio.to_thread(self.cache.set, text, embedding)
+        return embedding
+
+    async def aembed_queries(self, texts: list[str]) -> list[list[float]]:
+        """
+        Embed many queries, serving the cached ones and embedding the others with a single model call.
+
+        Returns:
+            The query embeddings, in the same order as the queries.
+        """
+        vectors = await asyncio.to_thread(lambda: [self.cache.get(text) for text in texts])
+        embeddings = [vector.tolist() if vector is not None else None for vector in vectors]
+
+        misses = list(dict.fromkeys(text for text, embedding in zip(texts, embeddings) if embedding is None))
+        if misses:
+            computed = dict(zip(misses, await self.embeddings.aembed_documents(misses)))
+            await asyncio.to_thread(lambda: [self.cache.set(text, computed[text]) for text in misses])
+            embeddings = [
+                computed[text] if embedding is None else embedding for text, embedding in zip(texts, embeddings)
+            ]
+
+        return embeddings
@@ -0,0 +1,232 @@
+import asyncio
+import hashlib
+import random
+import re
+import time
+from typing import Any, AsyncIterator, Iterator, List, Optional
+
+import numpy as np
+from langchain_core.callbacks import (
+    AsyncCallbackManagerForLLMRun,
+    CallbackManagerForLLMRun,
+)
+from langchain_core.embeddings import Embeddings
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage
+from langchain_core.output_parsers import PydanticOutputParser
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+from langchain_core.runnables import Runnable
+from pydantic import BaseModel, Field, PrivateAttr
+
+from app.core.enums import LatencyDistribution
+from app.core.hashing import normalize_text
+
+# Words shorter than this are ignored when the fake chat model judges the relevance of a document
+MIN_WORD_LENGTH = 4
+
+
+def _words(text: str) -> list[str]:
+    return re.findall(r"\w+", normalize_text(text).lower())
+
+
+class HashedEmbeddings(Embeddings):
+
+    """
+    A deterministic local stand-in for the OpenAI embeddings.
+
+    Every word of a text is hashed to a signed dimension and the counts are L2-normalized, so texts sharing words
+    are similar and the same text gets the same vector in every process. The latency simulates the network.
+    """
+
+    def __init__(self, dimensions: int = 256, latency: float = 0.0):
+        self.dimensions = dimensions
+        self.latency = latency
+
+    def _embed(self, text: str) -> list[float]:
+        vector = np.zeros(self.dimensions, dtype=np.float32)
+        for word in _words(text):
+            digest = int.from_bytes(hashlib.blake2b(word.encode("utf-8"), digest_size=8).digest(), "little")
+            vector[digest % self.dimensions] += 1.0 if digest >> 63 else -1.0
+
+        norm = np.linalg.norm(vector)
+        if norm == 0:
+            vector[0], norm = 1.0, 1.0
+        return (vector / norm).tolist()
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        time.sleep(self.latency)
+        return [self._embed(text) for text in texts]
+
+    def embed_query(self, text: str) -> list[float]:
+        return self.embed_documents([text])[0]
+
+    async def aembed_documents(self, texts: list[str]) -> list[list[float]]:
+        await asyncio.sleep(self.latency)
+        return [self._embed(text) for text in texts]
+
+    async def aembed_query(self, text: str) -> list[float]:
+        return (await self.aembed_documents([text]))[0]
+
+
+class FakeChatModel(BaseChatModel):
+
+    """
+    A deterministic local stand-in for the OpenAI chat models, answering the prompts of the research pipeline.
+
+    The answers are derived from the prompt: a document is irrelevant when it shares no word with the query, the
+    comparison lists the titles of the relevant documents, and a translation prefixes the title and the abstract
+    with the target language. Structured outputs fill the fields of the requested schema among those. Every call
+    sleeps a latency drawn from the configured distribution, and reports its token usage at four characters per
+    token, so the callbacks see the same usage as with the real models.
+    """
+
+    model_name: str = Field(default="fake-chat")
+    latency: float = Field(default=0.0, description="Median latency of a call in seconds.")
+    latency_spread: float = Field(
+        default=0.0, description="Half-width of the uniform distribution, or sigma of the log-normal distribution."
+    )
+    latency_distribution: LatencyDistribution = Field(default=LatencyDistribution.Constant)
+    seed: int = Field(default=0)
+    _random: random.Random = PrivateAttr()
+
+    def model_post_init(self, __context: Any) -> None:
+        super().model_post_init(__context)
+        self._random = random.Random(self.seed)
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-chat"
+
+    def with_structured_output(self, schema: type[BaseModel], **kwargs: Any) -> Runnable:
+        return self.bind(response_schema=schema) | PydanticOutputParser(pydantic_object=schema)
+
+    def _sample_latency(self) -> float:
+        if self.latency_distribution is LatencyDistribution.Uniform:
+            return max(
+                0.0, self._random.uniform(self.latency - self.latency_spread, self.latency + self.latency_spread)
+            )
+        if self.latency_distribution is LatencyDistribution.LogNormal:
+            return self.latency * self._random.lognormvariate(0.0, self.latency_spread)
+        return self.latency
+
+    @staticmethod
+    def _answer(text: str, schema: Optional[type[BaseModel]]) -> str:
+        """
+        Answer a prompt of the research pipeline.
+
+        Returns:
+            The JSON of the schema when given, the comparison otherwise.
+        """
+        language = re.search(r"(?:respond in|Translate to) (\w+) language", text)
+        language = language.group(1) if language else "English"
+
+        # Translation prompt
+        translation = re.search(r"^Title: '(.*)'\nAbstract: (.*?)\n\n", text, re.M | re.S)
+        if schema is not None and "translated_title" in schema.model_fields and translation:
+            return schema(
+                translated_title=f"[{language}] {translation.group(1)}",
+                translated_abstract=f"[{language}] {translation.group(2)}",
+            ).model_dump_json()
+
+        # Document listing prompts
+        query = re.search(r'User Query:\n"(.*?)"\n\nRetrieved Documents:', text, re.S)
+        query_words = {word for word in _words(query.group(1)) if len(word) >= MIN_WORD_LENGTH} if query else set()
+        documents = re.findall(r"^Index \d+: Title: '(.*?)'\n(.*?)(?=^Index \d+: |\Z)", text, re.M | re.S)
+        known = re.search(r"Documents 1 to (\d+) are already known", text)
+        judged_from = int(known.group(1)) if known else 0
+
+        irrelevant = [
+            index
+            for index, (title, description) in enumerate(documents, start=1)
+            if index > judged_from and not query_words & set(_words(f"{title} {description}"))
+        ]
+        titles = [title for index, (title, _) in enumerate(documents, start=1) if index not in irrelevant]
+        comparison = f"[{language}] Compared with: " + "; ".join(titles)
+
+        if schema is None:
+            return comparison
+        values = {"indexes": irrelevant, "comparison": comparison}
+        return schema(**{field: values[field] for field in schema.model_fields if field in values}).model_dump_json()
+
+    def _respond(self, messages: List[BaseMessage], response_schema: Optional[type[BaseModel]]) -> AIMessage:
+        text = "\n".join(str(message.content) for message in messages)
+        content = self._answer(text, response_schema)
+        prompt_tokens, completion_tokens = len(text) // 4, len(content) // 4
+        return AIMessage(
+            content=content,
+            usage_metadata={
+                "input_tokens": prompt_tokens,
+                "output_tokens": completion_tokens,
+                "total_tokens": prompt_tokens + completion_tokens,
+            },
+            response_metadata={"model_name": self.model_name},
+        )
+
+    def _generate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[CallbackManagerForLLMRun] = None,
+        response_schema: Optional[type[BaseModel]] = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        time.sleep(self._sample_latency())
+        return ChatResult(generations=[ChatGeneration(message=self._respond(messages, response_schema))])
+
+    async def _agenerate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[AsyncCallbackManagerForLLMRun] = None,
+        response_schema: Optional[type[BaseModel]] = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        await asyncio.sleep(self._sample_latency())
+        return ChatResult(generations=[ChatGeneration(message=self._respond(messages, response_schema))])
+
+    def _stream(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[CallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> Iterator[ChatGenerationChunk]:
+        message = self._respond(messages, None)
+        time.sleep(self._sample_latency())
+        for chunk in self._chunks(message):
+            if run_manager is not None:
+                run_manager.on_llm_new_token(chunk.text, chunk=chunk)
+            yield chunk
+
+    async def _astream(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[AsyncCallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> AsyncIterator[ChatGenerationChunk]:
+        message = self._respond(messages, None)
+        await asyncio.sleep(self._sample_latency())
+        for chunk in self._chunks(message):
+            if run_manager is not None:
+                await run_manager.on_llm_new_token(chunk.text, chunk=chunk)
+            yield chunk
+
+    @staticmethod
+    def _chunks(message: AIMessage) -> Iterator[ChatGenerationChunk]:
+        """
+        Split a message in one chunk per word, the last one carrying the usage.
+
+        Returns:
+            An iterator of ChatGenerationChunk instances.
+        """
+        words = re.findall(r"\S+\s*", message.content)
+        for index, word in enumerate(words):
+            last = index == len(words) - 1
+            yield ChatGenerationChunk(
+                message=AIMessageChunk(
+                    content=word,
+                    usage_metadata=message.usage_metadata if last else None,
+                    response_metadata=message.response_metadata if last else {},
+                )
+            )
@@ -0,0 +1,151 @@
+import asyncio
+import csv
+import itertools
+import json
+from typing import AsyncIterator, Iterable, Iterator, TextIO, Union
+
+from pydantic import ValidationError
+
+from app.core.config import logger, settings
+from app.core.enums import IngestFormat
+from app.managers.vector_store import VectorStoreManager
+from app.schemas.documents import Document
+from app.schemas.ingest import (
+    BulkIngestResponse,
+    IngestBatchReport,
+    IngestCounts,
+    IngestRecordError,
+)
+
+Record = Union[Document, IngestRecordError]
+
+
+class IngestManager:
+    def __init__(
+        self,
+        vector_store_manager: VectorStoreManager,
+        batch_size: int = settings.INGEST_BATCH_SIZE,
+        max_concurrency: int = settings.INGEST_MAX_CONCURRENCY,
+    ):
+        self.vector_store_manager = vector_store_manager
+        self.batch_size = batch_size
+        self.max_concurrency = max_concurrency
+
+    @staticmethod
+    def read_records(file: TextIO, ingest_format: IngestFormat) -> Iterator[Record]:
+        """
+        Parse the documents of an NDJSON or CSV stream, one record per line or CSV row.
+
+        Returns:
+            An iterator of Document instances, or IngestRecordError instances for the records that are not valid.
+        """
+        if ingest_format is IngestFormat.Csv:
+            # Empty CSV cells stand for missing values
+            rows: Iterable = ({key: value for key, value in row.items() if value} for row in csv.DictReader(file))
+        else:
+            rows = (line for line in file if line.strip())
+
+        for record, row in enumerate(rows):
+            try:
+                yield Document(**(row if isinstance(row, dict) else json.loads(row)))
+            except (ValueError, TypeError, ValidationError) as error:
+                yield IngestRecordError(record=record, error=str(error))
+
+    def _ingest_batch(self, batch: int, first_record: int, records: list[Record]) -> IngestBatchReport:
+        """
+        Ingest one batch of records, reporting the invalid records and the batch failure if any.
+
+        Returns:
+            An IngestBatchReport instance.
+        """
+        documents = [record for record in records if isinstance(record, Document)]
+        invalid = [record for record in records if isinstance(record, IngestRecordError)]
+
+        counts, error = IngestCounts(), None
+        try:
+            counts = self.vector_store_manager.add_documents(documents)
+        except Exception as exception:
+            logger.exception("Ingestion of batch %d failed", batch)
+            error = str(exception)
+
+        return IngestBatchReport(
+            **counts.model_dump(),
+            batch=batch,
+            first_record=first_record,
+            end_record=first_record + len(records),
+            invalid=invalid,
+            error=error,
+            next_record=first_record,
+        )
+
+    async def ingest(self, records: Iterable[Record], skip: int = 0) -> AsyncIterator[IngestBatchReport]:
+        """
+        Ingest a stream of records in batches, running a bounded number of batches concurrently.
+
+        Only max_concurrency batches are read ahead, so memory stays flat regardless of the stream size. The
+        reports are yielded as the batches finish, each one with the record an interrupted load can resume from.
+
+        Returns:
+            An async iterator of IngestBatchReport instances.
+        """
+        records = iter(records)
+        await asyncio.to_thread(lambda: next(itertools.islice(records, skip, skip), None))
+
+        pending: set[asyncio.Task] = set()
+        completed: dict[int, int] = {}
+        next_record = skip
+        first_record = skip
+        batch = 0
+        exhausted = False
+
+        while not exhausted or pending:
+            if not exhausted:
+                records_batch = await asyncio.to_thread(lambda: list(itertools.islice(records, self.batch_size)))
+                if records_batch:
+                    pending.add(
+                        asyncio.create_task(asyncio.to_thread(self._ingest_batch, batch, first_record, records_batch))
+                    )
+                    first_record += len(records_batch)
+                    batch += 1
+                else:
+                    exhausted = True
+
+            if pending and (exhausted or len(pending) >= self.max_concurrency):
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for report in sorted((task.result() for task in done), key=lambda report: report.batch):
+                    # Advance the checkpoint over the contiguous run of finished batches
+                    completed[report.first_record] = report.end_record
+                    while next_record in completed:
+                        next_record = completed.pop(next_record)
+                    report.next_record = next_record
+                    logger.info(
+                        "Ingested batch %d (records %d-%d): %d inserted, %d updated, %d skipped, %d invalid%s",
+                        report.batch,
+                        report.first_record,
+                        report.end_record - 1,
+                        report.inserted,
+                        report.updated,
+                        report.skipped,
+                        len(report.invalid),
+                        f", failed: {report.error}" if report.error else "",
+                    )
+                    yield report
+
+    @staticmethod
+    def summarize(reports: list[IngestBatchReport], skip: int = 0) -> BulkIngestResponse:
+        """
+        Summarize the batch reports of an ingestion.
+
+        Returns:
+            A BulkIngestResponse instance.
+        """
+        return BulkIngestResponse(
+            records=sum(report.end_record - report.first_record for report in reports),
+            inserted=sum(report.inserted for report in reports),
+            updated=sum(report.updated for report in reports),
+            skipped=sum(report.skipped for report in reports),
+            invalid=sum(len(report.invalid) for report in reports),
+            failed=sum(report.end_record - report.first_record for report in reports if report.error),
+            next_record=max((report.next_record for report in reports), default=skip),
+            batches=sorted(reports, key=lambda report: report.batch),
+        )
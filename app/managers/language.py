@@ -1,6 +1,9 @@
+import asyncio
+
 import fasttext as ft
 
 from app.core.config import settings
+from app.core.metrics import stage
 
 
 class LanguageManager:
@@ -14,5 +17,25 @@ class LanguageManager:
         Returns:
             The detected language name.
         """
-        prediction = self.model.predict(query, k=1)
+        # fastText predicts one line at a time, so newlines must not reach the model
+        prediction = self.model.predict(" ".join(query.splitlines()), k=1)
         return settings.FASTTEXT_LANGUAGES_MAP[prediction[0][0].replace("__label__", "")]
+
+    async def adetect_language(self, query: str) -> str:
+        """
+        Detect the language of the given text in a worker thread, keeping the event loop free.
+
+        Returns:
+            The detected language name.
+        """
+        async with stage("language_detection"):
+            return await asyncio.to_thread(self.detect_language, query)
+
+    def detect_document_language(self, title: str, abstract: str) -> str:
+        """
+        Detect the language of a document from both its title and abstract.
+
+        Returns:
+            The detected language name.
+        """
+        return self.detect_language(f"{title} {abstract}")
@@ -0,0 +1,135 @@
+import re
+import sqlite3
+import threading
+from typing import Iterable
+
+from app.core.config import settings
+from app.schemas.documents import Document
+
+# BM25 weights of the title and abstract columns, a term of the title counts twice
+TITLE_WEIGHT = 2.0
+ABSTRACT_WEIGHT = 1.0
+
+
+class LexicalIndexManager:
+
+    """
+    A BM25 index of the titles and abstracts of the documents, in a SQLite FTS5 database shared by all the workers.
+
+    The text is tokenized on Unicode word boundaries, without diacritics and with Porter stemming, so "Néel" matches
+    "Neel" and "correlations" matches "correlated". Queries match documents containing any of their terms, ranked by
+    BM25. It runs fully offline and is kept up to date by the VectorStoreManager as documents are written and
+    deleted.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        settings.LEXICAL_INDEX_PATH.parent.mkdir(parents=True, exist_ok=True)
+        self.connection = sqlite3.connect(settings.LEXICAL_INDEX_PATH, timeout=30, check_same_thread=False)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        # The uuids get stable rowids, so that a document is replaced or deleted without scanning the index
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS uuids (rowid INTEGER PRIMARY KEY, uuid TEXT NOT NULL UNIQUE)"
+        )
+        self.connection.execute(
+            "CREATE VIRTUAL TABLE IF NOT EXISTS documents USING fts5("
+            "title, abstract, tokenize = 'porter unicode61 remove_diacritics 2')"
+        )
+        self.connection.commit()
+
+    @staticmethod
+    def to_match(query: str, prefix: bool = False) -> str:
+        """
+        Build an FTS5 query matching any term of a free-text query.
+
+        Every term is quoted, so the FTS5 syntax characters of the query are searched as text. With prefix, the last
+        term also matches the words it starts, for queries typed as the user types.
+
+        Returns:
+            The FTS5 query, empty if the query has no term.
+        """
+        terms = [f'"{term}"' for term in re.findall(r"\w+", query)]
+        if prefix and terms:
+            terms[-1] += "*"
+        return " OR ".join(terms)
+
+    def add(self, documents: Iterable[Document]) -> None:
+        """
+        Index documents, replacing the documents with the same uuids.
+
+        Returns:
+            None
+        """
+        with self.lock:
+            for document in documents:
+                self.connection.execute("INSERT OR IGNORE INTO uuids (uuid) VALUES (?)", (document.uuid,))
+                (rowid,) = self.connection.execute(
+                    "SELECT rowid FROM uuids WHERE uuid = ?", (document.uuid,)
+                ).fetchone()
+                self.connection.execute("DELETE FROM documents WHERE rowid = ?", (rowid,))
+                self.connection.execute(
+                    "INSERT INTO documents (rowid, title, abstract) VALUES (?, ?, ?)",
+                    (rowid, document.title, document.abstract),
+                )
+            self.connection.commit()
+
+    def delete(self, uuids: list[str]) -> None:
+        """
+        Remove documents from the index. Unknown uuids are skipped.
+
+        Returns:
+            None
+        """
+        with self.lock:
+            for uuid in uuids:
+                row = self.connection.execute("SELECT rowid FROM uuids WHERE uuid = ?", (uuid,)).fetchone()
+                if row is not None:
+                    self.connection.execute("DELETE FROM documents WHERE rowid = ?", row)
+                    self.connection.execute("DELETE FROM uuids WHERE rowid = ?", row)
+            self.connection.commit()
+
+    def search(self, query: str, k: int, prefix: bool = False) -> list[tuple[str, float]]:
+        """
+        Find the documents matching a query, best first.
+
+        Returns:
+            A list of (uuid, score) tuples, the score being the negated BM25 of SQLite, higher is better.
+        """
+        return self.search_batch([query], k, prefix)[0]
+
+    def search_batch(self, queries: list[str], k: int, prefix: bool = False) -> list[list[tuple[str, float]]]:
+        """
+        Find the documents matching every query, best first.
+
+        Returns:
+            A list with the (uuid, score) tuples of every query.
+        """
+        results = []
+        with self.lock:
+            for query in queries:
+                match = self.to_match(query, prefix)
+                if not match:
+                    results.append([])
+                    continue
+                results.append(
+                    [
+                        (uuid, -score)
+                        for uuid, score in self.connection.execute(
+                            "SELECT uuids.uuid, bm25(documents, ?, ?) AS score FROM documents "
+                            "JOIN uuids ON uuids.rowid = documents.rowid "
+                            "WHERE documents MATCH ? ORDER BY score LIMIT ?",
+                            (TITLE_WEIGHT, ABSTRACT_WEIGHT, match, k),
+                        )
+                    ]
+                )
+        return results
+
+    def count(self) -> int:
+        """
+        Count the indexed documents.
+
+        Returns:
+            The number of indexed documents.
+        """
+        with self.lock:
+            return self.connection.execute("SELECT COUNT(*) FROM uuids").fetchone()[0]
@@ -0,0 +1,48 @@
+from typing import Any, Optional
+
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.outputs import LLMResult
+
+from app.core.config import settings
+from app.core.metrics import llm_calls, llm_cost, llm_tokens
+
+
+def model_price(model: str) -> Optional[list[float]]:
+    """
+    Get the price of a model, matching dated model names such as gpt-4o-mini-2024-07-18 by their longest prefix.
+
+    Returns:
+        The USD per million prompt and completion tokens, or None if the model has no configured price.
+    """
+    prefixes = [prefix for prefix in settings.OPENAI_MODEL_PRICES if model.startswith(prefix)]
+    return settings.OPENAI_MODEL_PRICES[max(prefixes, key=len)] if prefixes else None
+
+
+class LLMUsageCallback(BaseCallbackHandler):
+
+    """
+    A callback recording the calls, tokens and estimated cost of the LLM calls made for a purpose.
+    """
+
+    def __init__(self, purpose: str):
+        self.purpose = purpose
+
+    def on_llm_end(self, response: LLMResult, **kwargs: Any) -> None:
+        for generations in response.generations:
+            for generation in generations[:1]:
+                message = getattr(generation, "message", None)
+                usage = getattr(message, "usage_metadata", None) or {}
+                model = (getattr(message, "response_metadata", None) or {}).get("model_name") or (
+                    response.llm_output or {}
+                ).get("model_name", "unknown")
+
+                prompt_tokens = usage.get("input_tokens", 0)
+                completion_tokens = usage.get("output_tokens", 0)
+                llm_calls.inc(model, self.purpose)
+                llm_tokens.inc(model, self.purpose, "prompt", amount=prompt_tokens)
+                llm_tokens.inc(model, self.purpose, "completion", amount=completion_tokens)
+
+                price = model_price(model)
+                if price is not None:
+                    cost = (prompt_tokens * price[0] + completion_tokens * price[1]) / 1_000_000
+                    llm_cost.inc(model, self.purpose, amount=cost)
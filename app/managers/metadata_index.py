@@ -0,0 +1,180 @@
+import re
+import sqlite3
+import threading
+import time
+from typing import Iterable, Optional
+
+from app.core.config import settings
+from app.managers.vector_backend import Where
+from app.schemas.documents import Document, DocumentFilters
+
+# List-valued metadata fields, stored joined in the collections and indexed here
+INDEXED_FIELDS = ("authors", "tags")
+# Seconds after which the content hash claim of a worker that never released it can be taken over
+CLAIM_TIMEOUT = 3600
+
+
+class MetadataIndexManager:
+
+    """
+    An inverted index of the authors and tags of the documents, in a SQLite database shared by all the workers.
+
+    The collections only store scalar metadata, so the authors and tags are joined in a single string that a where
+    filter cannot match one value at a time. This index maps every author and tag to the uuids of its documents, so
+    that the filters on them resolve to a set of uuids the search is restricted to. Values are matched case
+    insensitively and regardless of spacing. It is kept up to date by the VectorStoreManager as documents are written
+    and deleted.
+
+    The same database holds the content hashes claimed by the workers writing documents without client uuid, so that
+    identical documents posted concurrently to different workers are only written once.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        settings.METADATA_INDEX_PATH.parent.mkdir(parents=True, exist_ok=True)
+        self.connection = sqlite3.connect(settings.METADATA_INDEX_PATH, timeout=30, check_same_thread=False)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS postings ("
+            "field TEXT NOT NULL, value TEXT NOT NULL, uuid TEXT NOT NULL, PRIMARY KEY (field, value, uuid)"
+            ") WITHOUT ROWID"
+        )
+        self.connection.execute("CREATE INDEX IF NOT EXISTS postings_uuid ON postings (uuid)")
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS claims ("
+            "content_hash TEXT PRIMARY KEY, uuid TEXT NOT NULL, claimed_at REAL NOT NULL"
+            ") WITHOUT ROWID"
+        )
+        self.connection.commit()
+
+    @staticmethod
+    def normalize(value: str) -> str:
+        """
+        Normalize an author or tag for matching.
+
+        Returns:
+            The value, case folded and with its whitespace collapsed.
+        """
+        return re.sub(r"\s+", " ", value).strip().casefold()
+
+    def add(self, documents: Iterable[Document]) -> None:
+        """
+        Index the authors and tags of documents, replacing the entries of the documents with the same uuids.
+
+        Returns:
+            None
+        """
+        with self.lock:
+            for document in documents:
+                self.connection.execute("DELETE FROM postings WHERE uuid = ?", (document.uuid,))
+                self.connection.executemany(
+                    "INSERT OR IGNORE INTO postings VALUES (?, ?, ?)",
+                    [
+                        (field, self.normalize(value), document.uuid)
+                        for field in INDEXED_FIELDS
+                        for value in getattr(document, field) or []
+                        if value.strip()
+                    ],
+                )
+            self.connection.commit()
+
+    def delete(self, uuids: list[str]) -> None:
+        """
+        Remove documents from the index. Unknown uuids are skipped.
+
+        Returns:
+            None
+        """
+        with self.lock:
+            self.connection.executemany("DELETE FROM postings WHERE uuid = ?", [(uuid,) for uuid in uuids])
+            self.connection.commit()
+
+    def claim(self, uuids_by_hash: dict[str, str]) -> dict[str, str]:
+        """
+        Claim content hashes for the documents about to be written under the given uuids. A hash already claimed by
+        another call keeps its claim, unless it is older than CLAIM_TIMEOUT.
+
+        Returns:
+            The uuid each content hash is claimed for, the given one when the claim succeeded.
+        """
+        if not uuids_by_hash:
+            return {}
+        now = time.time()
+        with self.lock:
+            self.connection.executemany(
+                "INSERT INTO claims VALUES (?, ?, ?) ON CONFLICT (content_hash) DO UPDATE "
+                "SET uuid = excluded.uuid, claimed_at = excluded.claimed_at WHERE claimed_at < ?",
+                [(content_hash, uuid, now, now - CLAIM_TIMEOUT) for content_hash, uuid in uuids_by_hash.items()],
+            )
+            self.connection.commit()
+            hashes = list(uuids_by_hash)
+            return dict(
+                self.connection.execute(
+                    f"SELECT content_hash, uuid FROM claims WHERE content_hash IN ({', '.join('?' * len(hashes))})",
+                    hashes,
+                ).fetchall()
+            )
+
+    def release(self, uuids_by_hash: dict[str, str]) -> None:
+        """
+        Release content hashes claimed for the given uuids. Hashes claimed for other uuids are kept.
+
+        Returns:
+            None
+        """
+        with self.lock:
+            self.connection.executemany(
+                "DELETE FROM claims WHERE content_hash = ? AND uuid = ?", list(uuids_by_hash.items())
+            )
+            self.connection.commit()
+
+    def lookup(self, field: str, values: list[str]) -> set[str]:
+        """
+        Find the documents with any of the given values of an indexed field.
+
+        Returns:
+            The uuids of the matching documents.
+        """
+        values = list({self.normalize(value) for value in values})
+        with self.lock:
+            return {
+                uuid
+                for (uuid,) in self.connection.execute(
+                    f"SELECT uuid FROM postings WHERE field = ? AND value IN ({', '.join('?' * len(values))})",
+                    [field, *values],
+                )
+            }
+
+    def resolve(self, filters: Optional[DocumentFilters]) -> tuple[Optional[Where], Optional[list[str]]]:
+        """
+        Translate filters to the restrictions of a collection read or search.
+
+        The language and ingestion date filters become a where clause on the stored metadata, and the author and tag
+        filters the uuids of the documents having them, so that both are applied by the collection itself.
+
+        Returns:
+            A tuple with the where clause, None without scalar filters, and the allowed uuids, None without list
+            filters and empty when no document matches.
+        """
+        if filters is None:
+            return None, None
+
+        # 1. Scalar filters, pushed down to the collection
+        clauses = []
+        if filters.languages:
+            clauses.append({"language": {"$in": filters.languages}})
+        if filters.ingested_after is not None:
+            clauses.append({"ingested_at": {"$gte": int(filters.ingested_after.timestamp())}})
+        if filters.ingested_before is not None:
+            clauses.append({"ingested_at": {"$lte": int(filters.ingested_before.timestamp())}})
+        where = None if not clauses else clauses[0] if len(clauses) == 1 else {"$and": clauses}
+
+        # 2. List filters, resolved through the inverted index
+        uuids: Optional[set[str]] = None
+        for field in INDEXED_FIELDS:
+            values = getattr(filters, field)
+            if values:
+                matches = self.lookup(field, values)
+                uuids = matches if uuids is None else uuids & matches
+
+        return where, sorted(uuids) if uuids is not None else None
@@ -0,0 +1,550 @@
+import json
+import re
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Callable, Optional, Sequence
+
+import numpy as np
+from langchain_core.documents import Document as LangchainDocument
+from langchain_core.embeddings import Embeddings
+
+from app.core.enums import DistanceSpace, VectorPrecision, VectorQuantization
+from app.core.quantization import code_scores, code_shape, encode, truncate
+from app.managers.vector_backend import VectorBackend, Where
+
+# Rows allocated when the vector file is created, its capacity doubles whenever it is full
+MIN_CAPACITY = 1024
+# Documents embedded and written per add call, which bounds the memory of a write
+MAX_BATCH_SIZE = 4096
+# Metadata fields are spliced in the SQL, so that the filters can use the expression indexes
+FIELD_PATTERN = re.compile(r"^[A-Za-z_][A-Za-z0-9_]*$")
+COMPARISONS = {"$eq": "=", "$ne": "!=", "$gt": ">", "$gte": ">=", "$lt": "<", "$lte": "<="}
+
+
+def _field(name: str) -> str:
+    if not FIELD_PATTERN.match(name):
+        raise ValueError(f"Invalid metadata field: {name}")
+    return f"json_extract(metadata, '$.{name}')"
+
+
+def where_to_sql(where: Where) -> tuple[str, list]:
+    """
+    Translate a Chroma where filter to a SQL condition on the metadata column.
+
+    Supports the $and and $or combinations, the $in and $nin lists, and the comparison operators.
+
+    Returns:
+        A tuple with the SQL condition and its parameters.
+    """
+    clauses, params = [], []
+    for key, condition in where.items():
+        if key in ("$and", "$or"):
+            parts = [where_to_sql(item) for item in condition]
+            clauses.append("(" + f" {key[1:].upper()} ".join(sql for sql, _ in parts) + ")")
+            params.extend(param for _, part_params in parts for param in part_params)
+            continue
+
+        if not isinstance(condition, dict):
+            condition = {"$eq": condition}
+        for operator, value in condition.items():
+            if operator in ("$in", "$nin"):
+                # A single JSON parameter, so that long lists do not reach the SQLite variable limit
+                negation = "NOT " if operator == "$nin" else ""
+                clauses.append(f"{_field(key)} {negation}IN (SELECT value FROM json_each(?))")
+                params.append(json.dumps(value))
+            elif operator in COMPARISONS:
+                clauses.append(f"{_field(key)} {COMPARISONS[operator]} ?")
+                params.append(value)
+            else:
+                raise ValueError(f"Unsupported where operator: {operator}")
+
+    return " AND ".join(clauses) or "1", params
+
+
+class NumpyBackend(VectorBackend):
+
+    """
+    A collection stored as a memory-mapped matrix of embeddings, searched exactly with blocked matrix products.
+
+    The vectors live in a float32 or float16 file mapped by every worker, so the page cache holds a single copy of
+    them shared by all the workers, and opening the collection reads nothing. A byte per row flags the live rows.
+    The ids, contents and metadata are kept in a SQLite side file, read only for the hits of a search, with
+    expression indexes on the metadata fields used in filters.
+
+    With quantization, the search scans int8 or binary codes of the leading code dimensions of the vectors instead,
+    which are 4 to 32 times smaller than the float32 vectors before truncation, and re-ranks the best candidates
+    with their full-precision vectors, read from the vector file. Only the codes then need to stay in memory.
+
+    Writers of any worker serialize on the SQLite write lock. They write the vectors and flag them live before
+    committing their rows, and unflag the rows before deleting them, so a concurrent search at most skips a hit
+    whose row is not committed yet.
+    """
+
+    def __init__(
+        self,
+        collection_name: str,
+        embeddings: Embeddings,
+        directory: Path,
+        space: DistanceSpace,
+        precision: VectorPrecision,
+        block_size: int,
+        indexed_fields: Sequence[str] = (),
+        quantization: VectorQuantization = VectorQuantization.Disabled,
+        code_dimensions: Optional[int] = None,
+        rerank_candidates: int = 10,
+    ):
+        self.embeddings = embeddings
+        self.block_size = block_size
+        self.quantization = quantization
+        self.rerank_candidates = rerank_candidates
+        self.lock = threading.Lock()
+        self.vectors: Optional[np.memmap] = None
+        self.alive: Optional[np.memmap] = None
+        self.codes: Optional[np.memmap] = None
+        self.scales: Optional[np.memmap] = None
+
+        directory.mkdir(parents=True, exist_ok=True)
+        self.vectors_path = directory / f"{collection_name}.vectors"
+        self.alive_path = directory / f"{collection_name}.alive"
+        self.codes_path = directory / f"{collection_name}.codes"
+        self.scales_path = directory / f"{collection_name}.scales"
+        self.connection = sqlite3.connect(directory / f"{collection_name}.sqlite3", timeout=30, check_same_thread=False)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS rows ("
+            "row INTEGER PRIMARY KEY, id TEXT NOT NULL UNIQUE, document TEXT NOT NULL, metadata TEXT NOT NULL)"
+        )
+        self.connection.execute("CREATE TABLE IF NOT EXISTS free_rows (row INTEGER PRIMARY KEY)")
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS layout ("
+            "space TEXT NOT NULL, precision TEXT NOT NULL, dimensions INTEGER, "
+            "capacity INTEGER NOT NULL, used INTEGER NOT NULL, quantization TEXT NOT NULL, code_dimensions INTEGER)"
+        )
+        for field in indexed_fields:
+            self.connection.execute(f"CREATE INDEX IF NOT EXISTS rows_{field} ON rows ({_field(field)})")
+
+        # The distance space and precision only apply when the collection is created, the codes are encoded again
+        # when the quantization changes
+        self.connection.execute("BEGIN IMMEDIATE")
+        try:
+            if self.connection.execute("SELECT 1 FROM layout").fetchone() is None:
+                self.connection.execute(
+                    "INSERT INTO layout VALUES (?, ?, NULL, 0, 0, ?, ?)",
+                    (space.value, precision.value, quantization.value, code_dimensions),
+                )
+            space, precision, stored_quantization, stored_code_dimensions = self.connection.execute(
+                "SELECT space, precision, quantization, code_dimensions FROM layout"
+            ).fetchone()
+            self.space = DistanceSpace(space)
+            self.dtype = np.dtype(precision)
+            self.requested_code_dimensions = code_dimensions
+            if (stored_quantization, stored_code_dimensions) != (quantization.value, code_dimensions):
+                self._encode_codes()
+            self.connection.commit()
+        except Exception:
+            self.connection.rollback()
+            raise
+
+    def get_distance_space(self) -> DistanceSpace:
+        return self.space
+
+    def get_max_batch_size(self) -> int:
+        return MAX_BATCH_SIZE
+
+    def _map(self) -> int:
+        """
+        Map the vector, live flag and code files at the current capacity, remapping them after any worker grew them.
+
+        Must be called with the lock held.
+
+        Returns:
+            The number of rows in use, live or free.
+        """
+        dimensions, capacity, used = self.connection.execute("SELECT dimensions, capacity, used FROM layout").fetchone()
+        if dimensions is None:
+            return 0
+        if self.vectors is None or self.vectors.shape != (capacity, dimensions):
+            self.code_dimensions = min(self.requested_code_dimensions or dimensions, dimensions)
+            self.vectors = np.memmap(self.vectors_path, dtype=self.dtype, mode="r+", shape=(capacity, dimensions))
+            self.alive = np.memmap(self.alive_path, dtype=np.uint8, mode="r+", shape=(capacity,))
+            if self.quantization is not VectorQuantization.Disabled:
+                width, code_dtype = code_shape(self.quantization, self.code_dimensions)
+                self.codes = np.memmap(self.codes_path, dtype=code_dtype, mode="r+", shape=(capacity, width))
+                self.scales = np.memmap(self.scales_path, dtype=np.float32, mode="r+", shape=(capacity,))
+        return used
+
+    def _file_sizes(self, dimensions: int, capacity: int) -> list[tuple[Path, int]]:
+        sizes = [(self.vectors_path, capacity * dimensions * self.dtype.itemsize), (self.alive_path, capacity)]
+        if self.quantization is not VectorQuantization.Disabled:
+            width, code_dtype = code_shape(
+                self.quantization, min(self.requested_code_dimensions or dimensions, dimensions)
+            )
+            sizes += [(self.codes_path, capacity * width * code_dtype.itemsize), (self.scales_path, capacity * 4)]
+        return sizes
+
+    def _encode_codes(self) -> None:
+        """
+        Encode the codes of every row from the full-precision vectors, one block at a time.
+
+        Must be called within the write transaction.
+
+        Returns:
+            None
+        """
+        dimensions, capacity = self.connection.execute("SELECT dimensions, capacity FROM layout").fetchone()
+        if dimensions is not None and self.quantization is not VectorQuantization.Disabled:
+            for path, size in self._file_sizes(dimensions, capacity)[2:]:
+                with open(path, "wb") as file:
+                    file.truncate(size)
+            self.vectors = None
+            used = self._map()
+            for start in range(0, used, self.block_size):
+                stop = min(start + self.block_size, used)
+                self.codes[start:stop], self.scales[start:stop] = encode(
+                    self.quantization, self.vectors[start:stop], self.code_dimensions
+                )
+            self.codes.flush()
+            self.scales.flush()
+        self.connection.execute(
+            "UPDATE layout SET quantization = ?, code_dimensions = ?",
+            (self.quantization.value, self.requested_code_dimensions),
+        )
+
+    def _grow(self, dimensions: int, rows: int) -> None:
+        """
+        Extend the vector, live flag and code files to hold at least the given number of rows.
+
+        Must be called within the write transaction. The files are extended sparsely, and the searches still running
+        on the previous mapping are unaffected since the files only grow.
+
+        Returns:
+            None
+        """
+        (capacity,) = self.connection.execute("SELECT capacity FROM layout").fetchone()
+        capacity = max(MIN_CAPACITY, 2 * capacity, rows)
+        for path, size in self._file_sizes(dimensions, capacity):
+            with open(path, "ab") as file:
+                file.truncate(size)
+        self.connection.execute("UPDATE layout SET dimensions = ?, capacity = ?", (dimensions, capacity))
+        self._map()
+
+    def _normalize(self, vectors: np.ndarray) -> np.ndarray:
+        """
+        Normalize vectors to unit length in the cosine space, where the distance only depends on their direction.
+
+        Returns:
+            The vectors, normalized in the cosine space.
+        """
+        if self.space is not DistanceSpace.Cosine:
+            return vectors
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        return vectors / np.maximum(norms, np.finfo(np.float32).tiny)
+
+    @staticmethod
+    def _conditions(ids: Optional[list[str]], where: Optional[Where]) -> tuple[str, list]:
+        clauses, params = [], []
+        if ids is not None:
+            clauses.append("id IN (SELECT value FROM json_each(?))")
+            params.append(json.dumps(ids))
+        if where:
+            sql, where_params = where_to_sql(where)
+            clauses.append(sql)
+            params.extend(where_params)
+        return " AND ".join(clauses) or "1", params
+
+    def get(
+        self,
+        ids: Optional[list[str]] = None,
+        where: Optional[Where] = None,
+        limit: Optional[int] = None,
+        offset: Optional[int] = None,
+        include: Sequence[str] = ("metadatas",),
+    ) -> dict:
+        conditions, params = self._conditions(ids, where)
+        query = f"SELECT row, id, document, metadata FROM rows WHERE {conditions} ORDER BY row"
+        if limit is not None or offset:
+            query += " LIMIT ? OFFSET ?"
+            params += [limit if limit is not None else -1, offset or 0]
+        with self.lock:
+            rows = self.connection.execute(query, params).fetchall()
+            if "embeddings" in include:
+                self._map()
+
+        result = {"ids": [id_ for _, id_, _, _ in rows]}
+        if "metadatas" in include:
+            result["metadatas"] = [json.loads(metadata) for _, _, _, metadata in rows]
+        if "documents" in include:
+            result["documents"] = [document for _, _, document, _ in rows]
+        if "embeddings" in include:
+            vectors = self.vectors[[row for row, _, _, _ in rows]] if rows else np.empty((0, 0))
+            result["embeddings"] = np.asarray(vectors, dtype=np.float32)
+        return result
+
+    def add(self, documents: list[LangchainDocument], ids: list[str]) -> None:
+        if not documents:
+            return
+        vectors = np.asarray(self.embeddings.embed_documents([doc.page_content for doc in documents]), np.float32)
+        vectors = self._normalize(vectors)
+        # The last occurrence of an id wins
+        positions = {id_: index for index, id_ in enumerate(ids)}
+
+        with self.lock:
+            # Take the write lock first, so the workers claim distinct rows
+            self.connection.execute("BEGIN IMMEDIATE")
+            allocated = []
+            try:
+                dimensions, capacity, used = self.connection.execute(
+                    "SELECT dimensions, capacity, used FROM layout"
+                ).fetchone()
+                if dimensions is not None and dimensions != vectors.shape[1]:
+                    raise ValueError(
+                        f"Embedding dimension {vectors.shape[1]} does not match the collection dimension {dimensions}"
+                    )
+
+                # 1. Replace the rows of the known ids, and reuse deleted rows before appending new ones
+                rows = dict(
+                    self.connection.execute(
+                        f"SELECT id, row FROM rows WHERE id IN ({', '.join('?' * len(positions))})", list(positions)
+                    ).fetchall()
+                )
+                new_ids = [id_ for id_ in positions if id_ not in rows]
+                free_rows = [
+                    row
+                    for (row,) in self.connection.execute(
+                        "SELECT row FROM free_rows ORDER BY row LIMIT ?", (len(new_ids),)
+                    ).fetchall()
+                ]
+                appended = len(new_ids) - len(free_rows)
+                allocated = free_rows + list(range(used, used + appended))
+                rows.update(zip(new_ids, allocated))
+                if dimensions is None or used + appended > capacity:
+                    self._grow(vectors.shape[1], used + appended)
+                else:
+                    self._map()
+
+                # 2. Write the vectors and flag them live, then commit their rows
+                targets = np.fromiter((rows[id_] for id_ in positions), dtype=np.int64, count=len(positions))
+                self.vectors[targets] = vectors[list(positions.values())]
+                self.vectors.flush()
+                if self.quantization is not VectorQuantization.Disabled:
+                    self.codes[targets], self.scales[targets] = encode(
+                        self.quantization, vectors[list(positions.values())], self.code_dimensions
+                    )
+                    self.codes.flush()
+                    self.scales.flush()
+                self.alive[targets] = 1
+                self.alive.flush()
+
+                self.connection.executemany(
+                    "INSERT OR REPLACE INTO rows VALUES (?, ?, ?, ?)",
+                    [
+                        (
+                            rows[id_],
+                            id_,
+                            documents[index].page_content,
+                            json.dumps(documents[index].metadata, ensure_ascii=False),
+                        )
+                        for id_, index in positions.items()
+                    ],
+                )
+                self.connection.executemany("DELETE FROM free_rows WHERE row = ?", [(row,) for row in free_rows])
+                self.connection.execute("UPDATE layout SET used = ?", (used + appended,))
+                self.connection.commit()
+            except Exception:
+                self.connection.rollback()
+                if allocated and self.alive is not None:
+                    self.alive[allocated] = 0
+                raise
+
+    def update_metadatas(self, ids: list[str], metadatas: list[dict]) -> None:
+        with self.lock:
+            self.connection.executemany(
+                "UPDATE rows SET metadata = ? WHERE id = ?",
+                [(json.dumps(metadata, ensure_ascii=False), id_) for id_, metadata in zip(ids, metadatas)],
+            )
+            self.connection.commit()
+
+    def delete(self, ids: Optional[list[str]] = None, where: Optional[Where] = None) -> None:
+        if ids is None and not where:
+            raise ValueError("Either ids or where must be given")
+        conditions, params = self._conditions(ids, where)
+
+        with self.lock:
+            self.connection.execute("BEGIN IMMEDIATE")
+            try:
+                rows = [row for (row,) in self.connection.execute(f"SELECT row FROM rows WHERE {conditions}", params)]
+                if rows:
+                    self._map()
+                    self.alive[rows] = 0
+                    self.alive.flush()
+                    self.connection.executemany("DELETE FROM rows WHERE row = ?", [(row,) for row in rows])
+                    self.connection.executemany("INSERT INTO free_rows VALUES (?)", [(row,) for row in rows])
+                self.connection.commit()
+            except Exception:
+                self.connection.rollback()
+                raise
+
+    def _vector_scores(self, queries: np.ndarray, start: int, stop: int) -> np.ndarray:
+        """
+        Score a block of full-precision vectors, higher is closer.
+
+        The score is the inner product, or 2 <q, v> - |v|^2 in the l2 space, which ranks the rows like the negated
+        squared distance.
+
+        Returns:
+            An array with the score of every row of the block for every query.
+        """
+        block = np.asarray(self.vectors[start:stop], dtype=np.float32)
+        scores = queries @ block.T
+        if self.space is DistanceSpace.L2:
+            scores = 2 * scores - np.einsum("ij,ij->i", block, block)
+        return scores
+
+    def _code_scores(self, queries: np.ndarray, start: int, stop: int) -> np.ndarray:
+        return code_scores(self.quantization, queries, self.codes[start:stop], self.scales[start:stop])
+
+    def _top_k(
+        self,
+        queries: np.ndarray,
+        k: int,
+        used: int,
+        score_block: Callable[[np.ndarray, int, int], np.ndarray],
+        allowed: Optional[np.ndarray] = None,
+    ) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Find the rows with the highest scores for every query, one block of rows at a time, among the allowed rows
+        if given.
+
+        Every block is reduced to its top k with argpartition and merged with the best rows so far, so the memory of
+        a search is bounded by the block size whatever the size of the collection. Blocks without allowed rows are
+        not scored.
+
+        Returns:
+            A tuple with the rows and scores of every query, best first, dead and disallowed rows scored -inf.
+        """
+        alive = self.alive
+        best_rows = np.empty((len(queries), 0), dtype=np.int64)
+        best_scores = np.empty((len(queries), 0), dtype=np.float32)
+
+        for start in range(0, used, self.block_size):
+            stop = min(start + self.block_size, used)
+            if allowed is not None and not allowed[start:stop].any():
+                continue
+            scores = score_block(queries, start, stop)
+            dead = alive[start:stop] == 0
+            if allowed is not None:
+                dead |= ~allowed[start:stop]
+            if dead.any():
+                scores[:, dead] = -np.inf
+
+            if scores.shape[1] > k:
+                top = np.argpartition(scores, -k, axis=1)[:, -k:]
+                scores, rows = np.take_along_axis(scores, top, axis=1), top + start
+            else:
+                rows = np.broadcast_to(np.arange(start, stop), scores.shape)
+
+            best_scores = np.concatenate([best_scores, scores], axis=1)
+            best_rows = np.concatenate([best_rows, rows], axis=1)
+            if best_scores.shape[1] > k:
+                top = np.argpartition(best_scores, -k, axis=1)[:, -k:]
+                best_scores = np.take_along_axis(best_scores, top, axis=1)
+                best_rows = np.take_along_axis(best_rows, top, axis=1)
+
+        order = np.argsort(-best_scores, axis=1, kind="stable")
+        return np.take_along_axis(best_rows, order, axis=1), np.take_along_axis(best_scores, order, axis=1)
+
+    def _subset_top_k(self, queries: np.ndarray, subset: list[int], k: int) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Find the rows with the highest scores for every query among a subset of rows no larger than a block.
+
+        The vectors of the subset are read once and scored for every query with a single product, so the memory of
+        a search is bounded by the block size like a scan of the whole matrix.
+
+        Returns:
+            A tuple with the rows and scores of every query, best first, dead rows scored -inf.
+        """
+        rows = np.asarray(sorted(subset), dtype=np.int64)
+        block = np.asarray(self.vectors[rows], dtype=np.float32)
+        scores = queries @ block.T
+        if self.space is DistanceSpace.L2:
+            scores = 2 * scores - np.einsum("ij,ij->i", block, block)
+        scores[:, self.alive[rows] == 0] = -np.inf
+
+        if scores.shape[1] > k:
+            top = np.argpartition(scores, -k, axis=1)[:, -k:]
+            scores = np.take_along_axis(scores, top, axis=1)
+        else:
+            top = np.broadcast_to(np.arange(len(rows)), scores.shape)
+        order = np.argsort(-scores, axis=1, kind="stable")
+        return rows[np.take_along_axis(top, order, axis=1)], np.take_along_axis(scores, order, axis=1)
+
+    def _rerank(self, queries: np.ndarray, rows: np.ndarray, live: np.ndarray, k: int) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Score the candidates found with the codes against their full-precision vectors and keep the top k.
+
+        Only the vectors of the candidates are read, so the vector file does not need to stay in memory.
+
+        Returns:
+            A tuple with the rows and scores of every query, best first, dead rows scored -inf.
+        """
+        vectors = np.asarray(self.vectors[rows.ravel()], dtype=np.float32).reshape(*rows.shape, -1)
+        scores = np.einsum("qd,qcd->qc", queries, vectors)
+        if self.space is DistanceSpace.L2:
+            scores = 2 * scores - np.einsum("qcd,qcd->qc", vectors, vectors)
+        scores[~live] = -np.inf
+
+        order = np.argsort(-scores, axis=1, kind="stable")[:, :k]
+        return np.take_along_axis(rows, order, axis=1), np.take_along_axis(scores, order, axis=1)
+
+    def search(
+        self, embeddings: list[list[float]], k: int, ids: Optional[list[str]] = None, where: Optional[Where] = None
+    ) -> list[list[tuple[LangchainDocument, float]]]:
+        restricted = ids is not None or bool(where)
+        with self.lock:
+            used = self._map()
+            if restricted:
+                conditions, params = self._conditions(ids, where)
+                subset = [row for (row,) in self.connection.execute(f"SELECT row FROM rows WHERE {conditions}", params)]
+        if used == 0 or k <= 0 or not embeddings or (restricted and not subset):
+            return [[] for _ in embeddings]
+        queries = self._normalize(np.asarray(embeddings, dtype=np.float32))
+
+        # 1. Score the rows of the given ids and filter directly when they fit in a block, or else the whole matrix,
+        # or its codes then the best candidates, masking the other rows. The files only grow, so the lock is not held
+        allowed = None
+        if restricted and len(subset) > self.block_size:
+            allowed = np.zeros(used, dtype=bool)
+            allowed[subset] = True
+        if restricted and allowed is None:
+            rows, scores = self._subset_top_k(queries, subset, k)
+        elif self.quantization is VectorQuantization.Disabled:
+            rows, scores = self._top_k(queries, k, used, self._vector_scores, allowed)
+        else:
+            candidates, candidate_scores = self._top_k(
+                truncate(queries, self.code_dimensions), k * self.rerank_candidates, used, self._code_scores, allowed
+            )
+            rows, scores = self._rerank(queries, candidates, np.isfinite(candidate_scores), k)
+        if self.space is DistanceSpace.L2:
+            distances = np.einsum("ij,ij->i", queries, queries)[:, None] - scores
+        else:
+            distances = 1.0 - scores
+
+        # 2. Read the rows of the hits, skipping dead rows and rows not committed yet
+        hits = np.unique(rows[np.isfinite(scores)]).tolist()
+        with self.lock:
+            stored = {
+                row: LangchainDocument(id=id_, page_content=document, metadata=json.loads(metadata))
+                for row, id_, document, metadata in self.connection.execute(
+                    f"SELECT row, id, document, metadata FROM rows WHERE row IN ({', '.join('?' * len(hits))})", hits
+                )
+            }
+
+        return [
+            [
+                (stored[row], float(distance))
+                for row, distance, live in zip(query_rows.tolist(), query_distances.tolist(), query_live.tolist())
+                if live and row in stored
+            ]
+            for query_rows, query_distances, query_live in zip(rows, distances, np.isfinite(scores))
+        ]
@@ -0,0 +1,117 @@
+import importlib.util
+import json
+
+import httpx
+
+from app.core.config import logger, settings
+from app.core.rate_limit import RateLimiter
+from app.schemas.stats import RateLimiterStats
+
+
+def estimate_tokens(request: httpx.Request) -> int:
+    """
+    Estimate the tokens a chat completion or embedding request counts against the tokens per minute limit.
+
+    The prompt is estimated at four characters per token, or counted exactly when it is sent as token ids, and the
+    completion at its maximum length.
+
+    Returns:
+        The estimated number of tokens.
+    """
+    try:
+        body = json.loads(request.content)
+    except (ValueError, UnicodeDecodeError):
+        return 0
+    if not isinstance(body, dict):
+        return 0
+
+    if "input" in body:
+        inputs = body["input"] if isinstance(body["input"], list) else [body["input"]]
+        if inputs and all(isinstance(item, int) for item in inputs):
+            return len(inputs)
+        return sum(len(item) if isinstance(item, list) else len(str(item)) // 4 for item in inputs)
+
+    prompt_tokens = sum(len(str(message.get("content") or "")) // 4 for message in body.get("messages", []))
+    completion_tokens = (
+        body.get("max_completion_tokens") or body.get("max_tokens") or settings.OPENAI_COMPLETION_TOKENS_ESTIMATE
+    )
+    return prompt_tokens + completion_tokens
+
+
+class OpenAIClientManager:
+
+    """
+    The HTTP clients shared by every OpenAI model of the worker.
+
+    All the chat and embedding models send their requests through the same connection pool, so the number of
+    connections is capped for the whole worker, and through the same rate limiter, which paces them to the
+    configured requests and tokens per minute and backs off when the API reports that a limit is exhausted.
+    """
+
+    def __init__(self):
+        self.rate_limiter = RateLimiter(settings.OPENAI_REQUESTS_PER_MINUTE, settings.OPENAI_TOKENS_PER_MINUTE)
+
+        http2 = settings.OPENAI_HTTP2 and importlib.util.find_spec("h2") is not None
+        if settings.OPENAI_HTTP2 and not http2:
+            logger.warning("HTTP/2 is enabled but the h2 package is not installed, falling back to HTTP/1.1")
+
+        limits = httpx.Limits(
+            max_connections=settings.OPENAI_MAX_CONNECTIONS, max_keepalive_connections=settings.OPENAI_MAX_CONNECTIONS
+        )
+        timeout = httpx.Timeout(settings.OPENAI_TIMEOUT)
+        self.http_client = httpx.Client(
+            http2=http2,
+            limits=limits,
+            timeout=timeout,
+            event_hooks={"request": [self._on_request], "response": [self._on_response]},
+        )
+        self.http_async_client = httpx.AsyncClient(
+            http2=http2,
+            limits=limits,
+            timeout=timeout,
+            event_hooks={"request": [self._aon_request], "response": [self._aon_response]},
+        )
+
+    def _on_request(self, request: httpx.Request) -> None:
+        self.rate_limiter.acquire_sync(estimate_tokens(request))
+
+    def _on_response(self, response: httpx.Response) -> None:
+        self.rate_limiter.observe(response.status_code, response.headers)
+
+    async def _aon_request(self, request: httpx.Request) -> None:
+        await self.rate_limiter.acquire(estimate_tokens(request))
+
+    async def _aon_response(self, response: httpx.Response) -> None:
+        self.rate_limiter.observe(response.status_code, response.headers)
+
+    def get_client_kwargs(self) -> dict:
+        """
+        Get the arguments that make a LangChain OpenAI model use the shared clients.
+
+        Returns:
+            A dictionary with the HTTP clients and the retry policy.
+        """
+        return {
+            "http_client": self.http_client,
+            "http_async_client": self.http_async_client,
+            "max_retries": settings.OPENAI_MAX_RETRIES,
+        }
+
+    async def aclose(self) -> None:
+        """
+        Close the connection pools.
+
+        Returns:
+            None
+        """
+        await self.http_async_client.aclose()
+        self.http_client.close()
+
+    def stats(self) -> RateLimiterStats:
+        """
+        Get the queue and wait counters of the rate limiter.
+
+        Returns:
+            A RateLimiterStats instance.
+        """
+        return self.rate_limiter.stats()
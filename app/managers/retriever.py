@@ -1,19 +1,56 @@
-from typing import List
+import asyncio
+from collections import defaultdict
+from typing import List, Optional
 
+import numpy as np
 from langchain_core.documents import Document as LangchainDocument
 from langchain_core.retrievers import BaseRetriever
-from langchain_core.vectorstores import VectorStore
 from pydantic import Field
 
+from app.core.enums import ChunkAggregation, DistanceSpace
+from app.core.metrics import stage
+from app.core.scoring import (
+    cosine_similarities,
+    distances_to_relevance,
+    maximal_marginal_relevance,
+)
+from app.managers.embedding_cache import CachedEmbeddings
+from app.managers.lexical_index import LexicalIndexManager
+from app.managers.metadata_index import MetadataIndexManager
+from app.managers.vector_backend import VectorBackend, Where
+from app.schemas.documents import DocumentFilters
 from app.schemas.research import ResearchResponseDocument
 
 
 class VectorDBRetriever(BaseRetriever):
-    vector_store: VectorStore = Field(description="Vector store instance")
+    vector_store: VectorBackend = Field(description="Vector store instance")
     k: int = Field(default=5, description="Number of documents to retrieve")
+    distance_space: DistanceSpace = Field(default=DistanceSpace.L2, description="Distance space of the collection")
+    chunk_store: Optional[VectorBackend] = Field(default=None, description="Vector store instance of the chunks")
+    chunk_distance_space: Optional[DistanceSpace] = Field(
+        default=None, description="Distance space of the chunk collection"
+    )
+    node_k: int = Field(default=20, description="Number of chunks retrieved for k documents")
+    aggregation: ChunkAggregation = Field(default=ChunkAggregation.Max, description="Chunk score aggregation")
+    top_m: int = Field(default=2, description="Number of best chunks summed per document")
+    lexical_index: Optional[LexicalIndexManager] = Field(
+        default=None, description="BM25 index fused with the vector ranking, hybrid retrieval is disabled without it"
+    )
+    hybrid_candidates: int = Field(default=20, description="Number of documents taken from each ranking")
+    rrf_k: int = Field(default=60, description="Rank offset of the reciprocal rank fusion")
+    mmr_enabled: bool = Field(
+        default=False, description="Whether to diversify the documents by maximal marginal relevance"
+    )
+    mmr_lambda: float = Field(default=0.7, description="Relevance weight of the maximal marginal relevance")
+    mmr_fetch_factor: int = Field(default=4, description="Candidates retrieved per document before diversification")
+    metadata_index: Optional[MetadataIndexManager] = Field(
+        default=None, description="Inverted index of the authors and tags, required to retrieve with filters"
+    )
 
-    def __init__(self, vector_store: VectorStore, k: int = 5, **kwargs) -> None:
-        super().__init__(vector_store=vector_store, k=k, **kwargs)
+    def __init__(
+        self, vector_store: VectorBackend, k: int = 5, distance_space: DistanceSpace = DistanceSpace.L2, **kwargs
+    ) -> None:
+        super().__init__(vector_store=vector_store, k=k, distance_space=distance_space, **kwargs)
 
     def _get_relevant_documents(self, query: str) -> List[LangchainDocument]:
         """
@@ -22,33 +59,343 @@ class VectorDBRetriever(BaseRetriever):
         Returns:
             A list of LangchainDocument instances matching the query.
         """
-        return self.vector_store.similarity_search(query, k=self.k)
+        embedding = self.vector_store.embeddings.embed_query(query)
+        return [doc for doc, _ in self.vector_store.search([embedding], self.k)[0]]
+
+    async def _aget_relevant_documents(self, query: str) -> List[LangchainDocument]:
+        """
+        Retrieve relevant documents from the vector store without blocking the event loop.
+
+        Returns:
+            A list of LangchainDocument instances matching the query.
+        """
+        embedding = await self.embed_query(query)
+        return [doc for doc, _ in (await self.vector_store.asearch([embedding], self.k))[0]]
 
     def _get_relevant_documents_with_score(self, query: str) -> List[tuple[LangchainDocument, float]]:
         """
-        Retrieve relevant documents with similarity scores from the vector store.
+        Retrieve relevant documents with distances from the vector store.
+
+        Returns:
+            A list of tuples containing LangchainDocument instances and their distances.
+        """
+        embedding = self.vector_store.embeddings.embed_query(query)
+        return self.vector_store.search([embedding], self.k)[0]
+
+    async def _aget_relevant_documents_with_score(
+        self, embedding: List[float]
+    ) -> List[tuple[LangchainDocument, float]]:
+        """
+        Retrieve relevant documents with distances for a query embedding without blocking the event loop.
+
+        The search is synchronous, so it runs in a worker thread.
+
+        Returns:
+            A list of tuples containing LangchainDocument instances and their distances.
+        """
+        return (await self.vector_store.asearch([embedding], self.k))[0]
+
+    async def embed_query(self, query: str) -> List[float]:
+        """
+        Embed a query with the embedding model of the vector store.
+
+        Returns:
+            The query embedding.
+        """
+        async with stage("embedding"):
+            return await self.vector_store.embeddings.aembed_query(query)
+
+    async def embed_queries(self, queries: List[str]) -> List[List[float]]:
+        """
+        Embed many queries with as few embedding requests as possible.
 
         Returns:
-            A list of tuples containing LangchainDocument instances and their similarity scores.
+            The query embeddings, in the same order as the queries.
         """
-        return self.vector_store.similarity_search_with_score(query, k=self.k)
+        embeddings = self.vector_store.embeddings
+        async with stage("embedding"):
+            if isinstance(embeddings, CachedEmbeddings):
+                return await embeddings.aembed_queries(queries)
+            return await embeddings.aembed_documents(queries)
 
-    def retrieve_nodes(self, query: str) -> List[ResearchResponseDocument]:
+    async def retrieve_nodes(
+        self, query: str, embedding: Optional[List[float]] = None, filters: Optional[DocumentFilters] = None
+    ) -> List[ResearchResponseDocument]:
         """
         Retrieve relevant documents and convert them to ResearchResponseDocument format.
 
+        The query is embedded unless its embedding is given, so callers that already embedded it do not pay twice.
+
+        Returns:
+            A list of ResearchResponseDocument instances with their cosine similarity to the query.
+        """
+        if embedding is None:
+            embedding = await self.embed_query(query)
+
+        return (await self.retrieve_nodes_batch([embedding], [query], filters))[0]
+
+    async def retrieve_nodes_batch(
+        self,
+        embeddings: List[List[float]],
+        queries: Optional[List[str]] = None,
+        filters: Optional[DocumentFilters] = None,
+    ) -> List[List[ResearchResponseDocument]]:
+        """
+        Retrieve the relevant documents of many query embeddings with a single search of the collection.
+
+        With filters, only the matching documents are searched: the language and date filters are pushed down to the
+        collection, and the author and tag filters restrict the search to the documents the metadata index lists.
+        With hybrid retrieval and the text of the queries, the vector ranking is fused with the BM25 ranking. With
+        maximal marginal relevance, mmr_fetch_factor candidates per document are retrieved and diversified.
+
+        Returns:
+            A list with the ResearchResponseDocument instances of every query, in the same order as the embeddings.
+        """
+        if not embeddings:
+            return []
+        depth = self.k * self.mmr_fetch_factor if self.mmr_enabled else self.k
+        async with stage("vector_search"):
+            where, ids = (None, None)
+            if filters is not None:
+                where, ids = await asyncio.to_thread(self.metadata_index.resolve, filters)
+                if ids is not None and not ids:
+                    return [[] for _ in embeddings]
+
+            if self.lexical_index is None or queries is None:
+                nodes = await self._dense_nodes(embeddings, depth, where, ids)
+            else:
+                nodes = await self._dense_nodes(embeddings, max(depth, self.hybrid_candidates), where, ids)
+        if self.lexical_index is not None and queries is not None:
+            nodes = await self._fuse(embeddings, queries, nodes, depth, where, ids)
+
+        if self.mmr_enabled:
+            async with stage("diversification"):
+                nodes = await self._diversify(nodes)
+        return nodes
+
+    async def _dense_nodes(
+        self, embeddings: List[List[float]], k: int, where: Optional[Where] = None, ids: Optional[List[str]] = None
+    ) -> List[List[ResearchResponseDocument]]:
+        """
+        Retrieve the k nearest documents of every query embedding among the documents matching the where clause and
+        ids if any, through the chunked index if it is enabled.
+
+        The chunks only carry the uuid of their document, so with the chunked index the restrictions are first
+        resolved to the uuids of the matching documents. The chunk search depth grows with k from node_k chunks for
+        the retriever k, and the search of the queries whose chunks still cover fewer than k documents is widened
+        until they do or the chunks run out.
+
         Returns:
-            A list of ResearchResponseDocument instances with similarity scores.
+            A list with the ResearchResponseDocument instances of every query, nearest first.
         """
-        # Get documents with scores
-        docs_with_scores = self._get_relevant_documents_with_score(query)
+        if self.chunk_store is None:
+            return [
+                self._nodes_from_scores(docs_with_scores)
+                for docs_with_scores in await self.vector_store.asearch(embeddings, k, ids=ids, where=where)
+            ]
+
+        chunk_where = None
+        if where is not None or ids is not None:
+            if where is not None:
+                ids = (await asyncio.to_thread(self.vector_store.get, ids=ids, where=where, include=[]))["ids"]
+            if not ids:
+                return [[] for _ in embeddings]
+            chunk_where = {"document_uuid": {"$in": ids}}
+        depth = max(self.node_k, -(-k * self.node_k // self.k))
+        chunk_batches = await self.chunk_store.asearch(embeddings, depth, where=chunk_where)
+        while True:
+            short = [
+                position
+                for position, chunks in enumerate(chunk_batches)
+                if len(chunks) == depth and len({chunk.metadata["document_uuid"] for chunk, _ in chunks}) < k
+            ]
+            if not short:
+                break
+            depth *= 2
+            widened = await self.chunk_store.asearch(
+                [embeddings[position] for position in short], depth, where=chunk_where
+            )
+            for position, chunks in zip(short, widened):
+                chunk_batches[position] = chunks
+        return await self._nodes_from_chunks(chunk_batches, k)
+
+    async def _fuse(
+        self,
+        embeddings: List[List[float]],
+        queries: List[str],
+        dense_nodes: List[List[ResearchResponseDocument]],
+        k: int,
+        where: Optional[Where] = None,
+        ids: Optional[List[str]] = None,
+    ) -> List[List[ResearchResponseDocument]]:
+        """
+        Fuse the vector ranking of every query with its BM25 ranking by reciprocal rank fusion.
+
+        A document scores the sum of 1 / (rrf_k + rank) over the rankings it appears in, so documents found by both
+        rank first, and the keyword matches the embeddings miss (identifiers, rare names, acronyms) get in. The
+        documents found only by BM25 are scored against the embedding of their query from their stored embeddings,
+        so that every document keeps the cosine similarity the correlation filter thresholds expect. They are read
+        with the filters applied, so that the BM25 matches outside them are left out.
+
+        Returns:
+            A list with the top k fused ResearchResponseDocument instances of every query.
+        """
+        # 1. Rank the documents of every query by BM25
+        async with stage("lexical_search"):
+            lexical_batches = await asyncio.to_thread(self.lexical_index.search_batch, queries, self.hybrid_candidates)
+
+        # 2. Score the documents found only by BM25 against their own query, reading their embeddings once
+        missing_batches = []
+        for nodes, lexical_hits in zip(dense_nodes, lexical_batches):
+            found = {node.uuid for node in nodes}
+            missing_batches.append([uuid for uuid, _ in lexical_hits if uuid not in found])
+        missing = list(dict.fromkeys(uuid for uuids in missing_batches for uuid in uuids))
+        if ids is not None:
+            allowed = set(ids)
+            missing = [uuid for uuid in missing if uuid in allowed]
+        lexical_nodes = [{} for _ in embeddings]
+        if missing:
+            async with stage("vector_search"):
+                stored = await asyncio.to_thread(
+                    self.vector_store.get, ids=missing, where=where, include=["metadatas", "embeddings"]
+                )
+            positions = {uuid: position for position, uuid in enumerate(stored["ids"])}
+            vectors = np.asarray(stored["embeddings"], dtype=np.float32)
+            for position, (embedding, uuids) in enumerate(zip(embeddings, missing_batches)):
+                rows = [positions[uuid] for uuid in uuids if uuid in positions]
+                if not rows:
+                    continue
+                similarities = cosine_similarities(np.asarray(embedding), vectors[rows])
+                lexical_nodes[position] = {
+                    stored["ids"][row]: ResearchResponseDocument(
+                        **stored["metadatas"][row], similarity=float(similarity)
+                    )
+                    for row, similarity in zip(rows, similarities.tolist())
+                }
+
+        # 3. Fuse the rankings, skipping the indexed documents missing from the collection or filtered out
+        fused = []
+        for nodes, lexical_hits, extra_nodes in zip(dense_nodes, lexical_batches, lexical_nodes):
+            candidates = {**extra_nodes, **{node.uuid: node for node in nodes}}
+            scores: dict[str, float] = defaultdict(float)
+            for rank, node in enumerate(nodes):
+                scores[node.uuid] += 1 / (self.rrf_k + rank + 1)
+            for rank, (uuid, _) in enumerate(lexical_hits):
+                if uuid in candidates:
+                    scores[uuid] += 1 / (self.rrf_k + rank + 1)
+            fused.append([candidates[uuid] for uuid in sorted(scores, key=scores.get, reverse=True)[:k]])
+
+        return fused
+
+    async def _diversify(
+        self, candidate_batches: List[List[ResearchResponseDocument]]
+    ) -> List[List[ResearchResponseDocument]]:
+        """
+        Select the k documents of every query among its candidates by maximal marginal relevance.
+
+        The stored embeddings of the candidates of all the queries are fetched at once, and the relevance of a
+        candidate is its cosine similarity to the query.
+
+        Returns:
+            A list with the diversified ResearchResponseDocument instances of every query, in the order picked.
+        """
+        uuids = list(dict.fromkeys(node.uuid for nodes in candidate_batches if len(nodes) > self.k for node in nodes))
+        vectors = await self.vector_store.aget_embeddings(uuids)
+
+        diversified = []
+        for nodes in candidate_batches:
+            if len(nodes) <= self.k:
+                diversified.append(nodes)
+                continue
+            # Skip the candidates deleted since the search
+            nodes = [node for node in nodes if node.uuid in vectors]
+            selected = maximal_marginal_relevance(
+                [node.similarity for node in nodes],
+                np.stack([vectors[node.uuid] for node in nodes]) if nodes else np.empty((0, 0)),
+                self.k,
+                self.mmr_lambda,
+            )
+            diversified.append([nodes[position] for position in selected])
+
+        return diversified
+
+    def _nodes_from_scores(
+        self, docs_with_scores: List[tuple[LangchainDocument, float]]
+    ) -> List[ResearchResponseDocument]:
+        """
+        Convert the documents found by a search to ResearchResponseDocument format.
+
+        Returns:
+            A list of ResearchResponseDocument instances with their cosine similarity to the query.
+        """
+        if not docs_with_scores:
+            return []
+
+        # Convert the whole batch of distances to relevance scores at once
+        similarities = distances_to_relevance([score for _, score in docs_with_scores], self.distance_space)
+
+        return [
+            ResearchResponseDocument(**doc.metadata, similarity=float(similarity))
+            for (doc, _), similarity in zip(docs_with_scores, similarities)
+        ]
+
+    def _aggregate(self, similarities: List[float]) -> float:
+        """
+        Aggregate the similarities of the chunks of a document into a ranking score.
+
+        Returns:
+            The ranking score of the document.
+        """
+        if self.aggregation is ChunkAggregation.SumTopM:
+            return sum(sorted(similarities, reverse=True)[: self.top_m])
+        return max(similarities)
+
+    async def _nodes_from_chunks(
+        self, chunk_batches: List[List[tuple[LangchainDocument, float]]], k: int
+    ) -> List[List[ResearchResponseDocument]]:
+        """
+        Aggregate the chunks found for every query per document and return the top k documents of each query.
+
+        The documents are ranked by the aggregated score, but their similarity is the one of their best chunk so
+        that it stays comparable with the correlation filter thresholds. The documents of all the queries are
+        fetched at once.
+
+        Returns:
+            A list with the ResearchResponseDocument instances of every query, with their matching chunks.
+        """
+        # 1. Group the chunks of every query by document and rank the documents
+        rankings = []
+        for chunks_with_scores in chunk_batches:
+            hits: dict[str, list[tuple[float, LangchainDocument]]] = defaultdict(list)
+            if chunks_with_scores:
+                similarities = distances_to_relevance(
+                    [score for _, score in chunks_with_scores], self.chunk_distance_space
+                )
+                for (chunk, _), similarity in zip(chunks_with_scores, similarities):
+                    hits[chunk.metadata["document_uuid"]].append((float(similarity), chunk))
+            scores = {
+                uuid: self._aggregate([similarity for similarity, _ in doc_hits]) for uuid, doc_hits in hits.items()
+            }
+            rankings.append((sorted(scores, key=scores.get, reverse=True)[:k], hits))
+
+        # 2. Fetch the documents, skipping chunks whose document is gone
+        uuids = list(dict.fromkeys(uuid for ranked_uuids, _ in rankings for uuid in ranked_uuids))
+        documents = {doc.id: doc for doc in await self.vector_store.aget_by_ids(uuids)} if uuids else {}
 
-        # Convert to NodeWithScore format for compatibility
-        nodes_with_scores = []
-        for doc, score in docs_with_scores:
-            # Convert similarity score to distance score (lower is better)
-            # LangChain returns similarity scores, we need to convert to distance
-            distance_score = 1.0 - score if score <= 1.0 else 1.0 / (1.0 + score)
-            nodes_with_scores.append(ResearchResponseDocument(**doc.metadata, similarity=distance_score))
+        nodes = []
+        for ranked_uuids, hits in rankings:
+            nodes_with_scores = []
+            for uuid in ranked_uuids:
+                if uuid not in documents:
+                    continue
+                doc_hits = sorted(hits[uuid], key=lambda hit: hit[1].metadata["chunk_index"])
+                nodes_with_scores.append(
+                    ResearchResponseDocument(
+                        **documents[uuid].metadata,
+                        similarity=max(similarity for similarity, _ in doc_hits),
+                        matched_chunks=[chunk.page_content for _, chunk in doc_hits],
+                    )
+                )
+            nodes.append(nodes_with_scores)
 
-        return nodes_with_scores
+        return nodes
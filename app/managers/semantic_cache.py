@@ -0,0 +1,141 @@
+import time
+from collections import OrderedDict
+from typing import Callable, Optional
+
+import numpy as np
+
+from app.core.config import settings
+from app.schemas.research import ResearchResponse
+from app.schemas.stats import SemanticCacheStats
+
+
+class SemanticCacheManager:
+
+    """
+    An in-process cache of research responses, looked up by the cosine similarity of the query embeddings.
+
+    The embeddings of the cached queries are kept in a preallocated matrix, so a lookup is a single matrix-vector
+    product. Responses are only shared between queries of the same scope (the query language, the pipeline mode and
+    the metadata filters), expire after a TTL, are evicted in LRU order, and are all dropped when the collection
+    version changes. The retrieval settings, such as the number of documents and their diversification, are the same
+    for every query of the process, so they are not part of the scope.
+    """
+
+    def __init__(self, version_getter: Callable[[], str]):
+        self.version_getter = version_getter
+        self.threshold = settings.SEMANTIC_CACHE_THRESHOLD
+        self.ttl = settings.SEMANTIC_CACHE_TTL
+        self.maxsize = settings.SEMANTIC_CACHE_SIZE
+
+        # The matrix is allocated on the first insertion, once the embedding dimension is known
+        self.embeddings: Optional[np.ndarray] = None
+        self.valid = np.zeros(self.maxsize, dtype=bool)
+        self.scopes: list[Optional[str]] = [None] * self.maxsize
+        self.entries: list[Optional[tuple[ResearchResponse, float, float]]] = [None] * self.maxsize
+        self.lru: OrderedDict[int, None] = OrderedDict()
+        self.version = version_getter()
+
+        self.hits = 0
+        self.misses = 0
+        self.saved_seconds = 0.0
+
+    def _check_version(self) -> None:
+        """
+        Drop every entry if the collection changed since they were cached.
+
+        Returns:
+            None
+        """
+        version = self.version_getter()
+        if version != self.version:
+            self.clear()
+            self.version = version
+
+    def clear(self) -> None:
+        """
+        Drop every entry.
+
+        Returns:
+            None
+        """
+        self.valid[:] = False
+        self.entries = [None] * self.maxsize
+        self.lru.clear()
+
+    def _evict(self, slot: int) -> None:
+        self.valid[slot] = False
+        self.entries[slot] = None
+        self.lru.pop(slot, None)
+
+    @staticmethod
+    def _normalize(embedding: list[float]) -> np.ndarray:
+        vector = np.asarray(embedding, dtype=np.float32)
+        return vector / max(float(np.linalg.norm(vector)), np.finfo(np.float32).tiny)
+
+    def get(self, embedding: list[float], scope: str) -> Optional[ResearchResponse]:
+        """
+        Get the cached response of the most similar previous query of the same scope.
+
+        Returns:
+            The cached ResearchResponse instance, or None if no previous query is similar enough.
+        """
+        self._check_version()
+        if self.embeddings is None or not self.valid.any():
+            self.misses += 1
+            return None
+
+        similarities = self.embeddings @ self._normalize(embedding)
+        candidates = self.valid & (similarities >= self.threshold)
+        for slot in np.flatnonzero(candidates)[np.argsort(-similarities[candidates])]:
+            if self.scopes[slot] != scope:
+                continue
+            response, created_at, latency = self.entries[slot]
+            if time.monotonic() - created_at > self.ttl:
+                self._evict(slot)
+                continue
+
+            self.lru.move_to_end(slot)
+            self.hits += 1
+            self.saved_seconds += latency
+            return response
+
+        self.misses += 1
+        return None
+
+    def set(self, embedding: list[float], scope: str, response: ResearchResponse, latency: float) -> None:
+        """
+        Cache the response of a query, along with the time it took to compute it.
+
+        Returns:
+            None
+        """
+        self._check_version()
+        vector = self._normalize(embedding)
+        if self.embeddings is None:
+            self.embeddings = np.zeros((self.maxsize, vector.shape[0]), dtype=np.float32)
+
+        if len(self.lru) >= self.maxsize:
+            self._evict(next(iter(self.lru)))
+        slot = int(np.flatnonzero(~self.valid)[0])
+
+        self.embeddings[slot] = vector
+        self.scopes[slot] = scope
+        self.entries[slot] = (response, time.monotonic(), latency)
+        self.valid[slot] = True
+        self.lru[slot] = None
+
+    def stats(self) -> SemanticCacheStats:
+        """
+        Get the hit and miss counters of this worker.
+
+        Returns:
+            A SemanticCacheStats instance.
+        """
+        lookups = self.hits + self.misses
+        return SemanticCacheStats(
+            hits=self.hits,
+            misses=self.misses,
+            hit_rate=self.hits / lookups if lookups else 0.0,
+            size=len(self.lru),
+            saved_seconds=self.saved_seconds,
+        )
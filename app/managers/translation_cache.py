@@ -0,0 +1,131 @@
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+
+from app.core.config import settings
+from app.schemas.stats import TieredCacheStats
+from app.schemas.translation import Translation
+
+TranslationKey = tuple[str, str, str]
+
+
+class TranslationCacheManager:
+
+    """
+    A two-tier cache of document translations keyed by (document uuid, content hash, target language).
+
+    The first tier is an in-process LRU. The second tier is a SQLite database on disk, shared by all the
+    workers. Since the content hash is part of the key, an entry can never be served for a document whose
+    title or abstract changed, even from the LRU of a worker that missed the invalidation.
+    """
+
+    def __init__(self):
+        self.maxsize = settings.TRANSLATION_CACHE_SIZE
+        self.memory: OrderedDict[TranslationKey, Translation] = OrderedDict()
+        self.lock = threading.Lock()
+
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+        settings.TRANSLATION_CACHE_PATH.parent.mkdir(parents=True, exist_ok=True)
+        self.connection = sqlite3.connect(settings.TRANSLATION_CACHE_PATH, timeout=30, check_same_thread=False)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS translations ("
+            "uuid TEXT NOT NULL, content_hash TEXT NOT NULL, language TEXT NOT NULL, "
+            "translated_title TEXT NOT NULL, translated_abstract TEXT NOT NULL, created_at REAL NOT NULL, "
+            "PRIMARY KEY (uuid, content_hash, language))"
+        )
+        self.connection.commit()
+
+    def _remember(self, key: TranslationKey, translation: Translation) -> None:
+        """
+        Store a translation in the in-process LRU, evicting the least recently used entry if needed.
+
+        Returns:
+            None
+        """
+        self.memory[key] = translation
+        self.memory.move_to_end(key)
+        while len(self.memory) > self.maxsize:
+            self.memory.popitem(last=False)
+
+    def get(self, uuid: str, content_hash: str, language: str) -> Optional[Translation]:
+        """
+        Get a cached translation.
+
+        Returns:
+            The cached Translation instance, or None on a miss.
+        """
+        key = (uuid, content_hash, language)
+        with self.lock:
+            translation = self.memory.get(key)
+            if translation is not None:
+                self.memory.move_to_end(key)
+                self.memory_hits += 1
+                return translation
+
+            row = self.connection.execute(
+                "SELECT translated_title, translated_abstract FROM translations "
+                "WHERE uuid = ? AND content_hash = ? AND language = ?",
+                key,
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+
+            translation = Translation(translated_title=row[0], translated_abstract=row[1])
+            self._remember(key, translation)
+            self.disk_hits += 1
+            return translation
+
+    def set(self, uuid: str, content_hash: str, language: str, translation: Translation) -> None:
+        """
+        Store a translation in both tiers.
+
+        Returns:
+            None
+        """
+        key = (uuid, content_hash, language)
+        with self.lock:
+            self._remember(key, translation)
+            self.connection.execute(
+                "INSERT OR REPLACE INTO translations VALUES (?, ?, ?, ?, ?, ?)",
+                (*key, translation.translated_title, translation.translated_abstract, time.time()),
+            )
+            self.connection.commit()
+
+    def invalidate(self, uuids: list[str]) -> None:
+        """
+        Drop every cached translation of the given documents.
+
+        Returns:
+            None
+        """
+        uuid_set = set(uuids)
+        with self.lock:
+            for key in [key for key in self.memory if key[0] in uuid_set]:
+                del self.memory[key]
+            self.connection.executemany("DELETE FROM translations WHERE uuid = ?", [(uuid,) for uuid in uuid_set])
+            self.connection.commit()
+
+    def stats(self) -> TieredCacheStats:
+        """
+        Get the hit and miss counters of this worker.
+
+        Returns:
+            A TieredCacheStats instance.
+        """
+        hits = self.memory_hits + self.disk_hits
+        lookups = hits + self.misses
+        return TieredCacheStats(
+            hits=hits,
+            misses=self.misses,
+            hit_rate=hits / lookups if lookups else 0.0,
+            size=len(self.memory),
+            memory_hits=self.memory_hits,
+            disk_hits=self.disk_hits,
+        )
@@ -1,16 +1,28 @@
+import asyncio
+from typing import Optional
+
 from langchain_core.prompts import ChatPromptTemplate
-from langchain_openai import ChatOpenAI
 
 from app.core.config import settings
+from app.core.hashing import document_content_hash
+from app.core.metrics import stage
+from app.core.single_flight import SingleFlight
+from app.managers.chat_model import create_chat_model
+from app.managers.openai_client import OpenAIClientManager
+from app.managers.translation_cache import TranslationCacheManager
 from app.schemas.research import ResearchResponseDocument
 from app.schemas.translation import Translation
 
 
 class TranslatorManager:
-    def __init__(self):
-        self.llm = ChatOpenAI(
-            model=settings.OPENAI_CORRELATION_MODEL, api_key=settings.OPENAI_API_KEY, temperature=0
+    def __init__(
+        self, cache: Optional[TranslationCacheManager] = None, openai_client: Optional[OpenAIClientManager] = None
+    ):
+        self.llm = create_chat_model(
+            settings.OPENAI_CORRELATION_MODEL, "translation", openai_client
         ).with_structured_output(Translation)
+        self.cache = cache
+        self.single_flight = SingleFlight("translation")
 
     @staticmethod
     def _build_translation_prompt(doc: ResearchResponseDocument) -> str:
@@ -23,13 +35,55 @@ class TranslatorManager:
         prompt = f"Title: '{doc.title}'\nAbstract: {doc.abstract}\n\n"
         return prompt
 
-    def translate_document(self, doc: ResearchResponseDocument, target_language: str) -> ResearchResponseDocument:
+    async def translate_document(self, doc: ResearchResponseDocument, target_language: str) -> ResearchResponseDocument:
         """
-        Translate a document to the specified target language.
+        Translate a document to the specified target language, going through the translation cache if enabled.
+
+        Concurrent translations of the same content to the same language share a single LLM call. When the
+        cache is enabled, they are also coalesced across the workers, which find each other's translation in it.
 
         Returns:
             A ResearchResponseDocument instance with translated title and abstract.
         """
+        content_hash = document_content_hash(doc.title, doc.abstract)
+        response = await self.single_flight.do(
+            f"{doc.uuid}\n{content_hash}\n{target_language}",
+            lambda: self._translate_cached(doc, content_hash, target_language),
+            shared=self.cache is not None,
+        )
+
+        # Create a new document with the translations, keeping every other field
+        translated_doc = doc.model_copy(
+            update={"title": response.translated_title, "abstract": response.translated_abstract}
+        )
+
+        return translated_doc
+
+    async def _translate_cached(
+        self, doc: ResearchResponseDocument, content_hash: str, target_language: str
+    ) -> Translation:
+        """
+        Translate a document with the LLM, going through the translation cache if enabled.
+
+        Returns:
+            A Translation instance with the translated title and abstract.
+        """
+        if self.cache is None:
+            return await self._translate(doc, target_language)
+
+        response = await asyncio.to_thread(self.cache.get, doc.uuid, content_hash, target_language)
+        if response is None:
+            response = await self._translate(doc, target_language)
+            await asyncio.to_thread(self.cache.set, doc.uuid, content_hash, target_language, response)
+        return response
+
+    async def _translate(self, doc: ResearchResponseDocument, target_language: str) -> Translation:
+        """
+        Translate a document with the LLM.
+
+        Returns:
+            A Translation instance with the translated title and abstract.
+        """
         # 1. Build the prompt
         prompt_text = self._build_translation_prompt(doc)
 
@@ -56,16 +110,5 @@ class TranslatorManager:
 
         # 4. Execute the chain with structured output
         chain = prompt_template | self.llm
-        response = chain.invoke({"prompt_text": prompt_text})
-
-        # 5. Create a new document with the translations
-        translated_doc = ResearchResponseDocument(
-            uuid=doc.uuid,
-            title=response.translated_title,
-            abstract=response.translated_abstract,
-            authors=doc.authors,
-            similarity=doc.similarity,
-            language=doc.language,
-        )
-
-        return translated_doc
+        async with stage("translation"):
+            return await chain.ainvoke({"prompt_text": prompt_text})
@@ -0,0 +1,155 @@
+import asyncio
+from abc import ABC, abstractmethod
+from typing import Optional, Sequence
+
+import numpy as np
+from langchain_core.documents import Document as LangchainDocument
+from langchain_core.embeddings import Embeddings
+
+from app.core.enums import DistanceSpace
+
+# Chroma-style metadata filter, e.g. {"content_hash": {"$in": [...]}} or {"$and": [...]}
+Where = dict
+
+
+class VectorBackend(ABC):
+
+    """
+    A collection of embedded documents, as used by the VectorStoreManager and the retriever.
+
+    The interface follows the Chroma collection API the service was written against: get returns a dictionary with
+    the "ids" and, when included, the "metadatas", "documents" and "embeddings" lists, and metadata filters use the
+    Chroma where syntax. Searches return distances in the distance space of the collection, which
+    distances_to_relevance converts to cosine similarities.
+    """
+
+    embeddings: Embeddings
+
+    @abstractmethod
+    def get_distance_space(self) -> DistanceSpace:
+        """
+        Get the distance space the collection is indexed with.
+
+        Returns:
+            The DistanceSpace of the collection.
+        """
+
+    @abstractmethod
+    def get_max_batch_size(self) -> int:
+        """
+        Get the largest number of documents accepted by a single write.
+
+        Returns:
+            The maximum batch size.
+        """
+
+    @abstractmethod
+    def get(
+        self,
+        ids: Optional[list[str]] = None,
+        where: Optional[Where] = None,
+        limit: Optional[int] = None,
+        offset: Optional[int] = None,
+        include: Sequence[str] = ("metadatas",),
+    ) -> dict:
+        """
+        Get documents by id, by metadata filter, or a page of the whole collection. Unknown ids are skipped.
+
+        Returns:
+            A dictionary with the "ids", and the "metadatas", "documents" and "embeddings" lists when included.
+        """
+
+    @abstractmethod
+    def add(self, documents: list[LangchainDocument], ids: list[str]) -> None:
+        """
+        Embed documents and write them, replacing the documents with the same ids.
+
+        Returns:
+            None
+        """
+
+    @abstractmethod
+    def update_metadatas(self, ids: list[str], metadatas: list[dict]) -> None:
+        """
+        Replace the metadata of documents without embedding them again.
+
+        Returns:
+            None
+        """
+
+    @abstractmethod
+    def delete(self, ids: Optional[list[str]] = None, where: Optional[Where] = None) -> None:
+        """
+        Delete documents by id or by metadata filter.
+
+        Returns:
+            None
+        """
+
+    @abstractmethod
+    def search(
+        self, embeddings: list[list[float]], k: int, ids: Optional[list[str]] = None, where: Optional[Where] = None
+    ) -> list[list[tuple[LangchainDocument, float]]]:
+        """
+        Find the nearest documents of many query embeddings at once, among the given ids and the documents matching
+        the metadata filter if any. The restrictions are applied within the search, so up to k documents satisfying
+        them are found.
+
+        Returns:
+            A list with the documents and distances of every query, nearest first.
+        """
+
+    def get_by_ids(self, ids: list[str]) -> list[LangchainDocument]:
+        """
+        Get documents with their content by id. Unknown ids are skipped.
+
+        Returns:
+            A list of LangchainDocument instances.
+        """
+        result = self.get(ids=ids, include=["metadatas", "documents"])
+        return [
+            LangchainDocument(id=id_, page_content=content or "", metadata=metadata or {})
+            for id_, content, metadata in zip(result["ids"], result["documents"], result["metadatas"])
+        ]
+
+    async def aget_by_ids(self, ids: list[str]) -> list[LangchainDocument]:
+        """
+        Get documents with their content by id without blocking the event loop.
+
+        Returns:
+            A list of LangchainDocument instances.
+        """
+        return await asyncio.to_thread(self.get_by_ids, ids)
+
+    def get_embeddings(self, ids: list[str]) -> dict[str, np.ndarray]:
+        """
+        Get the stored embeddings of documents by id. Unknown ids are skipped.
+
+        Returns:
+            A dictionary with the float32 embedding of every document found.
+        """
+        if not ids:
+            return {}
+        result = self.get(ids=ids, include=["embeddings"])
+        return dict(zip(result["ids"], np.asarray(result["embeddings"], dtype=np.float32)))
+
+    async def aget_embeddings(self, ids: list[str]) -> dict[str, np.ndarray]:
+        """
+        Get the stored embeddings of documents by id without blocking the event loop.
+
+        Returns:
+            A dictionary with the float32 embedding of every document found.
+        """
+        return await asyncio.to_thread(self.get_embeddings, ids)
+
+    async def asearch(
+        self, embeddings: list[list[float]], k: int, ids: Optional[list[str]] = None, where: Optional[Where] = None
+    ) -> list[list[tuple[LangchainDocument, float]]]:
+        """
+        Find the nearest documents of many query embeddings at once, among the given ids and the documents matching
+        the metadata filter if any, in a worker thread.
+
+        Returns:
+            A list with the documents and distances of every query, nearest first.
+        """
+        return await asyncio.to_thread(self.search, embeddings, k, ids, where)
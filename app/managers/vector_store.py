@@ -1,80 +1,655 @@
-from langchain_chroma import Chroma
+import secrets
+from datetime import datetime, timezone
+from typing import Callable, Iterable, Iterator, Optional
+
 from langchain_core.documents import Document as LangchainDocument
-from langchain_openai import OpenAIEmbeddings
+from langchain_core.embeddings import Embeddings
+from langchain_text_splitters import RecursiveCharacterTextSplitter
 
 from app.core.config import settings
-from app.schemas.documents import Document
+from app.core.enums import DistanceSpace, DocumentField, VectorStoreBackend
+from app.core.hashing import document_content_hash
+from app.managers.chroma_backend import ChromaBackend
+from app.managers.language import LanguageManager
+from app.managers.lexical_index import LexicalIndexManager
+from app.managers.metadata_index import MetadataIndexManager
+from app.managers.numpy_backend import NumpyBackend
+from app.managers.retriever import VectorDBRetriever
+from app.managers.vector_backend import VectorBackend
+from app.schemas.documents import Document, DocumentFilters, DocumentProjection
+from app.schemas.ingest import IngestCounts
+
+
+def create_vector_backend(
+    collection_name: str, embeddings: Embeddings, indexed_fields: tuple[str, ...] = ()
+) -> VectorBackend:
+    """
+    Open a collection in the configured vector store backend, creating it if needed.
+
+    The distance space only applies when the collection is created, existing collections keep theirs. The indexed
+    fields are the metadata fields the collection is filtered on, which Chroma indexes anyway.
+
+    Returns:
+        A ChromaBackend instance, or a NumpyBackend instance with the VECTOR_STORE_BACKEND setting set to numpy.
+    """
+    if settings.VECTOR_STORE_BACKEND is VectorStoreBackend.Numpy:
+        return NumpyBackend(
+            collection_name,
+            embeddings,
+            settings.DATABASE_PATH,
+            settings.VECTOR_DISTANCE_SPACE,
+            settings.NUMPY_VECTOR_PRECISION,
+            settings.NUMPY_SEARCH_BLOCK_SIZE,
+            indexed_fields,
+            settings.NUMPY_QUANTIZATION,
+            settings.NUMPY_CODE_DIMENSIONS,
+            settings.NUMPY_RERANK_CANDIDATES,
+        )
+    return ChromaBackend(collection_name, embeddings, settings.DATABASE_PATH, settings.VECTOR_DISTANCE_SPACE)
 
 
 class VectorStoreManager:
-    def __init__(self, embeddings: OpenAIEmbeddings):
-        self.vector_store = Chroma(
-            collection_name=settings.COLLECTION_NAME,
-            embedding_function=embeddings,
-            persist_directory=settings.DATABASE_PATH,
+    def __init__(self, embeddings: Embeddings, language_manager: LanguageManager):
+        self.language_manager = language_manager
+        self.vector_store = create_vector_backend(
+            settings.COLLECTION_NAME, embeddings, ("content_hash", "language", "ingested_at")
         )
+        self.metadata_index = MetadataIndexManager()
+        self.change_listeners: list[Callable[[list[str]], None]] = []
+        # Rewritten on every change so that the workers can detect changes made by other workers
+        self.version_path = settings.DATABASE_PATH.parent / f"{settings.COLLECTION_NAME}.version"
+        if not self.version_path.exists():
+            self._bump_version()
+
+        # Optional index of overlapping abstract chunks, each pointing back to its document
+        self.chunk_store: Optional[VectorBackend] = None
+        if settings.CHUNKED_INDEX:
+            self.chunk_store = create_vector_backend(
+                f"{settings.COLLECTION_NAME}-chunks", embeddings, ("document_uuid",)
+            )
+            self.text_splitter = RecursiveCharacterTextSplitter(
+                chunk_size=settings.CHUNK_SIZE, chunk_overlap=settings.CHUNK_OVERLAP
+            )
+
+        # Optional BM25 index of the titles and abstracts, for hybrid retrieval and lexical search
+        self.lexical_index: Optional[LexicalIndexManager] = (
+            LexicalIndexManager() if settings.LEXICAL_INDEX_ENABLED else None
+        )
+
+    def get_distance_space(self) -> DistanceSpace:
+        """
+        Get the distance space the collection is indexed with.
+
+        Returns:
+            The DistanceSpace of the collection.
+        """
+        return self.vector_store.get_distance_space()
+
+    def get_chunk_store(self) -> Optional[VectorBackend]:
+        """
+        Get the chunk vector store instance.
+
+        Returns:
+            The VectorBackend instance of the chunks, or None if the chunked index is disabled.
+        """
+        return self.chunk_store
+
+    def get_chunk_distance_space(self) -> Optional[DistanceSpace]:
+        """
+        Get the distance space the chunk collection is indexed with.
 
-    def get_vector_store(self) -> Chroma:
+        Returns:
+            The DistanceSpace of the chunk collection, or None if the chunked index is disabled.
+        """
+        return self.chunk_store.get_distance_space() if self.chunk_store is not None else None
+
+    def get_metadata_index(self) -> MetadataIndexManager:
+        """
+        Get the inverted index of the authors and tags.
+
+        Returns:
+            The MetadataIndexManager instance.
+        """
+        return self.metadata_index
+
+    def get_lexical_index(self) -> Optional[LexicalIndexManager]:
+        """
+        Get the lexical index of the titles and abstracts.
+
+        Returns:
+            The LexicalIndexManager instance, or None if the lexical index is disabled.
+        """
+        return self.lexical_index
+
+    def add_change_listener(self, listener: Callable[[list[str]], None]):
+        """
+        Register a callable to be notified with the uuids of documents that are added, replaced or deleted.
+
+        Returns:
+            None
+        """
+        self.change_listeners.append(listener)
+
+    def _bump_version(self):
+        """
+        Write a new version of the collection.
+
+        Returns:
+            None
+        """
+        self.version_path.write_text(secrets.token_hex(16))
+
+    def get_version(self) -> str:
+        """
+        Get the version of the collection, which changes whenever a document is added, replaced or deleted by any
+        worker.
+
+        Returns:
+            The version of the collection.
+        """
+        return self.version_path.read_text()
+
+    def _notify_change(self, uuids: list[str]):
+        """
+        Bump the collection version and notify the registered listeners that the given documents changed.
+
+        Returns:
+            None
+        """
+        self._bump_version()
+        for listener in self.change_listeners:
+            listener(uuids)
+
+    def get_vector_store(self) -> VectorBackend:
         """
         Get the vector store instance.
 
         Returns:
-            The Chroma vector store instance.
+            The VectorBackend instance of the documents.
         """
         return self.vector_store
 
-    def add_documents(self, documents: list[Document]):
+    def get_retriever(self, k: int = settings.DOCUMENT_TOP_K) -> VectorDBRetriever:
+        """
+        Build a retriever over the vector store, going through the chunked index if it is enabled, fusing its
+        results with the lexical index when hybrid retrieval is enabled, and diversifying them when maximal marginal
+        relevance is enabled.
+
+        Returns:
+            A VectorDBRetriever instance.
+        """
+        return VectorDBRetriever(
+            vector_store=self.vector_store,
+            k=k,
+            distance_space=self.get_distance_space(),
+            chunk_store=self.chunk_store,
+            chunk_distance_space=self.get_chunk_distance_space(),
+            node_k=settings.NODE_TOP_K,
+            aggregation=settings.CHUNK_AGGREGATION,
+            top_m=settings.CHUNK_AGGREGATION_TOP_M,
+            lexical_index=self.lexical_index if settings.HYBRID_RETRIEVAL else None,
+            hybrid_candidates=settings.HYBRID_CANDIDATES,
+            rrf_k=settings.RRF_K,
+            mmr_enabled=settings.MMR_ENABLED,
+            mmr_lambda=settings.MMR_LAMBDA,
+            mmr_fetch_factor=settings.MMR_FETCH_FACTOR,
+            metadata_index=self.metadata_index,
+        )
+
+    @staticmethod
+    def to_metadata(document: Document) -> dict:
+        """
+        Convert a document to vector store metadata.
+
+        Chroma only accepts scalar values, so the authors and tags are joined with the same separator the Document
+        schema splits them on, the ingestion date is stored as a Unix timestamp so that it can be compared, and unset
+        fields are dropped. The content hash backs the deduplication index.
+
+        Returns:
+            A dictionary with the document metadata.
+        """
+        metadata = document.model_dump(exclude_none=True)
+        metadata["authors"] = "; ".join(document.authors)
+        if document.tags:
+            metadata["tags"] = "; ".join(document.tags)
+        else:
+            metadata.pop("tags", None)
+        if document.ingested_at is not None:
+            metadata["ingested_at"] = int(document.ingested_at.timestamp())
+        metadata["content_hash"] = document_content_hash(document.title, document.abstract)
+        return metadata
+
+    def add_documents(self, documents: list[Document]) -> IngestCounts:
+        """
+        Add documents to the vector store, embedding only new or edited content.
+
+        Documents are matched with the stored ones by uuid when the client sets it, and through the content hash
+        index otherwise, so re-posting a document without uuid does not create a duplicate, even when concurrent calls
+        post it at the same time, in any worker: the first one claims its content hash and writes it, and the others
+        skip it. Unchanged documents are
+        skipped, documents whose content is unchanged but whose metadata changed are updated without embedding them
+        again, and the language is only detected for documents that do not have one yet. Documents keep the date
+        they were first ingested at, unless the client sets it.
+
+        Returns:
+            An IngestCounts instance with the number of inserted, updated and skipped documents.
+        """
+        counts = IngestCounts()
+        if not documents:
+            return counts
+
+        # 1. Resolve the documents without a client uuid through the content hash index, claiming the new hashes
+        content_hashes = [document_content_hash(doc.title, doc.abstract) for doc in documents]
+        unidentified = ["uuid" not in doc.model_fields_set for doc in documents]
+        claimed, in_flight = self._claim_content_hashes(documents, content_hashes, unidentified)
+        pending = [
+            (doc, content_hash)
+            for doc, content_hash, without_uuid in zip(documents, content_hashes, unidentified)
+            if not (without_uuid and content_hash in in_flight)
+        ]
+        counts.skipped += len(documents) - len(pending)
+        try:
+            self._write_documents(pending, counts)
+        finally:
+            self.metadata_index.release(claimed)
+
+        return counts
+
+    def _claim_content_hashes(
+        self, documents: list[Document], content_hashes: list[str], unidentified: list[bool]
+    ) -> tuple[dict[str, str], set[str]]:
+        """
+        Give the documents without a client uuid the uuid of the stored document with the same content, or of the
+        document with the same content a concurrent call is writing, and claim the hashes of the new ones in the
+        metadata index until they are written.
+
+        Returns:
+            A tuple with the claimed content hashes and their uuids, to release once the documents are written, and
+            the content hashes being written by concurrent calls, whose documents are to be skipped.
+        """
+        hashes = {content_hash for content_hash, without_uuid in zip(content_hashes, unidentified) if without_uuid}
+        if not hashes:
+            return {}, set()
+
+        uuids_by_hash = self._stored_uuids_by_hash(hashes)
+        new_uuids = {}
+        for doc, content_hash, without_uuid in zip(documents, content_hashes, unidentified):
+            if without_uuid and content_hash not in uuids_by_hash:
+                new_uuids.setdefault(content_hash, doc.uuid)
+        holders = self.metadata_index.claim(new_uuids)
+        claimed = {content_hash: uuid for content_hash, uuid in new_uuids.items() if holders[content_hash] == uuid}
+        in_flight = new_uuids.keys() - claimed.keys()
+
+        # A concurrent call may have written a hash and released it between the lookup and the claim
+        written = self._stored_uuids_by_hash(claimed.keys())
+        if written:
+            self.metadata_index.release({content_hash: claimed.pop(content_hash) for content_hash in written})
+            uuids_by_hash.update(written)
+
+        uuids_by_hash.update({content_hash: holders[content_hash] for content_hash in in_flight})
+        uuids_by_hash.update(claimed)
+        for doc, content_hash, without_uuid in zip(documents, content_hashes, unidentified):
+            if without_uuid:
+                # Also collapses identical documents of the same batch onto the first one
+                doc.uuid = uuids_by_hash[content_hash]
+        return claimed, in_flight
+
+    def _stored_uuids_by_hash(self, hashes: Iterable[str]) -> dict[str, str]:
         """
-        Add documents to the vector store.
+        Look up stored documents in the content hash index.
+
+        Returns:
+            A dictionary of the uuids of the stored documents by content hash.
+        """
+        hashes = list(hashes)
+        if not hashes:
+            return {}
+        stored = self.vector_store.get(where={"content_hash": {"$in": hashes}}, include=["metadatas"])
+        return {metadata["content_hash"]: uuid for uuid, metadata in zip(stored["ids"], stored["metadatas"])}
+
+    def _write_documents(self, documents: list[tuple[Document, str]], counts: IngestCounts):
+        """
+        Write documents with their content hashes, embedding only new or edited content, and count them.
 
         Returns:
             None
         """
-        langchain_documents = []
+        # 2. Deduplicate the batch by uuid, the last occurrence wins
+        batch = {doc.uuid: (doc, content_hash) for doc, content_hash in documents}
+        counts.skipped += len(documents) - len(batch)
+
+        # 3. Compare with the stored documents
+        stored = self.vector_store.get(ids=list(batch), include=["metadatas"])
+        stored_metadatas = dict(zip(stored["ids"], stored["metadatas"]))
+
+        ingested_at = datetime.now(timezone.utc).replace(microsecond=0)
+        embed_documents, update_documents, update_ids, update_metadatas = [], [], [], []
+        for uuid, (doc, content_hash) in batch.items():
+            existing = stored_metadatas.get(uuid)
+            same_content = (
+                existing is not None
+                and (existing.get("content_hash") or document_content_hash(existing["title"], existing["abstract"]))
+                == content_hash
+            )
+
+            if doc.language is None and same_content:
+                doc.language = existing.get("language")
+            if doc.language is None:
+                doc.language = self.language_manager.detect_document_language(doc.title, doc.abstract)
+            if "ingested_at" not in doc.model_fields_set:
+                if existing is None:
+                    doc.ingested_at = ingested_at
+                elif existing.get("ingested_at") is not None:
+                    doc.ingested_at = datetime.fromtimestamp(existing["ingested_at"], timezone.utc)
+            metadata = self.to_metadata(doc)
+
+            if not same_content:
+                embed_documents.append(doc)
+                counts.inserted += existing is None
+                counts.updated += existing is not None
+            elif metadata != existing:
+                update_documents.append(doc)
+                update_ids.append(uuid)
+                update_metadatas.append(metadata)
+                counts.updated += 1
+            else:
+                counts.skipped += 1
+
+        # 4. Write the changes
+        if embed_documents:
+            self._add_in_batches(
+                self.vector_store,
+                [
+                    LangchainDocument(page_content=doc.abstract, metadata=self.to_metadata(doc))
+                    for doc in embed_documents
+                ],
+                [doc.uuid for doc in embed_documents],
+            )
+            if self.chunk_store is not None:
+                self.add_chunks(embed_documents)
+            # The title and abstract are part of the content hash, so metadata updates leave the index unchanged
+            if self.lexical_index is not None:
+                self.lexical_index.add(embed_documents)
+        if embed_documents or update_documents:
+            self.metadata_index.add(embed_documents + update_documents)
+        if update_ids:
+            batch_size = self.vector_store.get_max_batch_size()
+            for start in range(0, len(update_ids), batch_size):
+                self.vector_store.update_metadatas(
+                    update_ids[start : start + batch_size], update_metadatas[start : start + batch_size]
+                )
+
+        changed_uuids = [doc.uuid for doc in embed_documents] + update_ids
+        if changed_uuids:
+            self._notify_change(changed_uuids)
+
+    def add_chunks(self, documents: list[Document]):
+        """
+        Split the abstracts of the documents into overlapping chunks and index them, replacing previous chunks.
+
+        Returns:
+            None
+        """
+        self.chunk_store.delete(where={"document_uuid": {"$in": [doc.uuid for doc in documents]}})
+
+        chunks, ids = [], []
         for doc in documents:
-            # Convert metadata to ChromaDB-compatible format
-            metadata = doc.model_dump()
-            langchain_documents.append(LangchainDocument(page_content=doc.abstract, metadata=metadata))
+            for index, text in enumerate(self.text_splitter.split_text(doc.abstract)):
+                chunks.append(
+                    LangchainDocument(page_content=text, metadata={"document_uuid": doc.uuid, "chunk_index": index})
+                )
+                ids.append(f"{doc.uuid}:{index}")
 
-        uuids = [doc.uuid for doc in documents]
-        self.vector_store.add_documents(langchain_documents, ids=uuids)
+        if chunks:
+            self._add_in_batches(self.chunk_store, chunks, ids)
 
-    def get_document_by_uuid(self, uuid: str) -> Document:
+    @staticmethod
+    def _add_in_batches(vector_store: VectorBackend, documents: list[LangchainDocument], ids: list[str]):
+        """
+        Add documents to a collection in the largest batches it accepts.
+
+        Each batch is embedded with a single embed_documents call, which the embedding model splits further at
+        the provider's maximum batch size.
+
+        Returns:
+            None
+        """
+        batch_size = vector_store.get_max_batch_size()
+        for start in range(0, len(documents), batch_size):
+            vector_store.add(documents[start : start + batch_size], ids[start : start + batch_size])
+
+    def build_chunk_index(self, batch_size: int = 500) -> int:
+        """
+        Index the chunks of every document of the collection, for collections created without the chunked index.
+
+        Returns:
+            The number of documents whose chunks were indexed.
+        """
+        indexed = 0
+        offset = 0
+        while True:
+            documents = self.get_documents(limit=batch_size, offset=offset)
+            if not documents:
+                break
+            self.add_chunks(documents)
+            indexed += len(documents)
+            offset += len(documents)
+
+        return indexed
+
+    def build_metadata_index(self, batch_size: int = 500) -> int:
+        """
+        Index the authors and tags of every document of the collection, for collections created before the
+        metadata index.
+
+        Returns:
+            The number of indexed documents.
+        """
+        indexed = 0
+        offset = 0
+        while True:
+            documents = self.get_documents(limit=batch_size, offset=offset)
+            if not documents:
+                break
+            self.metadata_index.add(documents)
+            indexed += len(documents)
+            offset += len(documents)
+
+        return indexed
+
+    def build_lexical_index(self, batch_size: int = 500) -> int:
+        """
+        Index the title and abstract of every document of the collection, for collections created without the
+        lexical index.
+
+        Returns:
+            The number of indexed documents.
+        """
+        indexed = 0
+        offset = 0
+        while True:
+            documents = self.get_documents(limit=batch_size, offset=offset)
+            if not documents:
+                break
+            self.lexical_index.add(documents)
+            indexed += len(documents)
+            offset += len(documents)
+
+        return indexed
+
+    def backfill_languages(self, batch_size: int = 500, force: bool = False) -> int:
+        """
+        Detect and store the language of the documents ingested without one.
+
+        The collection is read in pages and only the metadata is updated, so no embedding call is made. The change
+        listeners are notified after each page.
+
+        Returns:
+            The number of updated documents.
+        """
+        updated = 0
+        offset = 0
+        while True:
+            page = self.vector_store.get(include=["metadatas"], limit=batch_size, offset=offset)
+            if not page["ids"]:
+                break
+
+            ids, metadatas = [], []
+            for uuid, metadata in zip(page["ids"], page["metadatas"]):
+                if force or not metadata.get("language"):
+                    metadata["language"] = self.language_manager.detect_document_language(
+                        metadata["title"], metadata["abstract"]
+                    )
+                    ids.append(uuid)
+                    metadatas.append(metadata)
+
+            if ids:
+                self.vector_store.update_metadatas(ids, metadatas)
+                # Invalidate the responses cached with the previous metadata
+                self._notify_change(ids)
+
+            updated += len(ids)
+            offset += len(page["ids"])
+
+        return updated
+
+    def backfill_content_hashes(self, batch_size: int = 500) -> int:
+        """
+        Store the content hash of the documents ingested before the deduplication index existed.
+
+        Returns:
+            The number of updated documents.
+        """
+        updated = 0
+        offset = 0
+        while True:
+            page = self.vector_store.get(include=["metadatas"], limit=batch_size, offset=offset)
+            if not page["ids"]:
+                break
+
+            ids, metadatas = [], []
+            for uuid, metadata in zip(page["ids"], page["metadatas"]):
+                if "content_hash" not in metadata:
+                    metadata["content_hash"] = document_content_hash(metadata["title"], metadata["abstract"])
+                    ids.append(uuid)
+                    metadatas.append(metadata)
+
+            if ids:
+                self.vector_store.update_metadatas(ids, metadatas)
+                # Invalidate the responses cached with the previous metadata
+                self._notify_change(ids)
+
+            updated += len(ids)
+            offset += len(page["ids"])
+
+        return updated
+
+    def get_document_by_uuid(self, uuid: str) -> Optional[Document]:
         """
         Get a document by its UUID.
 
         Returns:
-            A Document instance with the specified UUID.
+            A Document instance with the specified UUID, or None if there is no such document.
         """
-        document = self.vector_store.get(ids=[uuid])
+        document = self.vector_store.get(ids=[uuid], include=["metadatas"])
+        if not document["ids"]:
+            return None
         metadata = document["metadatas"][0]
         return Document(**metadata)
 
-    def get_documents(self, uuids: list[str] = None) -> list[Document]:
+    def get_documents(
+        self, uuids: list[str] = None, limit: Optional[int] = None, offset: Optional[int] = None
+    ) -> list[Document]:
         """
-        Get documents from the vector store.
+        Get documents from the vector store, reading the given uuids in pages of DOCUMENTS_BULK_PAGE_SIZE.
+
+        Unknown uuids are skipped.
 
         Returns:
             A list of Document instances.
         """
         if uuids is None:
-            documents = self.vector_store.get()
-            result = []
-            for metadata in documents["metadatas"]:
-                result.append(Document(**metadata))
-            return result
-        else:
-            documents = self.vector_store.get(ids=uuids)
-            result = []
-            for metadata in documents["metadatas"]:
-                result.append(Document(**metadata))
-            return result
+            documents = self.vector_store.get(limit=limit, offset=offset, include=["metadatas"])
+            return [Document(**metadata) for metadata in documents["metadatas"]]
+
+        result = []
+        for start in range(0, len(uuids), settings.DOCUMENTS_BULK_PAGE_SIZE):
+            documents = self.vector_store.get(
+                ids=uuids[start : start + settings.DOCUMENTS_BULK_PAGE_SIZE], include=["metadatas"]
+            )
+            result.extend(Document(**metadata) for metadata in documents["metadatas"])
+        return result
 
-    def delete_documents(self, uuids: list[str]):
+    def get_document_page(
+        self,
+        limit: int,
+        offset: int = 0,
+        fields: Optional[list[DocumentField]] = None,
+        filters: Optional[DocumentFilters] = None,
+    ) -> tuple[list[DocumentProjection], Optional[int]]:
         """
-        Delete documents from the vector store.
+        Get a page of documents from the vector store, with only the given fields, among the documents matching the
+        filters if any.
+
+        Only the metadata is read, and not even that when the uuids are the only field. One extra document is read to
+        tell whether there is a next page. The filters are applied by the vector store, so pages stay full.
 
         Returns:
-            None
+            A tuple with the documents and the offset of the next page, None on the last page.
+        """
+        fields = fields or list(DocumentField)
+        include = [] if fields == [DocumentField.Uuid] else ["metadatas"]
+        where, ids = self.metadata_index.resolve(filters)
+        if ids is not None and not ids:
+            return [], None
+        page = self.vector_store.get(ids=ids, where=where, limit=limit + 1, offset=offset, include=include)
+
+        ids = page["ids"][:limit]
+        metadatas = page["metadatas"][:limit] if include else [{}] * len(ids)
+        documents = [
+            DocumentProjection(
+                **{field.value: uuid if field is DocumentField.Uuid else metadata.get(field.value) for field in fields}
+            )
+            for uuid, metadata in zip(ids, metadatas)
+        ]
+        return documents, offset + limit if len(page["ids"]) > limit else None
+
+    def iter_documents(
+        self, fields: Optional[list[DocumentField]] = None, page_size: int = settings.DOCUMENTS_EXPORT_PAGE_SIZE
+    ) -> Iterator[DocumentProjection]:
         """
-        self.vector_store.delete(ids=uuids)
+        Iterate over every document of the vector store, reading it in pages so that memory stays flat.
+
+        Returns:
+            An iterator of DocumentProjection instances with only the given fields.
+        """
+        offset: Optional[int] = 0
+        while offset is not None:
+            documents, offset = self.get_document_page(page_size, offset, fields)
+            yield from documents
+
+    def delete_documents(self, uuids: list[str]) -> list[str]:
+        """
+        Delete documents from the vector store, in pages of DOCUMENTS_BULK_PAGE_SIZE.
+
+        Unknown uuids are skipped, and the listeners are notified once with every deleted document.
+
+        Returns:
+            The uuids of the deleted documents.
+        """
+        deleted = []
+        for start in range(0, len(uuids), settings.DOCUMENTS_BULK_PAGE_SIZE):
+            existing = self.vector_store.get(ids=uuids[start : start + settings.DOCUMENTS_BULK_PAGE_SIZE], include=[])
+            if not existing["ids"]:
+                continue
+            self.vector_store.delete(ids=existing["ids"])
+            if self.chunk_store is not None:
+                self.chunk_store.delete(where={"document_uuid": {"$in": existing["ids"]}})
+            if self.lexical_index is not None:
+                self.lexical_index.delete(existing["ids"])
+            self.metadata_index.delete(existing["ids"])
+            deleted.extend(existing["ids"])
+
+        if deleted:
+            self._notify_change(deleted)
+        return deleted
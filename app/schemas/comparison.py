@@ -3,3 +3,8 @@ from pydantic import BaseModel
 
 class Comparison(BaseModel):
     comparison: str
+
+
+class JudgedComparison(BaseModel):
+    indexes: list[int]
+    comparison: str
@@ -1,4 +1,5 @@
 import uuid
+from datetime import datetime
 from typing import Optional
 
 from pydantic import BaseModel, Field, field_validator
@@ -9,13 +10,61 @@ class Document(BaseModel):
     title: str
     abstract: str
     authors: list[str]
+    language: Optional[str] = Field(default=None)
+    tags: Optional[list[str]] = Field(default=None)
+    # Set when the document is first written, unless the client sets it
+    ingested_at: Optional[datetime] = Field(default=None)
 
-    @field_validator("authors", mode="before")
-    def split_authors(cls, v):
+    @field_validator("authors", "tags", mode="before")
+    def split_values(cls, v):
         if isinstance(v, str):
-            return [author.strip() for author in v.split(";")]
+            return [value.strip() for value in v.split(";")]
         return v
 
 
+class DocumentProjection(Document):
+    # Every field is optional, so a listing only carries the fields it was projected on
+    uuid: Optional[str] = Field(default=None)
+    title: Optional[str] = Field(default=None)
+    abstract: Optional[str] = Field(default=None)
+    authors: Optional[list[str]] = Field(default=None)
+
+
 class DocumentsResponse(BaseModel):
+    documents: list[DocumentProjection]
+    # Offset of the next page, None on the last page
+    next_offset: Optional[int] = Field(default=None)
+
+
+class DocumentFilters(BaseModel):
+    # A document matches every given filter, and any of the values of a list
+    authors: Optional[list[str]] = Field(default=None, min_length=1)
+    languages: Optional[list[str]] = Field(default=None, min_length=1)
+    tags: Optional[list[str]] = Field(default=None, min_length=1)
+    ingested_after: Optional[datetime] = Field(default=None)
+    ingested_before: Optional[datetime] = Field(default=None)
+
+
+class DocumentUuidsRequest(BaseModel):
+    uuids: list[str] = Field(min_length=1)
+
+
+class BulkFetchResponse(BaseModel):
     documents: list[Document]
+    # Requested uuids without a document
+    missing: list[str]
+
+
+class BulkDeleteResponse(BaseModel):
+    deleted: list[str]
+    # Requested uuids without a document
+    missing: list[str]
+
+
+class DocumentSearchResult(Document):
+    # BM25 score of the document, higher is better
+    score: float
+
+
+class DocumentSearchResponse(BaseModel):
+    documents: list[DocumentSearchResult]
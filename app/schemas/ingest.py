@@ -0,0 +1,37 @@
+from typing import Optional
+
+from pydantic import BaseModel, Field
+
+
+class IngestCounts(BaseModel):
+    inserted: int = 0
+    updated: int = 0
+    skipped: int = 0
+
+
+class IngestRecordError(BaseModel):
+    record: int
+    error: str
+
+
+class IngestBatchReport(IngestCounts):
+
+    """
+    Outcome of one ingestion batch, covering the records in [first_record, end_record).
+    """
+
+    batch: int
+    first_record: int
+    end_record: int
+    invalid: list[IngestRecordError] = Field(default_factory=list)
+    error: Optional[str] = Field(default=None)
+    # Every record before this one has been processed, an interrupted load can resume from it
+    next_record: int
+
+
+class BulkIngestResponse(IngestCounts):
+    records: int
+    invalid: int
+    failed: int
+    next_record: int
+    batches: list[IngestBatchReport]
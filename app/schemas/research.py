@@ -2,19 +2,58 @@ from typing import List, Optional
 
 from pydantic import BaseModel, Field
 
-from app.schemas.documents import Document
+from app.core.enums import PipelineMode
+from app.schemas.documents import Document, DocumentFilters
 
 
 class ResearchRequest(BaseModel):
     query: str
+    # Pipeline mode of the request, the PIPELINE_MODE setting if not given
+    mode: Optional[PipelineMode] = Field(default=None)
+    # Only documents matching the filters are searched
+    filters: Optional[DocumentFilters] = Field(default=None)
+
+
+class ResearchBatchRequest(BaseModel):
+    requests: List[ResearchRequest] = Field(min_length=1)
 
 
 class ResearchResponseDocument(Document):
     similarity: float
-    language: Optional[str] = Field(default=None)
+    # Abstract chunks that matched the query when retrieving through the chunked index, kept out of the response
+    matched_chunks: Optional[List[str]] = Field(default=None, exclude=True)
+    # Set when the translation failed and the document is returned in its original language, kept out of the response
+    untranslated: bool = Field(default=False, exclude=True)
 
 
 class ResearchResponse(BaseModel):
     are_relevant_documents: bool
     documents: Optional[List[ResearchResponseDocument]] = Field(default=None)
     comparison: Optional[str] = Field(default=None)
+
+
+class ResearchBatchResult(BaseModel):
+    # Position of the request in the batch
+    index: int
+    query: str
+    response: Optional[ResearchResponse] = Field(default=None)
+    # Failure of the request, which does not fail the rest of the batch
+    error: Optional[str] = Field(default=None)
+
+
+class ResearchDocumentsEvent(BaseModel):
+    documents: List[ResearchResponseDocument]
+
+
+class ResearchComparisonEvent(BaseModel):
+    token: str
+
+
+class ResearchTranslationEvent(BaseModel):
+    # Position of the document in the filtered documents
+    index: int
+    document: ResearchResponseDocument
+
+
+class ResearchErrorEvent(BaseModel):
+    detail: str
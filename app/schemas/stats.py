@@ -0,0 +1,61 @@
+from typing import Dict, Optional
+
+from pydantic import BaseModel, Field
+
+
+class CacheStats(BaseModel):
+    hits: int
+    misses: int
+    hit_rate: float
+    size: int
+
+
+class TieredCacheStats(CacheStats):
+    memory_hits: int
+    disk_hits: int
+
+
+class SemanticCacheStats(CacheStats):
+    saved_seconds: float
+
+
+class CorrelationFilterStats(BaseModel):
+    requests: int
+    llm_calls: int
+    llm_bypass_rate: float
+    accepted_by_score: int
+    rejected_by_score: int
+    judged_by_llm: int
+
+
+class SingleFlightStats(BaseModel):
+    calls: int
+    collapsed: int
+    collapse_rate: float
+    in_flight: int
+    lock_waits: int
+
+
+class RateLimiterStats(BaseModel):
+    requests: int
+    queue_depth: int
+    max_queue_depth: int
+    waits: int
+    mean_wait_seconds: float
+    max_wait_seconds: float
+    rate_limited: int
+    backoff_seconds: float
+
+
+class StatsResponse(BaseModel):
+
+    """
+    Runtime statistics of the worker that served the request.
+    """
+
+    translation_cache: Optional[TieredCacheStats] = Field(default=None)
+    semantic_cache: Optional[SemanticCacheStats] = Field(default=None)
+    embedding_cache: Optional[TieredCacheStats] = Field(default=None)
+    correlation_filter: CorrelationFilterStats
+    single_flight: Dict[str, SingleFlightStats] = Field(default_factory=dict)
+    openai_client: RateLimiterStats
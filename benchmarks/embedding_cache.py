@@ -0,0 +1,86 @@
+"""
+Latency of the query embedding cache against an embedding model with a simulated network latency.
+
+A fixed set of queries is embedded three times: by a cold worker, again by the same worker (in-process LRU hits),
+and by a second worker with an empty LRU that shares the memory-mapped tier (disk hits). The cached vectors must
+match the embeddings of the model up to float32 precision, and the warm runs must not call the model.
+
+Usage:
+    python -m benchmarks.embedding_cache [--queries 200] [--dimensions 3072] [--latency 0.15]
+"""
+
+import argparse
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+from langchain_core.embeddings import DeterministicFakeEmbedding
+
+from app.core.config import settings
+from app.managers.embedding_cache import CachedEmbeddings, EmbeddingCacheManager
+
+
+class SlowEmbeddings(DeterministicFakeEmbedding):
+
+    """
+    A deterministic embedding model that sleeps like a remote call and counts its calls.
+    """
+
+    latency: float = 0.0
+    calls: int = 0
+
+    def embed_query(self, text: str) -> list[float]:
+        self.calls += 1
+        time.sleep(self.latency)
+        return super().embed_query(text)
+
+
+def run(embeddings: CachedEmbeddings, queries: list[str]) -> tuple[float, list[list[float]]]:
+    """
+    Embed every query once.
+
+    Returns:
+        A tuple with the mean latency per query in seconds and the embeddings.
+    """
+    started_at = time.perf_counter()
+    vectors = [embeddings.embed_query(query) for query in queries]
+    return (time.perf_counter() - started_at) / len(queries), vectors
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--dimensions", type=int, default=3072)
+    parser.add_argument("--latency", type=float, default=0.15, help="Simulated latency of the model in seconds.")
+    args = parser.parse_args()
+
+    settings.EMBEDDING_CACHE_DISK_ENABLED = True
+    settings.EMBEDDING_CACHE_PATH = Path(tempfile.mkdtemp())
+    settings.EMBEDDING_CACHE_DISK_SLOTS = max(settings.EMBEDDING_CACHE_DISK_SLOTS, args.queries)
+
+    model = SlowEmbeddings(size=args.dimensions, latency=args.latency)
+    queries = [f"Hubbard model antiferromagnetic quasiparticles, phrasing {index}" for index in range(args.queries)]
+    expected = np.asarray([DeterministicFakeEmbedding(size=args.dimensions).embed_query(q) for q in queries])
+
+    worker = CachedEmbeddings(model, EmbeddingCacheManager("benchmark"))
+    other_worker = CachedEmbeddings(model, EmbeddingCacheManager("benchmark"))
+
+    print(f"{args.queries} queries of {args.dimensions} dimensions, {args.latency * 1e3:.0f} ms per model call:")
+    for name, embeddings in [("cold", worker), ("memory", worker), ("disk", other_worker)]:
+        calls = model.calls
+        latency, vectors = run(embeddings, queries)
+        max_error = float(np.max(np.abs(np.asarray(vectors) - expected)))
+        print(
+            f"  {name:>6}: {latency * 1e3:9.3f} ms per query, {model.calls - calls:>5} model calls, "
+            f"max abs error {max_error:.2e}"
+        )
+        assert max_error < 1e-6, f"The {name} embeddings do not match the model"
+        assert name == "cold" or model.calls == calls, f"The {name} run called the model"
+
+    print(f"  memory: {worker.cache.stats()}")
+    print(f"  disk:   {other_worker.cache.stats()}")
+
+
+if __name__ == "__main__":
+    main()
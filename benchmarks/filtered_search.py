@@ -0,0 +1,158 @@
+"""
+Latency and precision of the filtered searches, pushed down to the collection versus post-filtering the top k.
+
+A synthetic collection carries the metadata the research filters use: authors drawn from a Zipf distribution,
+a language and a tag per document. For every filter and backend, the report gives:
+    - selectivity: the share of the collection matching the filter.
+    - post-filter: the p50 latency of an unfiltered top k search, and the share of its k results matching the filter,
+      which is what filtering the results of the search would keep.
+    - pushed down: the p50 latency and the filled share of the top k when the filter is resolved through the
+      metadata index and applied within the search, and the recall against the exact filtered top k.
+
+Usage:
+    python -m benchmarks.filtered_search [--documents 20000] [--dimensions 256] [--queries 100] [--k 10]
+        [--backends chroma numpy]
+"""
+
+import argparse
+import statistics
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+from langchain_core.documents import Document as LangchainDocument
+
+from app.core.config import settings
+from app.core.enums import DistanceSpace, VectorPrecision
+from app.managers.chroma_backend import ChromaBackend
+from app.managers.metadata_index import MetadataIndexManager
+from app.managers.numpy_backend import NumpyBackend
+from app.managers.vector_backend import VectorBackend
+from app.managers.vector_store import VectorStoreManager
+from app.schemas.documents import Document, DocumentFilters
+from benchmarks.vector_backends import MatrixEmbeddings, normalize
+
+LANGUAGES = ["English"] * 6 + ["Spanish", "French", "German", "Chinese"]
+TAGS = [f"collection-{index}" for index in range(20)]
+
+
+def corpus(size: int, rng: np.random.Generator) -> list[Document]:
+    # Author frequencies follow Zipf's law over a fixed pool, the first author being the most prolific
+    weights = 1.0 / np.arange(1, 5_001)
+    authors = rng.choice(5_000, (size, 3), p=weights / weights.sum()) + 1
+    return [
+        Document(
+            uuid=str(row),
+            title=f"Document {row}",
+            abstract=str(row),
+            authors=[f"Author {author}" for author in authors[row, : rng.integers(1, 4)]],
+            language=LANGUAGES[rng.integers(0, len(LANGUAGES))],
+            tags=[TAGS[rng.integers(0, len(TAGS))]],
+        )
+        for row in range(size)
+    ]
+
+
+def open_backend(backend: str, directory: Path, matrix: np.ndarray) -> VectorBackend:
+    if backend == "chroma":
+        return ChromaBackend("benchmark", MatrixEmbeddings(matrix), directory, DistanceSpace.Cosine)
+    return NumpyBackend(
+        "benchmark",
+        MatrixEmbeddings(matrix),
+        directory,
+        DistanceSpace.Cosine,
+        VectorPrecision.Float32,
+        settings.NUMPY_SEARCH_BLOCK_SIZE,
+        ("language",),
+    )
+
+
+def timed(search, queries: list[list[float]]) -> tuple[float, list[list[str]]]:
+    """
+    Run every query on its own.
+
+    Returns:
+        A tuple with the median latency in seconds and the ids found for every query.
+    """
+    latencies, found = [], []
+    for query in queries:
+        started_at = time.perf_counter()
+        hits = search(query)
+        latencies.append(time.perf_counter() - started_at)
+        found.append([doc.id for doc, _ in hits])
+    return statistics.median(latencies), found
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--documents", type=int, default=20_000)
+    parser.add_argument("--dimensions", type=int, default=256)
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--backends", nargs="+", default=["chroma", "numpy"], choices=["chroma", "numpy"])
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    matrix = normalize(rng.standard_normal((args.documents, args.dimensions), dtype=np.float32))
+    documents = corpus(args.documents, rng)
+    queries = normalize(matrix[rng.integers(0, args.documents, args.queries)] + 0.5 * matrix[: args.queries])
+
+    directory = Path(tempfile.mkdtemp())
+    settings.METADATA_INDEX_PATH = directory / "metadata_index.db"
+    metadata_index = MetadataIndexManager()
+    metadata_index.add(documents)
+
+    filters = {
+        "top author": DocumentFilters(authors=["Author 1"]),
+        "rare author": DocumentFilters(authors=["Author 500"]),
+        "language": DocumentFilters(languages=["Spanish"]),
+        "tag": DocumentFilters(tags=["collection-3"]),
+        "tag+language": DocumentFilters(tags=["collection-3"], languages=["French"]),
+    }
+
+    for backend in args.backends:
+        store = open_backend(backend, directory / backend, matrix)
+        for start in range(0, args.documents, store.get_max_batch_size()):
+            batch = documents[start : start + store.get_max_batch_size()]
+            store.add(
+                [
+                    LangchainDocument(page_content=doc.abstract, metadata=VectorStoreManager.to_metadata(doc))
+                    for doc in batch
+                ],
+                [doc.uuid for doc in batch],
+            )
+
+        unfiltered_latency, unfiltered = timed(
+            lambda query, store=store: store.search([query], args.k)[0], queries.tolist()
+        )
+        print(f"\n{backend}, {args.documents} documents, unfiltered p50 {unfiltered_latency * 1000:.2f} ms")
+        print(
+            f"{'filter':>13} {'selectivity':>11} {'post p50 ms':>11} {'post kept':>9} "
+            f"{'pushed p50 ms':>13} {'pushed filled':>13} {'recall':>6}"
+        )
+        for name, document_filters in filters.items():
+            where, ids = metadata_index.resolve(document_filters)
+            matching = store.get(ids=ids, where=where, include=[])["ids"]
+            rows = np.asarray([int(uuid) for uuid in matching], dtype=np.int64)
+            allowed = set(matching)
+            if not matching:
+                print(f"{name:>13} {0:11.4f} no matching document")
+                continue
+
+            latency, found = timed(
+                lambda query, store=store, ids=ids, where=where: store.search([query], args.k, ids=ids, where=where)[0],
+                queries.tolist(),
+            )
+            exact = [{str(row) for row in rows[np.argsort(-(matrix[rows] @ query))[: args.k]]} for query in queries]
+            kept = statistics.mean(sum(uuid in allowed for uuid in hits) / args.k for hits in unfiltered)
+            filled = statistics.mean(len(hits) / min(args.k, len(rows)) for hits in found)
+            recall = statistics.mean(len(set(hits) & truth) / len(truth) for hits, truth in zip(found, exact))
+            print(
+                f"{name:>13} {len(rows) / args.documents:11.4f} {unfiltered_latency * 1000:11.2f} {kept:9.3f} "
+                f"{latency * 1000:13.2f} {filled:13.3f} {recall:6.3f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""
+Indexing throughput and search latency of the BM25 lexical index.
+
+A synthetic corpus of titles and abstracts drawn from a Zipf-distributed vocabulary is indexed in batches, as
+VectorStoreManager.add_documents does, then searched with multi-term queries, the research retrieval case, and with
+prefix queries of a few characters, the autocomplete case. No embedding model is involved.
+
+Usage:
+    python -m benchmarks.lexical_search [--documents 100000] [--queries 500] [--k 20] [--batch-size 500]
+"""
+
+import argparse
+import statistics
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+from app.core.config import settings
+from app.managers.lexical_index import LexicalIndexManager
+from app.schemas.documents import Document
+
+
+def vocabulary(size: int, rng: np.random.Generator) -> np.ndarray:
+    letters = np.array(list("abcdefghijklmnopqrstuvwxyz"))
+    return np.array(["".join(rng.choice(letters, rng.integers(3, 11))) for _ in range(size)])
+
+
+def text(words: np.ndarray, length: int, rng: np.random.Generator) -> str:
+    return " ".join(words[np.minimum(rng.zipf(1.2, length), len(words)) - 1])
+
+
+def timed(search, queries: list[str]) -> tuple[float, float]:
+    """
+    Run every query on its own.
+
+    Returns:
+        A tuple with the median and the 99th percentile latency in seconds.
+    """
+    latencies = []
+    for query in queries:
+        started_at = time.perf_counter()
+        search(query)
+        latencies.append(time.perf_counter() - started_at)
+    return statistics.median(latencies), float(np.percentile(latencies, 99))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--documents", type=int, default=100_000)
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--k", type=int, default=20)
+    parser.add_argument("--batch-size", type=int, default=500)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    words = vocabulary(20_000, rng)
+    settings.LEXICAL_INDEX_PATH = Path(tempfile.mkdtemp()) / "lexical_index.db"
+    index = LexicalIndexManager()
+
+    started_at = time.perf_counter()
+    for start in range(0, args.documents, args.batch_size):
+        index.add(
+            Document(uuid=str(row), title=text(words, 10, rng), abstract=text(words, 150, rng), authors=[])
+            for row in range(start, min(start + args.batch_size, args.documents))
+        )
+    build = time.perf_counter() - started_at
+    size = settings.LEXICAL_INDEX_PATH.stat().st_size / 2**20
+    print(f"indexed {args.documents} documents in {build:.1f}s ({args.documents / build:.0f} docs/s), {size:.0f} MiB")
+
+    # Queries mix frequent and rare terms, prefixes are the first characters of a term
+    queries = [text(words, 6, rng) for _ in range(args.queries)]
+    prefixes = [word[: rng.integers(2, 5)] for word in words[rng.integers(0, 2_000, args.queries)]]
+    for name, search, inputs in (
+        ("terms", lambda query: index.search(query, args.k), queries),
+        ("prefix", lambda query: index.search(query, args.k, prefix=True), prefixes),
+    ):
+        p50, p99 = timed(search, inputs)
+        print(f"{name:>6}: p50 {p50 * 1000:.2f} ms, p99 {p99 * 1000:.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
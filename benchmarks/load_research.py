@@ -0,0 +1,85 @@
+"""
+Load test for the /research endpoint.
+
+Fires batches of identical /research requests at increasing concurrency levels against a running server and
+reports throughput and latency per level, together with the /healthcheck latency measured while the batch is in
+flight. On a worker that serializes requests throughput stays flat as concurrency grows and the healthcheck latency
+tracks the slowest research call; with the async pipeline both scale with concurrency.
+
+Usage:
+    python -m benchmarks.load_research --base-url http://localhost:8080 --levels 1 2 4 8 16
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+
+import httpx
+
+from app.core.config import settings
+
+
+async def _timed_post(client: httpx.AsyncClient, url: str, query: str) -> float:
+    start = time.perf_counter()
+    response = await client.post(url, json={"query": query})
+    response.raise_for_status()
+    return time.perf_counter() - start
+
+
+async def _timed_get(client: httpx.AsyncClient, url: str) -> float:
+    start = time.perf_counter()
+    response = await client.get(url)
+    response.raise_for_status()
+    return time.perf_counter() - start
+
+
+async def run_level(client: httpx.AsyncClient, base_url: str, query: str, concurrency: int) -> dict:
+    """
+    Run one batch of concurrent research requests and probe the healthcheck while it is in flight.
+
+    Returns:
+        A dictionary with the throughput and latency figures for the batch.
+    """
+    research_url = f"{base_url}{settings.API_V1_STR}/research"
+    healthcheck_url = f"{base_url}{settings.API_V1_STR}/healthcheck"
+
+    start = time.perf_counter()
+    research_tasks = [asyncio.create_task(_timed_post(client, research_url, query)) for _ in range(concurrency)]
+    # Give the research calls time to reach the LLM before probing the healthcheck
+    await asyncio.sleep(0.1)
+    healthcheck_latency = await _timed_get(client, healthcheck_url)
+    latencies = await asyncio.gather(*research_tasks)
+    elapsed = time.perf_counter() - start
+
+    return {
+        "concurrency": concurrency,
+        "elapsed_s": elapsed,
+        "throughput_rps": concurrency / elapsed,
+        "p50_s": statistics.median(latencies),
+        "max_s": max(latencies),
+        "healthcheck_s": healthcheck_latency,
+    }
+
+
+async def main(base_url: str, query: str, levels: list[int]) -> None:
+    headers = {settings.AUTH_HEADER_KEY: settings.AUTH_SECRET_KEY}
+    limits = httpx.Limits(max_connections=max(levels) + 1)
+    async with httpx.AsyncClient(headers=headers, limits=limits, timeout=300) as client:
+        print(f"{'concurrency':>11} {'elapsed_s':>10} {'rps':>8} {'p50_s':>8} {'max_s':>8} {'health_s':>9}")
+        for concurrency in levels:
+            result = await run_level(client, base_url, query, concurrency)
+            print(
+                f"{result['concurrency']:>11} {result['elapsed_s']:>10.2f} {result['throughput_rps']:>8.2f} "
+                f"{result['p50_s']:>8.2f} {result['max_s']:>8.2f} {result['healthcheck_s']:>9.3f}"
+            )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", default="http://localhost:8080")
+    parser.add_argument("--query", default=settings.USER_QUERY)
+    parser.add_argument("--levels", type=int, nargs="+", default=[1, 2, 4, 8, 16])
+    args = parser.parse_args()
+
+    asyncio.run(main(args.base_url, args.query, args.levels))
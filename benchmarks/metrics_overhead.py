@@ -0,0 +1,127 @@
+"""
+Measure the overhead of the instrumentation: the stage timers, the LLM usage callback and the Server-Timing
+middleware.
+
+The stage timer and the callback are timed in a tight loop against an empty loop. The middleware is timed on
+in-process requests to a trivial endpoint, through the ASGI interface, with and without it. A research request
+runs about ten stages and a few LLM calls, so the overhead per request is about ten timers, a few callbacks and
+one pass through the middleware.
+
+Usage:
+    python -m benchmarks.metrics_overhead [--iterations 200000] [--requests 2000]
+"""
+
+import argparse
+import asyncio
+import time
+import timeit
+
+import httpx
+from fastapi import FastAPI
+from langchain_core.messages import AIMessage
+from langchain_core.outputs import ChatGeneration, LLMResult
+
+from app.api.middleware import ServerTimingMiddleware
+from app.core.config import settings
+from app.core.metrics import server_timings, stage
+from app.managers.llm_usage import LLMUsageCallback
+
+
+def time_loop(statement, iterations: int) -> float:
+    """
+    Time a callable in a loop.
+
+    Returns:
+        The mean time per call in seconds.
+    """
+    return min(timeit.repeat(statement, number=iterations, repeat=3)) / iterations
+
+
+def empty() -> None:
+    pass
+
+
+def timed_stage() -> None:
+    with stage("benchmark"):
+        pass
+
+
+async def time_requests(app: FastAPI, requests: int) -> float:
+    """
+    Send requests to the application in process.
+
+    Returns:
+        The mean latency per request in seconds.
+    """
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://benchmark") as client:
+        for _ in range(requests // 10):
+            await client.get("/ping")
+        started_at = time.perf_counter()
+        for _ in range(requests):
+            await client.get("/ping")
+        return (time.perf_counter() - started_at) / requests
+
+
+def build_app(middleware: bool) -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/ping")
+    async def ping() -> dict:
+        for name in ("language_detection", "embedding", "vector_search"):
+            with stage(name):
+                pass
+        return {}
+
+    if middleware:
+        app.add_middleware(ServerTimingMiddleware)
+    return app
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=200_000)
+    parser.add_argument("--requests", type=int, default=2000)
+    args = parser.parse_args()
+
+    baseline = time_loop(empty, args.iterations)
+
+    settings.METRICS_ENABLED = False
+    disabled = time_loop(timed_stage, args.iterations) - baseline
+    settings.METRICS_ENABLED = True
+    enabled = time_loop(timed_stage, args.iterations) - baseline
+    token = server_timings.set({})
+    with_timings = time_loop(timed_stage, args.iterations) - baseline
+    server_timings.reset(token)
+
+    callback = LLMUsageCallback("benchmark")
+    result = LLMResult(
+        generations=[
+            [
+                ChatGeneration(
+                    message=AIMessage(
+                        content="",
+                        usage_metadata={"input_tokens": 1000, "output_tokens": 200, "total_tokens": 1200},
+                        response_metadata={"model_name": "gpt-4o-mini-2024-07-18"},
+                    )
+                )
+            ]
+        ]
+    )
+    callback_time = time_loop(lambda: callback.on_llm_end(result), args.iterations) - baseline
+
+    print(f"Stage timer, metrics disabled:            {disabled * 1e6:6.2f} us")
+    print(f"Stage timer:                              {enabled * 1e6:6.2f} us")
+    print(f"Stage timer, within a request:            {with_timings * 1e6:6.2f} us")
+    print(f"LLM usage callback:                       {callback_time * 1e6:6.2f} us")
+
+    without_middleware = asyncio.run(time_requests(build_app(False), args.requests))
+    with_middleware = asyncio.run(time_requests(build_app(True), args.requests))
+    print(f"Request without the middleware:           {without_middleware * 1e6:6.1f} us")
+    print(
+        f"Request with the middleware:              {with_middleware * 1e6:6.1f} us "
+        f"({(with_middleware - without_middleware) * 1e6:+.1f} us)"
+    )
+
+
+if __name__ == "__main__":
+    main()
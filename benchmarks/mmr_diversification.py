@@ -0,0 +1,174 @@
+"""
+Near-duplicate suppression of the maximal marginal relevance retrieval, and the LLM tokens it saves.
+
+The synthetic corpus has papers in several preprint versions that differ by a few words, like the arXiv versions of
+a paper, embedded with the hashed bag-of-words fake embeddings. Every query is written from the abstract of a paper,
+so the plain top k is crowded with the versions of that paper. For the plain retrieval and for every lambda, the
+report gives per query:
+    - papers: the distinct papers among the top k documents.
+    - redundant tokens: the estimated prompt tokens (four characters per token) spent on documents that are versions
+      of a document already retrieved, over the LLM stages that receive every document (--llm-stages, the
+      correlation filter and the comparison by default). The difference with the plain retrieval is what
+      diversification saves.
+    - similarity: the mean cosine similarity of the documents to the query, the relevance given up for diversity.
+    - p50 ms: the median retrieval latency, and the median latency of the diversification stage alone.
+
+Usage:
+    python -m benchmarks.mmr_diversification [--papers 2000] [--queries 300] [--k 3] [--fetch-factor 4]
+        [--lambdas 0.5 0.7 0.9] [--llm-stages 2]
+"""
+
+import argparse
+import asyncio
+import statistics
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+from langchain_core.documents import Document as LangchainDocument
+
+from app.core.enums import DistanceSpace, VectorPrecision
+from app.core.scoring import maximal_marginal_relevance
+from app.managers.fake_models import HashedEmbeddings
+from app.managers.numpy_backend import NumpyBackend
+from app.managers.retriever import VectorDBRetriever
+from app.managers.vector_store import VectorStoreManager
+from app.schemas.documents import Document
+
+
+def corpus(papers: int, rng: np.random.Generator) -> tuple[list[Document], dict[str, int]]:
+    """
+    Build papers of 1 to 4 versions, each version replacing a few words of the previous one.
+
+    Returns:
+        A tuple with the documents and the paper of every document uuid.
+    """
+    words = np.array([f"w{index}" for index in range(5_000)])
+    documents, paper_of = [], {}
+    for paper in range(papers):
+        topic = rng.choice(words, 300, replace=False)
+        abstract = rng.choice(topic, 120)
+        title = " ".join(rng.choice(topic, 8))
+        for version in range(rng.integers(1, 5)):
+            if version:
+                abstract = abstract.copy()
+                abstract[rng.integers(0, len(abstract), 6)] = rng.choice(topic, 6)
+            document = Document(uuid=f"{paper}v{version + 1}", title=title, abstract=" ".join(abstract), authors=["A"])
+            documents.append(document)
+            paper_of[document.uuid] = paper
+    return documents, paper_of
+
+
+def tokens(document) -> int:
+    return (len(document.title) + len(document.abstract)) // 4
+
+
+async def evaluate(
+    retriever: VectorDBRetriever, queries: list[str], paper_of: dict[str, int], llm_stages: int
+) -> dict[str, float]:
+    papers, redundant, similarities, latencies = [], [], [], []
+    for query in queries:
+        embedding = await retriever.embed_query(query)
+        started_at = time.perf_counter()
+        nodes = await retriever.retrieve_nodes_batch([embedding])
+        latencies.append(time.perf_counter() - started_at)
+
+        seen = set()
+        redundant_tokens = 0
+        for node in nodes[0]:
+            if paper_of[node.uuid] in seen:
+                redundant_tokens += tokens(node) * llm_stages
+            seen.add(paper_of[node.uuid])
+        papers.append(len(seen))
+        redundant.append(redundant_tokens)
+        similarities.extend(node.similarity for node in nodes[0])
+
+    return {
+        "papers": statistics.mean(papers),
+        "redundant": statistics.mean(redundant),
+        "similarity": statistics.mean(similarities),
+        "p50": statistics.median(latencies),
+    }
+
+
+def selection_latency(k: int, fetch_factor: int, dimensions: int, rng: np.random.Generator) -> float:
+    """
+    Time the maximal marginal relevance selection alone, on random candidates.
+
+    Returns:
+        The median latency in seconds.
+    """
+    latencies = []
+    for _ in range(1_000):
+        similarities = rng.random(k * fetch_factor, dtype=np.float32)
+        embeddings = rng.standard_normal((k * fetch_factor, dimensions), dtype=np.float32)
+        started_at = time.perf_counter()
+        maximal_marginal_relevance(similarities, embeddings, k, 0.7)
+        latencies.append(time.perf_counter() - started_at)
+    return statistics.median(latencies)
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--papers", type=int, default=2_000)
+    parser.add_argument("--queries", type=int, default=300)
+    parser.add_argument("--k", type=int, default=3)
+    parser.add_argument("--fetch-factor", type=int, default=4)
+    parser.add_argument("--lambdas", type=float, nargs="+", default=[0.5, 0.7, 0.9])
+    parser.add_argument("--llm-stages", type=int, default=2, help="LLM calls receiving every retrieved document.")
+    parser.add_argument("--dimensions", type=int, default=256)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    documents, paper_of = corpus(args.papers, rng)
+    queries = [
+        " ".join(rng.choice(documents[index].abstract.split(), 20))
+        for index in rng.integers(0, len(documents), args.queries)
+    ]
+
+    with tempfile.TemporaryDirectory() as directory:
+        store = NumpyBackend(
+            "benchmark",
+            HashedEmbeddings(args.dimensions),
+            Path(directory),
+            DistanceSpace.Cosine,
+            VectorPrecision.Float32,
+            16384,
+        )
+        for start in range(0, len(documents), store.get_max_batch_size()):
+            batch = documents[start : start + store.get_max_batch_size()]
+            store.add(
+                [
+                    LangchainDocument(page_content=doc.abstract, metadata=VectorStoreManager.to_metadata(doc))
+                    for doc in batch
+                ],
+                [doc.uuid for doc in batch],
+            )
+        print(f"{len(documents)} documents of {args.papers} papers, k={args.k}, fetch factor {args.fetch_factor}")
+
+        print(f"{'lambda':>6} {'papers':>6} {'redundant tokens (saved)':>24} {'similarity':>10} {'p50 ms':>7}")
+        baseline = None
+        for mmr_lambda in [None] + args.lambdas:
+            retriever = VectorDBRetriever(
+                vector_store=store,
+                k=args.k,
+                distance_space=DistanceSpace.Cosine,
+                mmr_enabled=mmr_lambda is not None,
+                mmr_lambda=mmr_lambda if mmr_lambda is not None else 0.7,
+                mmr_fetch_factor=args.fetch_factor,
+            )
+            result = await evaluate(retriever, queries, paper_of, args.llm_stages)
+            baseline = baseline or result
+            saved = baseline["redundant"] - result["redundant"]
+            print(
+                f"{'off' if mmr_lambda is None else mmr_lambda:>6} {result['papers']:6.2f} "
+                f"{result['redundant']:16.0f} ({saved:5.0f}) {result['similarity']:10.3f} {result['p50'] * 1000:7.2f}"
+            )
+
+    latency = selection_latency(args.k, args.fetch_factor, args.dimensions, rng)
+    print(f"selection of {args.k} among {args.k * args.fetch_factor} candidates: p50 {latency * 1e6:.0f} us")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,186 @@
+"""
+Compare the separate (correlation call, then comparison call) and merged (single judge-and-compare call) pipeline
+modes on a fixed synthetic query set, with a stubbed LLM.
+
+Every query retrieves documents with fixed similarities: some accepted by score, some relevant and some irrelevant
+in the ambiguous band the LLM judges. The stub answers deterministically (a document is relevant if its title
+shares a word with the query, and the comparison lists the titles it was given) and sleeps like a remote model,
+a fixed latency per call plus a latency per completion token. The benchmark reports the LLM calls, the estimated
+tokens (four characters per token) and the latency of both modes, and the agreement of their outputs.
+
+Usage:
+    python -m benchmarks.pipeline_modes [--queries 50] [--call-latency 0.3] [--token-latency 0.01]
+"""
+
+import argparse
+import asyncio
+import re
+import time
+from dataclasses import dataclass
+
+from langchain_core.prompt_values import PromptValue
+from langchain_core.runnables import RunnableLambda
+
+from app.core.config import settings
+from app.managers.comparison import ComparisonManager
+from app.managers.correlation import CorrelationFilterManager
+from app.schemas.comparison import Comparison, JudgedComparison
+from app.schemas.correlation import Correlation
+from app.schemas.research import ResearchResponseDocument
+
+TOPICS = ["hubbard", "superconductivity", "graphene", "neutrino", "exoplanet", "protein", "glacier", "quasar"]
+
+
+@dataclass
+class Usage:
+    calls: int = 0
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+
+
+class StubLLM:
+
+    """
+    A deterministic stand-in for the structured-output chat models, recording the calls and tokens.
+    """
+
+    def __init__(self, usage: Usage, call_latency: float, token_latency: float):
+        self.usage = usage
+        self.call_latency = call_latency
+        self.token_latency = token_latency
+
+    def runnable(self, schema: type) -> RunnableLambda:
+        async def invoke(prompt: PromptValue):
+            text = "\n".join(str(message.content) for message in prompt.to_messages())
+            query_words = set(re.search(r'User Query:\n"(.*)"', text).group(1).lower().split())
+            titles = re.findall(r"Index \d+: Title: '(.*)'", text)
+            known = re.search(r"Documents 1 to (\d+) are already known", text)
+            judged_from = int(known.group(1)) if known else 0
+
+            irrelevant = [
+                index + 1
+                for index, title in enumerate(titles)
+                if index >= judged_from and not query_words & set(title.lower().split())
+            ]
+            comparison = "Compared: " + "; ".join(
+                title for index, title in enumerate(titles) if index + 1 not in irrelevant
+            )
+            if schema is Correlation:
+                output = Correlation(indexes=irrelevant)
+            elif schema is Comparison:
+                output = Comparison(comparison=comparison)
+            else:
+                output = JudgedComparison(indexes=irrelevant, comparison=comparison)
+
+            completion_tokens = len(output.model_dump_json()) // 4
+            self.usage.calls += 1
+            self.usage.prompt_tokens += len(text) // 4
+            self.usage.completion_tokens += completion_tokens
+            await asyncio.sleep(self.call_latency + completion_tokens * self.token_latency)
+            return output
+
+        return RunnableLambda(invoke)
+
+
+def build_query_set(queries: int) -> list[tuple[str, list[ResearchResponseDocument]]]:
+    """
+    Build the fixed query set, with the documents each query retrieves.
+
+    Returns:
+        A list of (query, retrieved documents) tuples.
+    """
+    query_set = []
+    for index in range(queries):
+        topic, other = TOPICS[index % len(TOPICS)], TOPICS[(index + 3) % len(TOPICS)]
+        abstract = " ".join(["A synthetic abstract describing the measurements and the model of the study."] * 6)
+        docs = [
+            (f"{topic} survey {index}", 0.85),
+            (f"{topic} review {index}", 0.75),
+            (f"{topic} lattice effects {index}", 0.55),
+            (f"{other} observations {index}", 0.5),
+            (f"{topic} numerical study {index}", 0.45),
+            (f"{other} instrument {index}", 0.35),
+        ]
+        query_set.append(
+            (
+                f"{topic} renormalized quasiparticles",
+                [
+                    ResearchResponseDocument(
+                        uuid=f"{index}-{rank}", title=title, abstract=abstract, authors=[], similarity=similarity
+                    )
+                    for rank, (title, similarity) in enumerate(docs)
+                ],
+            )
+        )
+    return query_set
+
+
+async def run_mode(merged: bool, args: argparse.Namespace) -> tuple[Usage, float, list[tuple[list[str], str]]]:
+    """
+    Run the filter and comparison stages of the pipeline over the query set, one query at a time.
+
+    Returns:
+        A tuple with the usage, the mean latency per query and the output of every query.
+    """
+    usage = Usage()
+    stub = StubLLM(usage, args.call_latency, args.token_latency)
+    correlation_filter_manager = CorrelationFilterManager()
+    comparison_manager = ComparisonManager()
+    correlation_filter_manager.llm = stub.runnable(Correlation)
+    comparison_manager.llm = stub.runnable(Comparison)
+    comparison_manager.judge_llm = stub.runnable(JudgedComparison)
+    correlation_filter_manager.accept_threshold = 0.7
+    correlation_filter_manager.reject_threshold = 0.4
+
+    outputs = []
+    started_at = time.perf_counter()
+    for query, docs in build_query_set(args.queries):
+        if merged:
+            accepted, ambiguous = correlation_filter_manager.partition(docs)
+            if ambiguous:
+                relevant, comparison = await comparison_manager.get_judged_comparison(
+                    query, accepted, ambiguous, "English"
+                )
+            else:
+                relevant, comparison = accepted, await comparison_manager.get_comparison(query, accepted, "English")
+            relevant = [doc for doc in docs if doc in relevant]
+        else:
+            relevant = await correlation_filter_manager.check_correlation(query, docs)
+            comparison = await comparison_manager.get_comparison(query, relevant, "English")
+        outputs.append(([doc.uuid for doc in relevant], comparison))
+
+    return usage, (time.perf_counter() - started_at) / args.queries, outputs
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--queries", type=int, default=50)
+    parser.add_argument("--call-latency", type=float, default=0.3, help="Simulated latency of an LLM call.")
+    parser.add_argument("--token-latency", type=float, default=0.01, help="Simulated latency per completion token.")
+    args = parser.parse_args()
+
+    # The stub replaces the models, but the clients are still built
+    settings.OPENAI_API_KEY = settings.OPENAI_API_KEY or "stub"
+
+    separate_usage, separate_latency, separate_outputs = asyncio.run(run_mode(False, args))
+    merged_usage, merged_latency, merged_outputs = asyncio.run(run_mode(True, args))
+
+    print(
+        f"{args.queries} queries, {args.call_latency * 1e3:.0f} ms per call, {args.token_latency * 1e3:.0f} ms per token:"
+    )
+    for name, usage, latency in [
+        ("separate", separate_usage, separate_latency),
+        ("merged", merged_usage, merged_latency),
+    ]:
+        print(
+            f"  {name:>8}: {usage.calls / args.queries:4.2f} calls, {usage.prompt_tokens / args.queries:7.1f} prompt "
+            f"and {usage.completion_tokens / args.queries:6.1f} completion tokens, {latency * 1e3:8.1f} ms per query"
+        )
+
+    same_documents = sum(a[0] == b[0] for a, b in zip(separate_outputs, merged_outputs))
+    same_comparison = sum(a[1] == b[1] for a, b in zip(separate_outputs, merged_outputs))
+    print(f"Agreement: {same_documents}/{args.queries} document sets, {same_comparison}/{args.queries} comparisons")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,153 @@
+"""
+Recall@k against memory of the quantized NumPy collections.
+
+A collection is searched exactly with its float32 vectors, then with every quantization (int8 scalar codes and binary
+sign codes), code dimension and re-ranking depth. For each configuration the report gives:
+    - scanned MiB: the size of what a search scans and should stay in memory, the codes, or the vectors without
+      quantization. The full-precision vectors are only read for the re-ranked candidates.
+    - p50 ms: the median latency of a single-query search.
+    - recall@k: the share of the exact top k found.
+
+The embeddings default to a synthetic clustered corpus whose variance decreases along the dimensions, like the
+Matryoshka embeddings of text-embedding-3, with queries close to random documents. Pass --embeddings with a .npy
+matrix of real document embeddings for representative numbers, the queries being perturbed documents.
+
+Usage:
+    python -m benchmarks.quantization [--documents 100000] [--dimensions 3072] [--code-dimensions 256 1024]
+        [--rerank 1 4 10] [--queries 200] [--k 10] [--embeddings embeddings.npy]
+"""
+
+import argparse
+import statistics
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+from langchain_core.documents import Document as LangchainDocument
+from langchain_core.embeddings import Embeddings
+
+from app.core.enums import DistanceSpace, VectorPrecision, VectorQuantization
+from app.managers.numpy_backend import NumpyBackend
+
+
+class MatrixEmbeddings(Embeddings):
+
+    """
+    An embedding model returning the rows of a matrix, the texts being row numbers.
+    """
+
+    def __init__(self, matrix: np.ndarray):
+        self.matrix = matrix
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        return self.matrix[[int(text) for text in texts]].tolist()
+
+    def embed_query(self, text: str) -> list[float]:
+        return self.embed_documents([text])[0]
+
+
+def normalize(vectors: np.ndarray) -> np.ndarray:
+    return (vectors / np.linalg.norm(vectors, axis=1, keepdims=True)).astype(np.float32)
+
+
+def synthetic_corpus(documents: int, dimensions: int, rng: np.random.Generator) -> np.ndarray:
+    """
+    Build clustered unit vectors whose leading dimensions carry most of the variance.
+
+    Returns:
+        A float32 matrix with one row per document.
+    """
+    decay = (1.0 + np.arange(dimensions, dtype=np.float32)) ** -0.5
+    centers = rng.standard_normal((max(documents // 100, 1), dimensions), dtype=np.float32)
+    matrix = np.empty((documents, dimensions), dtype=np.float32)
+    for start in range(0, documents, 10_000):
+        stop = min(start + 10_000, documents)
+        clusters = rng.integers(0, len(centers), stop - start)
+        noise = rng.standard_normal((stop - start, dimensions), dtype=np.float32)
+        matrix[start:stop] = normalize((centers[clusters] + noise) * decay)
+    return matrix
+
+
+def build(directory: Path, matrix: np.ndarray, **options) -> NumpyBackend:
+    store = NumpyBackend(
+        "benchmark",
+        MatrixEmbeddings(matrix),
+        directory,
+        DistanceSpace.Cosine,
+        VectorPrecision.Float32,
+        16384,
+        **options,
+    )
+    for start in range(0, len(matrix), store.get_max_batch_size()):
+        rows = range(start, min(start + store.get_max_batch_size(), len(matrix)))
+        store.add([LangchainDocument(page_content=str(row)) for row in rows], [str(row) for row in rows])
+    return store
+
+
+def run(store: NumpyBackend, queries: list[list[float]], k: int) -> tuple[float, list[set[str]]]:
+    """
+    Search every query on its own.
+
+    Returns:
+        A tuple with the median latency in seconds and the ids found for every query.
+    """
+    store.search(queries[:1], k)
+    latencies, found = [], []
+    for query in queries:
+        started_at = time.perf_counter()
+        hits = store.search([query], k)[0]
+        latencies.append(time.perf_counter() - started_at)
+        found.append({doc.id for doc, _ in hits})
+    return statistics.median(latencies), found
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--documents", type=int, default=100_000)
+    parser.add_argument("--dimensions", type=int, default=3072)
+    parser.add_argument("--code-dimensions", type=int, nargs="+", default=[256, 1024])
+    parser.add_argument("--rerank", type=int, nargs="+", default=[1, 4, 10], help="Candidates per result.")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--embeddings", type=Path, default=None, help="A .npy matrix of document embeddings.")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    if args.embeddings is not None:
+        matrix = normalize(np.load(args.embeddings))
+    else:
+        matrix = synthetic_corpus(args.documents, args.dimensions, rng)
+    targets = matrix[rng.integers(0, len(matrix), args.queries)]
+    noise = rng.standard_normal(targets.shape, dtype=np.float32) * np.abs(targets).mean()
+    queries = normalize(targets + noise).tolist()
+
+    with tempfile.TemporaryDirectory() as directory:
+        exact_store = build(Path(directory) / "exact", matrix)
+        exact_latency, exact = run(exact_store, queries, args.k)
+        print(f"{'quantization':>12} {'code dims':>9} {'rerank':>6} {'scanned MiB':>11} {'p50 ms':>8} {'recall':>7}")
+        print(f"{'none':>12} {matrix.shape[1]:>9} {'-':>6} {matrix.nbytes / 2**20:11.1f} {exact_latency * 1000:8.2f}")
+
+        for quantization in (VectorQuantization.Int8, VectorQuantization.Binary):
+            for code_dimensions in sorted(
+                {min(dims, matrix.shape[1]) for dims in args.code_dimensions + [matrix.shape[1]]}
+            ):
+                store = build(
+                    Path(directory) / f"{quantization.value}-{code_dimensions}",
+                    matrix,
+                    quantization=quantization,
+                    code_dimensions=code_dimensions,
+                )
+                scanned = store.codes[: len(matrix)].nbytes / 2**20
+                for rerank in args.rerank:
+                    store.rerank_candidates = rerank
+                    latency, found = run(store, queries, args.k)
+                    recall = statistics.mean(len(hits & truth) / len(truth) for hits, truth in zip(found, exact))
+                    print(
+                        f"{quantization.value:>12} {code_dimensions:>9} {rerank:>6} {scanned:11.1f} "
+                        f"{latency * 1000:8.2f} {recall:7.3f}"
+                    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""
+Correctness check and microbenchmark of the distance-to-relevance conversion.
+
+A synthetic matrix of unit-normalized embeddings is searched by brute force in every distance space Chroma supports.
+The relevance computed by `app.core.scoring.distances_to_relevance` from those distances must match the cosine
+similarity computed directly from the embeddings, and must rank the documents in the same order. The conversion is
+then timed against the per-item Python loop it replaces.
+
+Usage:
+    python -m benchmarks.scoring [--documents 10000] [--dimensions 3072] [--batch 20]
+"""
+
+import argparse
+import timeit
+
+import numpy as np
+
+from app.core.enums import DistanceSpace
+from app.core.scoring import cosine_similarities, distances_to_relevance
+
+
+def chroma_distances(query: np.ndarray, matrix: np.ndarray, space: DistanceSpace) -> np.ndarray:
+    """
+    Compute the distances Chroma reports for a query in the given space.
+
+    Returns:
+        An array with one distance per row of the matrix.
+    """
+    dots = matrix @ query
+    if space is DistanceSpace.L2:
+        return np.sum((matrix - query) ** 2, axis=1)
+    if space is DistanceSpace.Cosine:
+        return 1.0 - dots / (np.linalg.norm(matrix, axis=1) * np.linalg.norm(query))
+    return 1.0 - dots
+
+
+def legacy_relevance(distances: list[float]) -> list[float]:
+    """
+    The per-item conversion used by the retriever before the scoring module.
+
+    Returns:
+        A list with one score per distance.
+    """
+    return [1.0 - score if score <= 1.0 else 1.0 / (1.0 + score) for score in distances]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--documents", type=int, default=10_000)
+    parser.add_argument("--dimensions", type=int, default=3072)
+    parser.add_argument("--batch", type=int, default=20, help="Size of the result batch to convert.")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    matrix = rng.standard_normal((args.documents, args.dimensions)).astype(np.float32)
+    matrix /= np.linalg.norm(matrix, axis=1, keepdims=True)
+    # Build a query close to a known document so the similarities span a useful range
+    query = matrix[0] + 0.5 * rng.standard_normal(args.dimensions).astype(np.float32) / np.sqrt(args.dimensions)
+    query /= np.linalg.norm(query)
+
+    expected = cosine_similarities(query, matrix)
+    expected_ranking = np.argsort(-expected, kind="stable")
+
+    print("Correctness against brute-force cosine similarity:")
+    for space in DistanceSpace:
+        relevance = distances_to_relevance(chroma_distances(query, matrix, space), space)
+        max_error = float(np.max(np.abs(relevance - expected)))
+        same_ranking = bool(np.array_equal(np.argsort(-relevance, kind="stable")[:100], expected_ranking[:100]))
+        legacy = np.asarray(legacy_relevance(chroma_distances(query, matrix, space).tolist()))
+        legacy_ranking = bool(np.array_equal(np.argsort(-legacy, kind="stable")[:100], expected_ranking[:100]))
+        print(
+            f"  {space.value:>6}: max abs error {max_error:.2e}, top-100 ranking preserved {same_ranking} "
+            f"(legacy rule: {legacy_ranking})"
+        )
+        assert max_error < 1e-4, f"Relevance in the {space.value} space does not match the cosine similarity"
+        assert same_ranking, f"Relevance in the {space.value} space does not preserve the ranking"
+
+    distances = chroma_distances(query, matrix, DistanceSpace.L2)[: args.batch]
+    distances_list = distances.tolist()
+    runs = 10_000
+    vectorized = timeit.timeit(lambda: distances_to_relevance(distances, DistanceSpace.L2), number=runs) / runs
+    per_item = timeit.timeit(lambda: legacy_relevance(distances_list), number=runs) / runs
+
+    print(f"Conversion of a batch of {args.batch} distances:")
+    print(f"  vectorized: {vectorized * 1e6:8.2f} us")
+    print(f"  per item:   {per_item * 1e6:8.2f} us")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,265 @@
+"""
+Offline benchmark suite of the service, on the fake chat and embedding backends.
+
+For every corpus size, a fresh in-process instance of the application, with its own temporary database and caches,
+is started in a subprocess with LLM_BACKEND=fake and EMBEDDING_BACKEND=fake, so no OpenAI key is needed and the
+model calls are deterministic. The suite then measures:
+    - ingest: the bulk ingestion of a synthetic corpus through POST /documents/bulk.
+    - research: concurrent POST /research requests over distinct queries, with the semantic cache disabled.
+    - documents: the listing of the whole corpus through the pages of GET /documents, and its NDJSON export.
+    - memory: the peak resident memory of the process.
+
+With --save-baseline the results are stored in the baseline file. Otherwise, when the baseline file exists, the
+results are compared with it and the suite exits with an error if any metric regressed by more than the tolerance.
+Baselines are specific to a machine and to the suite options, which are stored with them.
+
+The language detection model must be available, as for the service.
+
+Usage:
+    python -m benchmarks.suite [--sizes 1000 5000] [--queries 200] [--concurrency 8] [--llm-latency 0.0]
+        [--baseline benchmarks/baselines/suite.json] [--save-baseline] [--tolerance 0.25]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+TOPICS = [
+    "hubbard",
+    "superconductivity",
+    "graphene",
+    "neutrino",
+    "exoplanet",
+    "protein",
+    "glacier",
+    "quasar",
+    "photonics",
+    "genome",
+    "turbulence",
+    "catalysis",
+]
+WORDS = [
+    "measurement",
+    "model",
+    "lattice",
+    "spectrum",
+    "simulation",
+    "observation",
+    "structure",
+    "dynamics",
+    "transport",
+    "correlation",
+    "instrument",
+    "survey",
+    "density",
+    "coupling",
+    "phase",
+    "energy",
+]
+# Metrics where a higher value is better, the others are latencies and memory
+HIGHER_IS_BETTER = {"ingest_docs_per_s", "research_rps", "export_docs_per_s"}
+
+
+def build_corpus(size: int, seed: int = 0) -> list[dict]:
+    """
+    Build a synthetic corpus, the same for a given size and seed.
+
+    Returns:
+        A list of document dictionaries.
+    """
+    rng = random.Random(seed)
+    corpus = []
+    for index in range(size):
+        topics = rng.sample(TOPICS, 2)
+        title = f"{topics[0]} {rng.choice(WORDS)} {rng.choice(WORDS)} {index}"
+        abstract = " ".join(rng.choice(topics + WORDS) for _ in range(60)) + "."
+        corpus.append({"title": title, "abstract": abstract, "authors": [f"Author {rng.randrange(size)}"]})
+    return corpus
+
+
+def build_queries(count: int, seed: int = 1) -> list[str]:
+    rng = random.Random(seed)
+    return [f"{rng.choice(TOPICS)} {rng.choice(WORDS)} {rng.choice(WORDS)} {index}" for index in range(count)]
+
+
+def percentile(values: list[float], q: int) -> float:
+    return statistics.quantiles(values, n=100, method="inclusive")[q - 1] if len(values) > 1 else values[0]
+
+
+async def measure(size: int, args: argparse.Namespace) -> dict:
+    """
+    Start the application in process and measure it on a corpus of the given size.
+
+    Returns:
+        A dictionary with the metrics.
+    """
+    import httpx
+
+    from app.core.config import settings
+    from app.main import app, lifespan
+
+    headers = {settings.AUTH_HEADER_KEY: settings.AUTH_SECRET_KEY}
+    prefix = settings.API_V1_STR
+    metrics = {}
+
+    async with lifespan(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(
+            transport=transport, base_url="http://suite", headers=headers, timeout=None
+        ) as client:
+            # 1. Ingest the corpus
+            body = "\n".join(json.dumps(document) for document in build_corpus(size)).encode()
+            started_at = time.perf_counter()
+            response = await client.post(f"{prefix}/documents/bulk", params={"format": "ndjson"}, content=body)
+            response.raise_for_status()
+            metrics["ingest_docs_per_s"] = size / (time.perf_counter() - started_at)
+
+            # 2. Research distinct queries at the given concurrency
+            semaphore = asyncio.Semaphore(args.concurrency)
+            latencies = []
+
+            async def research(query: str) -> None:
+                async with semaphore:
+                    request_started_at = time.perf_counter()
+                    research_response = await client.post(f"{prefix}/research", json={"query": query})
+                    research_response.raise_for_status()
+                    latencies.append(time.perf_counter() - request_started_at)
+
+            started_at = time.perf_counter()
+            await asyncio.gather(*(research(query) for query in build_queries(args.queries)))
+            metrics["research_rps"] = args.queries / (time.perf_counter() - started_at)
+            metrics["research_p50_ms"] = percentile(latencies, 50) * 1000
+            metrics["research_p99_ms"] = percentile(latencies, 99) * 1000
+
+            # 3. List the corpus page by page, then export it
+            page_latencies = []
+            offset = 0
+            while offset is not None:
+                page_started_at = time.perf_counter()
+                page = await client.get(f"{prefix}/documents", params={"limit": 100, "offset": offset})
+                page.raise_for_status()
+                page_latencies.append(time.perf_counter() - page_started_at)
+                offset = page.json()["next_offset"]
+            metrics["documents_page_p50_ms"] = percentile(page_latencies, 50) * 1000
+            metrics["documents_page_p99_ms"] = percentile(page_latencies, 99) * 1000
+
+            started_at = time.perf_counter()
+            exported = 0
+            async with client.stream("GET", f"{prefix}/documents/export") as export:
+                async for _ in export.aiter_lines():
+                    exported += 1
+            metrics["export_docs_per_s"] = exported / (time.perf_counter() - started_at)
+
+    metrics["peak_rss_mb"] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    return metrics
+
+
+def run_size(size: int, args: argparse.Namespace) -> dict:
+    """
+    Measure a corpus size in a subprocess, so every size starts from a fresh process and empty stores.
+
+    Returns:
+        A dictionary with the metrics.
+    """
+    with tempfile.TemporaryDirectory() as directory:
+        env = {
+            **os.environ,
+            "LLM_BACKEND": "fake",
+            "EMBEDDING_BACKEND": "fake",
+            "FAKE_LLM_LATENCY": str(args.llm_latency),
+            "SEMANTIC_CACHE_ENABLED": "false",
+            "DATABASE_PATH": f"{directory}/database",
+            "TRANSLATION_CACHE_PATH": f"{directory}/translation_cache.db",
+            "EMBEDDING_CACHE_PATH": f"{directory}/embedding_cache",
+            "LEXICAL_INDEX_PATH": f"{directory}/lexical_index.db",
+            "METADATA_INDEX_PATH": f"{directory}/metadata_index.db",
+        }
+        command = [
+            sys.executable,
+            "-m",
+            "benchmarks.suite",
+            "--measure",
+            str(size),
+            "--queries",
+            str(args.queries),
+            "--concurrency",
+            str(args.concurrency),
+        ]
+        output = subprocess.run(command, env=env, check=True, capture_output=True, text=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> list[str]:
+    """
+    Compare the results with the baseline.
+
+    Returns:
+        A list with a description of every regression.
+    """
+    regressions = []
+    for size, metrics in results.items():
+        for metric, value in metrics.items():
+            reference = baseline.get(size, {}).get(metric)
+            if not reference:
+                continue
+            change = value / reference - 1
+            if (change < -tolerance) if metric in HIGHER_IS_BETTER else (change > tolerance):
+                regressions.append(f"{size} documents, {metric}: {value:.1f} against {reference:.1f} ({change:+.0%})")
+    return regressions
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 5000], help="Corpus sizes.")
+    parser.add_argument("--queries", type=int, default=200, help="Research requests per corpus size.")
+    parser.add_argument("--concurrency", type=int, default=8, help="Research requests in flight.")
+    parser.add_argument("--llm-latency", type=float, default=0.0, help="Latency of the fake chat model calls.")
+    parser.add_argument("--baseline", type=Path, default=Path("benchmarks/baselines/suite.json"))
+    parser.add_argument("--save-baseline", action="store_true", help="Store the results as the baseline.")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Relative change considered a regression.")
+    parser.add_argument("--measure", type=int, default=None, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    # In the subprocess: measure a single size and print the metrics
+    if args.measure is not None:
+        print(json.dumps(asyncio.run(measure(args.measure, args))))
+        return
+
+    options = {"queries": args.queries, "concurrency": args.concurrency, "llm_latency": args.llm_latency}
+    results = {}
+    for size in args.sizes:
+        results[str(size)] = run_size(size, args)
+        print(f"{size} documents:")
+        for metric, value in results[str(size)].items():
+            print(f"  {metric:>22}: {value:10.1f}")
+
+    if args.save_baseline:
+        args.baseline.parent.mkdir(parents=True, exist_ok=True)
+        args.baseline.write_text(json.dumps({"options": options, "results": results}, indent=2) + "\n")
+        print(f"Saved the baseline to {args.baseline}")
+        return
+
+    if not args.baseline.exists():
+        print(f"No baseline at {args.baseline}, run with --save-baseline to store one.")
+        return
+
+    baseline = json.loads(args.baseline.read_text())
+    if baseline["options"] != options:
+        raise SystemExit(f"The baseline was measured with other options: {baseline['options']}")
+    regressions = compare(results, baseline["results"], args.tolerance)
+    if regressions:
+        raise SystemExit("Regressions against the baseline:\n" + "\n".join(f"  {line}" for line in regressions))
+    print(f"No regression against {args.baseline} (tolerance {args.tolerance:.0%}).")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,212 @@
+"""
+Compare the Chroma and NumPy vector store backends on search latency, memory per worker and startup time.
+
+For every collection size, a synthetic collection of unit-normalized vectors is written in every backend, then
+several worker processes, as started by entrypoint.sh, open it at the same time and search it with the same
+queries, near neighbours of random documents. The suite reports per backend:
+    - build: the time to write the collection.
+    - startup: the time for a worker to open the collection, and the latency of its first search.
+    - latency: the p50 and p99 latency of a single-query search, with all the workers searching at once.
+    - recall@k: the share of the exact top k found, the NumPy search being exact.
+    - memory: the resident (RSS) and proportional (PSS) memory of a worker once all of them searched. Pages shared
+      by the workers, like the memory-mapped vectors, count fully in the RSS of every worker but are split between
+      them in the PSS, so PSS times the number of workers is the memory the workers actually use.
+
+Usage:
+    python -m benchmarks.vector_backends [--sizes 10000 100000 1000000] [--dimensions 256] [--workers 3]
+        [--queries 200] [--k 10] [--backends chroma numpy-float32 numpy-float16]
+"""
+
+import argparse
+import multiprocessing
+import statistics
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+from langchain_core.documents import Document as LangchainDocument
+from langchain_core.embeddings import Embeddings
+
+from app.core.config import settings
+from app.core.enums import DistanceSpace, VectorPrecision
+from app.managers.chroma_backend import ChromaBackend
+from app.managers.numpy_backend import NumpyBackend
+from app.managers.vector_backend import VectorBackend
+
+COLLECTION_NAME = "benchmark"
+BACKENDS = ["chroma", "numpy-float32", "numpy-float16"]
+
+
+class MatrixEmbeddings(Embeddings):
+
+    """
+    An embedding model returning the rows of a matrix, the texts being row numbers.
+    """
+
+    def __init__(self, matrix: np.ndarray):
+        self.matrix = matrix
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        return self.matrix[[int(text) for text in texts]].tolist()
+
+    def embed_query(self, text: str) -> list[float]:
+        return self.embed_documents([text])[0]
+
+
+def normalize(vectors: np.ndarray) -> np.ndarray:
+    return (vectors / np.linalg.norm(vectors, axis=1, keepdims=True)).astype(np.float32)
+
+
+def open_backend(backend: str, directory: Path, embeddings: Embeddings) -> VectorBackend:
+    if backend == "chroma":
+        return ChromaBackend(COLLECTION_NAME, embeddings, directory, DistanceSpace.Cosine)
+    return NumpyBackend(
+        COLLECTION_NAME,
+        embeddings,
+        directory,
+        DistanceSpace.Cosine,
+        VectorPrecision(backend.removeprefix("numpy-")),
+        settings.NUMPY_SEARCH_BLOCK_SIZE,
+    )
+
+
+def build(backend: str, directory: Path, size: int, dimensions: int) -> None:
+    """
+    Write a synthetic collection, one batch at a time, in a subprocess so that the workers start from scratch.
+
+    Returns:
+        None
+    """
+    rng = np.random.default_rng(0)
+    matrix = normalize(rng.standard_normal((size, dimensions), dtype=np.float32))
+    store = open_backend(backend, directory, MatrixEmbeddings(matrix))
+    batch_size = store.get_max_batch_size()
+    for start in range(0, size, batch_size):
+        rows = range(start, min(start + batch_size, size))
+        store.add(
+            [LangchainDocument(page_content=str(row), metadata={"title": f"Document {row}"}) for row in rows],
+            [f"doc-{row}" for row in rows],
+        )
+
+    # Queries close to random documents, like a query close to the abstract it is looking for
+    targets = matrix[rng.integers(0, size, 1000)]
+    np.save(directory / "queries.npy", normalize(targets + 0.5 * normalize(rng.standard_normal(targets.shape))))
+
+
+def memory_mb() -> tuple[float, float]:
+    """
+    Read the resident and proportional memory of the process.
+
+    Returns:
+        A tuple with the RSS and PSS in MiB.
+    """
+    values = {}
+    for line in Path("/proc/self/smaps_rollup").read_text().splitlines()[1:]:
+        name, value = line.split(":")
+        values[name] = int(value.split()[0]) / 1024
+    return values["Rss"], values["Pss"]
+
+
+def worker(backend: str, directory: Path, queries: int, k: int, barrier, results) -> None:
+    """
+    Open the collection, search it, then measure the memory once every worker searched.
+
+    Returns:
+        None
+    """
+    started_at = time.perf_counter()
+    store = open_backend(backend, directory, MatrixEmbeddings(np.empty((0, 0), dtype=np.float32)))
+    startup = time.perf_counter() - started_at
+
+    embeddings = np.load(directory / "queries.npy")[:queries].tolist()
+    started_at = time.perf_counter()
+    store.search(embeddings[:1], k)
+    first_search = time.perf_counter() - started_at
+
+    barrier.wait()
+    latencies, ids = [], []
+    for embedding in embeddings:
+        started_at = time.perf_counter()
+        hits = store.search([embedding], k)[0]
+        latencies.append(time.perf_counter() - started_at)
+        ids.append([doc.id for doc, _ in hits])
+
+    barrier.wait()
+    rss, pss = memory_mb()
+    results.put(
+        {"startup": startup, "first_search": first_search, "latencies": latencies, "ids": ids, "rss": rss, "pss": pss}
+    )
+    barrier.wait()
+
+
+def measure(backend: str, size: int, args: argparse.Namespace) -> dict:
+    """
+    Build a collection in a backend and measure it with concurrent workers.
+
+    Returns:
+        A dictionary with the metrics, and the ids found for every query.
+    """
+    context = multiprocessing.get_context("spawn")
+    with tempfile.TemporaryDirectory() as directory:
+        directory = Path(directory)
+        started_at = time.perf_counter()
+        builder = context.Process(target=build, args=(backend, directory, size, args.dimensions))
+        builder.start()
+        builder.join()
+        if builder.exitcode:
+            raise SystemExit(f"Building the {backend} collection failed")
+        build_time = time.perf_counter() - started_at
+
+        barrier, results = context.Barrier(args.workers), context.Queue()
+        workers = [
+            context.Process(target=worker, args=(backend, directory, args.queries, args.k, barrier, results))
+            for _ in range(args.workers)
+        ]
+        for process in workers:
+            process.start()
+        reports = [results.get() for _ in workers]
+        for process in workers:
+            process.join()
+
+    latencies = [latency for report in reports for latency in report["latencies"]]
+    quantiles = statistics.quantiles(latencies, n=100, method="inclusive")
+    return {
+        "build_s": build_time,
+        "startup_ms": statistics.mean(report["startup"] for report in reports) * 1000,
+        "first_search_ms": statistics.mean(report["first_search"] for report in reports) * 1000,
+        "p50_ms": quantiles[49] * 1000,
+        "p99_ms": quantiles[98] * 1000,
+        "rss_mb": statistics.mean(report["rss"] for report in reports),
+        "pss_mb": statistics.mean(report["pss"] for report in reports),
+        "ids": reports[0]["ids"],
+    }
+
+
+def recall(found: list[list[str]], exact: list[list[str]]) -> float:
+    return statistics.mean(len(set(hits) & set(truth)) / len(truth) for hits, truth in zip(found, exact) if truth)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--dimensions", type=int, default=256)
+    parser.add_argument("--workers", type=int, default=3, help="Worker processes searching at once.")
+    parser.add_argument("--queries", type=int, default=200, help="Searches per worker.")
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--backends", nargs="+", choices=BACKENDS, default=BACKENDS)
+    args = parser.parse_args()
+
+    columns = ["build_s", "startup_ms", "first_search_ms", "p50_ms", "p99_ms", "rss_mb", "pss_mb"]
+    print(f"{'backend':>14} {'vectors':>9} " + " ".join(f"{column:>15}" for column in columns) + f" {'recall':>8}")
+    for size in args.sizes:
+        results = {backend: measure(backend, size, args) for backend in args.backends}
+        # The float32 NumPy search is exact, so it is the reference when it was measured
+        exact = results.get("numpy-float32", {}).get("ids")
+        for backend, metrics in results.items():
+            row = " ".join(f"{metrics[column]:15.2f}" for column in columns)
+            print(f"{backend:>14} {size:>9} {row} {recall(metrics['ids'], exact) if exact else float('nan'):8.3f}")
+
+
+if __name__ == "__main__":
+    main()